@@ -0,0 +1,145 @@
+"""
+Benchmarks the latency of a request served through `TenantContextMiddleware`
+under ASGI, with the middleware running natively in the event loop against
+the same middleware forced to be sync only, which makes Django adapt it with
+a thread hop (the behaviour before it was async capable).
+
+Run from the `mt_site` directory:
+
+    python benchmarks/asgi_middleware.py [--requests 2000] [--runs 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import path
+
+# makes `tenant_router` importable when run as a script.
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+TENANT_ID = 't1.test.com'
+
+MIDDLEWARE_PATHS = {
+    'async': 'tenant_router.middleware.TenantContextMiddleware',
+    'sync': '__main__.SyncOnlyTenantContextMiddleware',
+}
+
+
+async def view(request):
+    from tenant_router.managers.task_local import tls_tenant_manager
+
+    return HttpResponse(tls_tenant_manager.current_tenant_context.id)
+
+
+urlpatterns = [path('items/', view)]
+
+
+def _configure():
+    settings.configure(
+        SECRET_KEY='benchmark',
+        ALLOWED_HOSTS=['*'],
+        ROOT_URLCONF=__name__,
+        INSTALLED_APPS=[],
+        MIDDLEWARE=[],
+        TENANT_ROUTER_SERVICE_NAME='benchmark',
+        TENANT_ROUTER_MIDDLEWARE_SETTINGS={},
+    )
+    django.setup()
+
+    from tenant_router.middleware import TenantContextMiddleware
+
+    global SyncOnlyTenantContextMiddleware
+
+    class SyncOnlyTenantContextMiddleware(TenantContextMiddleware):
+        # adapted with a thread hop, same as before it was async capable.
+        async_capable = False
+
+    from tenant_router.managers.tenant_context import tenant_context_manager
+    from tenant_router.schemas import TenantContext
+
+    tenant_context_manager._publish({
+        TENANT_ID: TenantContext.from_id(TENANT_ID)
+    })
+
+
+def _get_application(middleware_path):
+    from django.core.handlers.asgi import ASGIHandler
+
+    settings.MIDDLEWARE = [middleware_path]
+    return ASGIHandler()
+
+
+async def _request(application):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/items/',
+        'raw_path': b'/items/',
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'x-tenant-id', TENANT_ID.encode()),
+        ],
+        'client': ('127.0.0.1', 1234),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    assert messages[0]['status'] == 200, messages[0]
+    assert messages[1]['body'] == TENANT_ID.encode(), messages[1]
+
+
+async def _time_requests(application, requests):
+    # warms up the thread pool and any lazily initialized state.
+    for _ in range(50):
+        await _request(application)
+
+    st_time = time.perf_counter()
+    for _ in range(requests):
+        await _request(application)
+
+    return (time.perf_counter() - st_time) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    _configure()
+
+    for name, middleware_path in MIDDLEWARE_PATHS.items():
+        application = _get_application(middleware_path)
+        best = min(
+            asyncio.run(_time_requests(application, args.requests))
+            for _ in range(args.runs)
+        )
+        print(
+            '{name:>5} middleware: {latency:8.1f} us per request'.format(
+                name=name, latency=best * 1e6
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmarks the per query cost of resolving a conn alias in the router as the
+number of tenants grows, comparing `construct_conn_alias` (which the router
+called on every query before) against `BaseOrmManager.lookup_conn_alias`.
+
+Run from the `mt_site` directory:
+
+    python benchmarks/conn_alias_lookup.py [--calls 500000] [--runs 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import django
+from django.conf import settings
+
+# makes `tenant_router` importable when run as a script.
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+TENANT_COUNTS = (10, 1000, 10000)
+TEMPLATE_ALIAS = 'default'
+
+
+def _configure():
+    settings.configure(
+        TENANT_ROUTER_SERVICE_NAME='benchmark',
+        TENANT_ROUTER_ORM_SETTINGS={
+            'django_orm': {'SETTINGS_KEY': 'DATABASES'}
+        },
+    )
+    django.setup()
+
+
+def _get_manager(tenant_aliases):
+    from tenant_router.orm_backends.base.manager import BaseOrmManager
+    from tenant_router.orm_backends.utils import construct_conn_alias
+
+    class _OrmManager(BaseOrmManager):
+        ORM_KEY = 'django_orm'
+        DEFAULT_CONN_ALIAS = 'default'
+
+    manager = _OrmManager({'SETTINGS_KEY': 'DATABASES'})
+    for tenant_alias in tenant_aliases:
+        manager._add_to_conn_alias_table(
+            tenant_alias,
+            TEMPLATE_ALIAS,
+            construct_conn_alias(tenant_alias, 'django_orm', TEMPLATE_ALIAS)
+        )
+
+    return manager
+
+
+def _time(stmt, calls, runs):
+    return min(timeit.repeat(stmt, number=calls, repeat=runs)) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=500000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    _configure()
+
+    from tenant_router.orm_backends.utils import construct_conn_alias
+
+    print('{:>8}   {:>22}   {:>22}'.format(
+        'tenants', 'construct_conn_alias', 'lookup_conn_alias'
+    ))
+    for tenant_count in TENANT_COUNTS:
+        tenant_aliases = [
+            't{index}_test_com'.format(index=index)
+            for index in range(tenant_count)
+        ]
+        manager = _get_manager(tenant_aliases)
+        # the tenant of a request, somewhere in the middle of the table.
+        tenant_alias = tenant_aliases[tenant_count // 2]
+
+        construct_time = _time(
+            lambda: construct_conn_alias(
+                tenant_alias, 'django_orm', TEMPLATE_ALIAS
+            ),
+            args.calls, args.runs
+        )
+        lookup_time = _time(
+            lambda: manager.lookup_conn_alias(tenant_alias, TEMPLATE_ALIAS),
+            args.calls, args.runs
+        )
+        print('{:>8}   {:>19.0f} ns   {:>19.0f} ns'.format(
+            tenant_count, construct_time * 1e9, lookup_time * 1e9
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import logging
+import time
 from importlib import import_module
 
 from tenant_router.cache.config_manager import cache_config_manager
@@ -17,11 +18,15 @@ logger = logging.getLogger(__name__)
 
 
 def on_worker_init():
+    cache_config_manager.on_worker_init()
     pubsub_service.start()
+    orm_managers.on_worker_init()
 
 
 def on_worker_exit():
+    cache_config_manager.on_worker_exit()
     pubsub_service.stop()
+    orm_managers.on_worker_exit()
 
 
 class _BootstrapSettingsParser:
@@ -100,13 +105,29 @@ class _AppBootStrapper:
                 )
 
     def _run_bootstrap_sequence(self):
+        bootstrap_st_time = time.perf_counter()
+
         for component in self._bootstrap_sequence:
             logger.debug(
                 "Bootstrapping component {component_name}".format(
                     component_name=component.name
                 )
             )
+            component_st_time = time.perf_counter()
             component.bootstrap()
+            logger.info(
+                "Bootstrapped component {component_name} in "
+                "{elapsed:.3f}s".format(
+                    component_name=component.name,
+                    elapsed=time.perf_counter() - component_st_time
+                )
+            )
+
+        logger.info(
+            "Bootstrap sequence completed in {elapsed:.3f}s".format(
+                elapsed=time.perf_counter() - bootstrap_st_time
+            )
+        )
 
     def run(self):
         self._init_bootstrap_sequence()
@@ -0,0 +1,70 @@
+import logging
+
+from tenant_router.conf import settings
+from tenant_router.managers.tenant_context import tenant_context_manager
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+class _BulkConfigLoader:
+    """
+    Pulls every tenant's config for a given component (like `orm_config`
+    or `cache_config`) out of the config store with a single SCAN over
+    the whole key family followed by batched MGETs, instead of a SCAN
+    and a GET per tenant per key.
+    """
+    _SCAN_BATCH_SIZE = 1000
+    _READ_BATCH_SIZE = 500
+
+    def _get_marker(self, component_prefix_key):
+        return join_keys(
+            '',
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            component_prefix_key,
+            ''
+        )
+
+    def _scan_keys(self, config_store, marker):
+        tenant_aliases = tenant_context_manager.snapshot.by_alias
+
+        for key in config_store.iter_keys(
+                '*' + marker + '*', itersize=self._SCAN_BATCH_SIZE
+        ):
+            # only keys belonging to a known tenant are of interest.
+            marker_index = key.find(marker)
+            if key[0: marker_index] in tenant_aliases:
+                yield key
+
+    def _read_in_batches(self, config_store, keys):
+        config_dict = {}
+
+        for st_index in range(0, len(keys), self._READ_BATCH_SIZE):
+            config_dict.update(
+                config_store.get_many(
+                    keys[st_index: st_index + self._READ_BATCH_SIZE]
+                )
+            )
+
+        return config_dict
+
+    def load(self, config_store, component_prefix_key):
+        keys = list(
+            self._scan_keys(
+                config_store, self._get_marker(component_prefix_key)
+            )
+        )
+        config_dict = self._read_in_batches(config_store, keys)
+
+        logger.debug(
+            "Bulk loaded {count} keys for component {component}".format(
+                count=len(config_dict),
+                component=component_prefix_key
+            )
+        )
+
+        return config_dict
+
+
+bulk_config_loader = _BulkConfigLoader()
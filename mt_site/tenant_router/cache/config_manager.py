@@ -1,25 +1,44 @@
 import logging
+import threading
+import weakref
+from collections import deque
 from copy import copy
 
 import django.core.cache
 import django_cache_url
-from django.core.cache import caches
+from django.core.cache import caches, InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
 from django.utils.functional import cached_property
 from django.utils.module_loading import import_string
 
+from tenant_router.bulk_config_loader import bulk_config_loader
+from tenant_router.cache.namespaces import (
+    CacheNamespaces,
+    NamespacedKeyFunction
+)
+from tenant_router.cache.near_cache import NearCache
+from tenant_router.cache.scoped import (
+    create_shared_backend,
+    get_shared_backend_key,
+    is_shareable,
+    TenantScopedCache,
+    THREAD_SAFE_BACKENDS
+)
+from tenant_router.cache.single_flight import SingleFlight
 from tenant_router.cache.utils import (
     deconstruct_cache_alias,
     CACHE_CONFIG_PREFIX_KEY,
     CONFIG_STORE_ALIAS
 )
 from tenant_router.conf import settings
-from tenant_router.exceptions import InvalidTypeError
-from tenant_router.managers import tenant_context_manager
+from tenant_router.exceptions import (
+    ImproperlyConfiguredError,
+    InvalidTypeError
+)
 from tenant_router.pubsub.filters import uuid_filter
 from tenant_router.tenant_channel_observer import (
     tenant_channel_observable, TenantLifecycleEvent
 )
-from tenant_router.utils import join_keys
 
 
 logger = logging.getLogger(__name__)
@@ -41,6 +60,31 @@ class _CacheConfigManager:
             TenantLifecycleEvent.ON_TENANT_DELETE: self.on_tenant_delete
         }
 
+        # tenant alias -> {template alias -> cache alias} for every
+        # registered config. Inner dicts are replaced rather than
+        # mutated, so the cache handler can read them without locking.
+        self._cache_alias_table = {}
+        self._cache_alias_lock = threading.Lock()
+
+        # used when backends are shared across tenants. Scoped caches are
+        # keyed by cache alias (None for configs which can't be shared)
+        # and shared backends by their backend key, along with the
+        # number of live scoped caches using each of them. Scoped caches
+        # which are garbage collected queue up their backend key, to be
+        # released with the lock held.
+        self._shares_backends = False
+        self._thread_safe_backends = THREAD_SAFE_BACKENDS
+        self._scoped_caches = {}
+        self._shared_backends = {}
+        self._shared_backend_refs = {}
+        self._released_backend_keys = deque()
+        self._shared_backend_lock = threading.Lock()
+
+        self._near_cache = None
+        self._namespaces = None
+        self._single_flight = None
+        self._bypass_cache = DummyCache('', {})
+
     @property
     def _cache_config(self):
         return settings.CACHES
@@ -81,13 +125,195 @@ class _CacheConfigManager:
                 )
             )
 
+    def _add_to_cache_alias_table(
+            self, tenant_alias, template_alias, cache_alias
+    ):
+        with self._cache_alias_lock:
+            self._cache_alias_table[tenant_alias] = {
+                **self._cache_alias_table.get(tenant_alias, {}),
+                template_alias: cache_alias
+            }
+
+    def _remove_from_cache_alias_table(self, tenant_alias, template_alias):
+        with self._cache_alias_lock:
+            template_alias_dict = dict(
+                self._cache_alias_table.get(tenant_alias, {})
+            )
+            template_alias_dict.pop(template_alias, None)
+
+            if template_alias_dict:
+                self._cache_alias_table[tenant_alias] = template_alias_dict
+            else:
+                self._cache_alias_table.pop(tenant_alias, None)
+
+    def lookup_cache_alias(self, tenant_context, template_alias):
+        """
+        Returns the registered cache alias for the given tenant context
+        and template alias without building any strings. Falls back to
+        the derived alias for tenants without a registered config.
+        """
+        try:
+            return self._cache_alias_table[tenant_context.alias][
+                template_alias
+            ]
+        except KeyError:
+            return tenant_context.get_cache_alias(template_alias)
+
+    @property
+    def shares_backends(self):
+        return self._shares_backends
+
+    @property
+    def near_cache(self):
+        return self._near_cache
+
+    def wrap_tenant_cache(self, template_alias, cache_alias, cache):
+        if self._near_cache is None \
+                or not self._near_cache.is_enabled_for(template_alias):
+            return cache
+
+        return self._near_cache.wrap(cache_alias, cache)
+
+    @property
+    def single_flight(self):
+        return self._single_flight
+
+    @property
+    def bypass_cache(self):
+        return self._bypass_cache
+
+    def _get_tenant_cache_aliases(self):
+        return [
+            cache_alias
+            for template_alias_dict in list(self._cache_alias_table.values())
+            for cache_alias in template_alias_dict.values()
+        ]
+
+    def is_namespace_loaded(self, cache_alias):
+        """
+        Returns whether keys of the cache alias can be made, which is once
+        its namespace version is read. Aliases without a config have no
+        namespace to wait for.
+        """
+        return self._namespaces.get(cache_alias) is not None \
+            or cache_alias not in self._cache_config
+
+    def get_scoped_cache(self, cache_alias):
+        """
+        Returns the cache of the given tenant cache alias on top of the
+        backend shared by every config pointing at the same server, or
+        None if its backend isn't known to be thread safe.
+        """
+        try:
+            return self._scoped_caches[cache_alias]
+        except KeyError:
+            pass
+
+        self._close_released_backends()
+
+        with self._shared_backend_lock:
+            if cache_alias in self._scoped_caches:
+                return self._scoped_caches[cache_alias]
+
+            try:
+                cache_config = self._cache_config[cache_alias]
+            except KeyError:
+                raise InvalidCacheBackendError(
+                    "Could not find config for '{cache_alias}' in "
+                    "settings.CACHES".format(cache_alias=cache_alias)
+                )
+
+            if not is_shareable(cache_config, self._thread_safe_backends):
+                logger.warning(
+                    "Not sharing the cache backend of %s since %s isn't "
+                    "known to be thread safe",
+                    cache_alias, cache_config.get('BACKEND')
+                )
+                self._scoped_caches[cache_alias] = None
+                return None
+
+            backend_key = get_shared_backend_key(cache_config)
+            backend = self._shared_backends.get(backend_key)
+            if backend is None:
+                logger.debug(
+                    "Creating shared cache backend for %s", backend_key
+                )
+                backend = self._shared_backends[backend_key] = \
+                    create_shared_backend(cache_config)
+
+            self._shared_backend_refs[backend_key] = \
+                self._shared_backend_refs.get(backend_key, 0) + 1
+            tenant_cache = TenantScopedCache(
+                backend, backend_key, cache_alias, cache_config
+            )
+            # threads may still be using a scoped cache after it has been
+            # forgotten, so the backend is released only once it's gone.
+            weakref.finalize(
+                tenant_cache, self._released_backend_keys.append, backend_key
+            )
+
+            _, template_alias = deconstruct_cache_alias(cache_alias)
+            scoped_cache = self._scoped_caches[cache_alias] = \
+                self.wrap_tenant_cache(
+                    template_alias, cache_alias, tenant_cache
+                )
+
+        return scoped_cache
+
+    def _close_released_backends(self):
+        released_backends = []
+
+        with self._shared_backend_lock:
+            while self._released_backend_keys:
+                backend_key = self._released_backend_keys.popleft()
+                self._shared_backend_refs[backend_key] -= 1
+                if self._shared_backend_refs[backend_key]:
+                    continue
+
+                self._shared_backend_refs.pop(backend_key)
+                released_backends.append(
+                    self._shared_backends.pop(backend_key)
+                )
+
+        for backend in released_backends:
+            backend.close()
+
+    def _forget_scoped_cache(self, cache_alias):
+        with self._shared_backend_lock:
+            self._scoped_caches.pop(cache_alias, None)
+
+        self._close_released_backends()
+
+    def bump_namespace(self, cache_alias):
+        """
+        Invalidates every key of the tenant cache alias at once by moving
+        it to a new namespace. Returns the new namespace version.
+        """
+        return self._namespaces.bump(cache_alias)
+
+    def bump_tenant_namespaces(self, tenant_alias):
+        return {
+            cache_alias: self.bump_namespace(cache_alias)
+            for cache_alias in self._cache_alias_table.get(
+                tenant_alias, {}
+            ).values()
+        }
+
     def _register_config(self, cache_alias, cache_config):
-        _, template_alias = deconstruct_cache_alias(cache_alias)
+        tenant_alias, template_alias = deconstruct_cache_alias(cache_alias)
         template_config = self._get_template_config(
             template_alias
         )
         final_cache_config = {**template_config, **cache_config}
+        final_cache_config['KEY_FUNCTION'] = NamespacedKeyFunction(
+            self._namespaces,
+            cache_alias,
+            final_cache_config.get('KEY_FUNCTION')
+        )
         self._cache_config[cache_alias] = final_cache_config
+        self._add_to_cache_alias_table(
+            tenant_alias, template_alias, cache_alias
+        )
 
     @uuid_filter
     def on_tenant_create(self, event):
@@ -101,6 +327,8 @@ class _CacheConfigManager:
         for cache_alias, cache_config in payload.items():
             self._register_config(cache_alias, cache_config)
 
+        self._namespaces.load(payload)
+
     @uuid_filter
     def on_tenant_update(self, event):
         logger.info(
@@ -112,6 +340,9 @@ class _CacheConfigManager:
         payload = event.data.get(CACHE_CONFIG_PREFIX_KEY, {})
         for cache_alias, updated_cache_config in payload.items():
             self._register_config(cache_alias, updated_cache_config)
+            self._forget_scoped_cache(cache_alias)
+            if self._near_cache is not None:
+                self._near_cache.forget(cache_alias)
 
             if cache_alias in self._cache_handler:
                 logger.debug(
@@ -123,6 +354,8 @@ class _CacheConfigManager:
                 self._cache_handler[cache_alias].close()
                 del self._cache_handler[cache_alias]
 
+        self._namespaces.load(payload)
+
     @uuid_filter
     def on_tenant_delete(self, event):
         logger.info(
@@ -133,7 +366,14 @@ class _CacheConfigManager:
         )
         payload = event.data.get(CACHE_CONFIG_PREFIX_KEY, ())
         for cache_alias in payload:
+            self._remove_from_cache_alias_table(
+                *deconstruct_cache_alias(cache_alias)
+            )
             self._cache_config.pop(cache_alias)
+            self._forget_scoped_cache(cache_alias)
+            self._namespaces.forget(cache_alias)
+            if self._near_cache is not None:
+                self._near_cache.forget(cache_alias)
             if cache_alias in self._cache_handler:
                 self._cache_handler[cache_alias].close()
                 del self._cache_handler[cache_alias]
@@ -143,25 +383,18 @@ class _CacheConfigManager:
             self._cache_config[alias] = self._get_template_config(alias)
 
     def _fill_template_aliases(self):
-        service_name = settings.TENANT_ROUTER_SERVICE_NAME
-
-        for tenant_context in tenant_context_manager.all():
-            cache_prefix = join_keys(
-                tenant_context.alias,
-                service_name,
-                CACHE_CONFIG_PREFIX_KEY
-            )
+        all_cache_config = bulk_config_loader.load(
+            self._config_store, CACHE_CONFIG_PREFIX_KEY
+        )
 
-            for cache_alias in self._config_store.iter_keys(
-                    cache_prefix + '*'
-            ):
-                cache_config = self._config_store.get(cache_alias)
-                self._register_config(cache_alias, cache_config)
+        for cache_alias, cache_config in all_cache_config.items():
+            self._register_config(cache_alias, cache_config)
 
     def _init_caches(self):
         self._cache_config = {}
         self._fill_reserved_aliases()
         self._fill_template_aliases()
+        self._namespaces.load(self._get_tenant_cache_aliases())
 
         # since Django expects the 'default' cache backend to
         # be present always, if it's not present even after filling
@@ -187,6 +420,104 @@ class _CacheConfigManager:
         cache_settings = settings.TENANT_ROUTER_CACHE_SETTINGS
         self._update_reserved_aliases(cache_settings)
         self._should_apply_patch = cache_settings.get('APPLY_PATCH', True)
+        self._shares_backends = cache_settings.get('SHARED_BACKENDS', False)
+        self._setup_thread_safe_backends(
+            cache_settings.get('THREAD_SAFE_BACKENDS', set())
+        )
+
+        if self._shares_backends and not self._should_apply_patch:
+            raise ImproperlyConfiguredError(
+                "'SHARED_BACKENDS' requires 'APPLY_PATCH' to be enabled."
+            )
+
+        self._setup_near_cache(cache_settings.get('NEAR_CACHE'))
+        self._namespaces = CacheNamespaces(
+            refresh_interval=cache_settings.get(
+                'NAMESPACE_REFRESH_INTERVAL', 60
+            )
+        )
+        self._setup_single_flight(cache_settings.get('SINGLE_FLIGHT', {}))
+
+    def _setup_thread_safe_backends(self, thread_safe_backends):
+        if not isinstance(thread_safe_backends, set):
+            raise ImproperlyConfiguredError(
+                "'THREAD_SAFE_BACKENDS' is expected to be of type 'set'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(thread_safe_backends)
+                )
+            )
+
+        self._thread_safe_backends = \
+            THREAD_SAFE_BACKENDS | frozenset(thread_safe_backends)
+
+    def _setup_near_cache(self, near_cache_dict):
+        if near_cache_dict is None:
+            return
+
+        if not isinstance(near_cache_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'NEAR_CACHE' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(near_cache_dict)
+                )
+            )
+
+        template_aliases = near_cache_dict.get('ALIASES')
+        if template_aliases is not None \
+                and not isinstance(template_aliases, set):
+            raise ImproperlyConfiguredError(
+                "'ALIASES' of 'NEAR_CACHE' is expected to be of type "
+                "'set'. Got type '{type_}' instead.".format(
+                    type_=type(template_aliases)
+                )
+            )
+
+        self._near_cache = NearCache(
+            max_entries=near_cache_dict.get('MAX_ENTRIES', 1024),
+            ttl=near_cache_dict.get('TTL', 5),
+            template_aliases=template_aliases,
+            publish_interval=near_cache_dict.get('PUBLISH_INTERVAL', 0.5)
+        )
+
+    def _setup_single_flight(self, single_flight_dict):
+        if not isinstance(single_flight_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'SINGLE_FLIGHT' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(single_flight_dict)
+                )
+            )
+
+        self._single_flight = SingleFlight(
+            lock_timeout=single_flight_dict.get('LOCK_TIMEOUT', 10),
+            beta=single_flight_dict.get('BETA', 1.0)
+        )
+
+    def on_worker_init(self):
+        # invalidations and namespace bumps from other workers are only
+        # received while the pubsub listener runs.
+        if settings.TENANT_ROUTER_PUBSUB_ENABLED:
+            self._namespaces.subscribe()
+            if self._near_cache is not None:
+                self._near_cache.subscribe()
+
+        # versions read before the worker was forked may be stale by now.
+        self._namespaces.load(self._get_tenant_cache_aliases())
+        self._namespaces.start(self._get_tenant_cache_aliases)
+
+    def on_worker_exit(self):
+        self._namespaces.stop()
+        if self._near_cache is not None:
+            self._near_cache.stop()
+
+    def get_near_cache_stats(self):
+        if self._near_cache is None:
+            return {}
+
+        return self._near_cache.get_stats()
+
+    def get_single_flight_stats(self):
+        return self._single_flight.get_stats()
 
     def format_conn_url(self, conn_url):
         cache_config = django_cache_url.parse(conn_url)
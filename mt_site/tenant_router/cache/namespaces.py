@@ -0,0 +1,224 @@
+import json
+import logging
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import get_key_func
+
+from tenant_router.conf import settings
+from tenant_router.constants import constants
+from tenant_router.exceptions import CacheNamespaceUnavailableError
+from tenant_router.pubsub.filters import uuid_filter
+from tenant_router.pubsub.proxy import pubsub_proxy
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_NAMESPACE_PREFIX_KEY = 'cache_namespace'
+
+
+class NamespacedKeyFunction:
+    """
+    Key function of a tenant cache alias which folds the current namespace
+    version of the alias into the key prefix before calling the configured
+    key function. Keys are left as is until the namespace is first bumped.
+    """
+    __slots__ = ('_namespaces', '_cache_alias', '_key_func')
+
+    def __init__(self, namespaces, cache_alias, key_func=None):
+        self._namespaces = namespaces
+        self._cache_alias = cache_alias
+        self._key_func = get_key_func(key_func)
+
+    def __call__(self, key, key_prefix, version):
+        namespace = self._namespaces.get(self._cache_alias)
+        if namespace is None:
+            # the cache handler bypasses the cache until the version is
+            # read, anything else is refused rather than risking keys of
+            # an earlier namespace.
+            raise CacheNamespaceUnavailableError(self._cache_alias)
+
+        if namespace:
+            key_prefix = '{key_prefix}:ns{namespace}'.format(
+                key_prefix=key_prefix,
+                namespace=namespace
+            )
+
+        return self._key_func(key, key_prefix, version)
+
+    def bump_namespace(self):
+        return self._namespaces.bump(self._cache_alias)
+
+    def get_key_patterns(self, key_prefix):
+        """
+        Returns patterns matching every key made with `key_prefix`, be it
+        in any namespace or none at all.
+        """
+        return [
+            self._key_func('*', key_prefix, '*'),
+            self._key_func('*', '{key_prefix}:ns*'.format(
+                key_prefix=key_prefix
+            ), '*')
+        ]
+
+
+class CacheNamespaces:
+    """
+    Namespace versions of tenant cache aliases. Bumping the version of an
+    alias makes every key written before unreachable in a single `incr`
+    on the config store, and the orphaned keys age out through their
+    timeout.
+
+    Versions are loaded in bulk when the configs are, and kept in memory
+    so that making a key never waits on the config store. Bumps are
+    broadcast on a pubsub channel, so other workers normally pick them up
+    right away, and a background thread re-reads every version each
+    `refresh_interval` seconds in case a broadcast is missed. Aliases
+    whose version couldn't be read yet have none at all, which makes
+    their caches fail closed.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self._refresh_interval = refresh_interval
+
+        # cache alias -> version
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._is_subscribed = False
+
+        self._refresher = None
+        self._stop_event = threading.Event()
+
+    @property
+    def _config_store(self):
+        return caches[constants.CONFIG_STORE_ALIAS]
+
+    @property
+    def channel_name(self):
+        return join_keys(
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            CACHE_NAMESPACE_PREFIX_KEY
+        )
+
+    def _get_store_key(self, cache_alias):
+        return join_keys(
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            CACHE_NAMESPACE_PREFIX_KEY,
+            cache_alias
+        )
+
+    def _set_version(self, cache_alias, version):
+        with self._lock:
+            current_version = self._versions.get(cache_alias)
+            # versions only move forward, a late broadcast can't undo a
+            # more recent bump.
+            if current_version is None or current_version < version:
+                self._versions[cache_alias] = version
+
+    def load(self, cache_aliases):
+        """
+        Reads the versions of the given cache aliases from the config
+        store in a single round trip. Aliases which can't be read keep
+        the version they had, if any.
+        """
+        store_keys = {
+            self._get_store_key(cache_alias): cache_alias
+            for cache_alias in cache_aliases
+        }
+        if not store_keys:
+            return
+
+        try:
+            versions = self._config_store.get_many(list(store_keys))
+        except Exception as e:
+            logger.warning(
+                "Unable to read the cache namespaces of %s: %s",
+                ', '.join(store_keys.values()), e
+            )
+            return
+
+        for store_key, cache_alias in store_keys.items():
+            # namespaces which have never been bumped aren't stored.
+            self._set_version(cache_alias, versions.get(store_key, 0))
+
+    def get(self, cache_alias):
+        """
+        Returns the current version of the cache alias, or None if it
+        hasn't been read yet.
+        """
+        return self._versions.get(cache_alias)
+
+    def bump(self, cache_alias):
+        store_key = self._get_store_key(cache_alias)
+        try:
+            version = self._config_store.incr(store_key)
+        except ValueError:
+            # the namespace has never been bumped before.
+            if self._config_store.add(store_key, 1):
+                version = 1
+            else:
+                version = self._config_store.incr(store_key)
+
+        self._set_version(cache_alias, version)
+        logger.info(
+            "Bumped cache namespace of %s to %s", cache_alias, version
+        )
+
+        try:
+            pubsub_proxy.publish(
+                self.channel_name,
+                json.dumps({
+                    'proc_uuid': constants.PROC_UUID,
+                    'cache_alias': cache_alias,
+                    'version': version
+                })
+            )
+        except Exception as e:
+            # other workers catch up on their next refresh.
+            logger.warning(
+                "Unable to publish the cache namespace of %s: %s",
+                cache_alias, e
+            )
+
+        return version
+
+    def forget(self, cache_alias):
+        with self._lock:
+            self._versions.pop(cache_alias, None)
+
+    @uuid_filter
+    def on_bump(self, event):
+        self._set_version(event.data['cache_alias'], event.data['version'])
+
+    def subscribe(self):
+        if self._is_subscribed:
+            return
+
+        pubsub_proxy.subscribe({self.channel_name: self.on_bump})
+        self._is_subscribed = True
+
+    def _run_refresher(self, get_cache_aliases):
+        while not self._stop_event.wait(self._refresh_interval):
+            try:
+                self.load(get_cache_aliases())
+            except Exception:
+                logger.exception("Background cache namespace refresh failed")
+
+    def start(self, get_cache_aliases):
+        if self._refresher is not None or not self._refresh_interval:
+            return
+
+        self._stop_event.clear()
+        self._refresher = threading.Thread(
+            target=self._run_refresher,
+            args=(get_cache_aliases, ),
+            name='tenant_router_namespace_refresher',
+            daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._refresher = None
@@ -0,0 +1,419 @@
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from tenant_router.conf import settings
+from tenant_router.constants import constants
+from tenant_router.pubsub.filters import uuid_filter
+from tenant_router.pubsub.proxy import pubsub_proxy
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+NEAR_CACHE_CHANNEL_KEY = 'near_cache_invalidation'
+
+_MISSING = object()
+
+
+class _NearCacheStats:
+    __slots__ = (
+        'hits', 'misses', 'invalidations', 'lag_total', 'lag_max'
+    )
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'avg_invalidation_lag': round(
+                self.lag_total / self.invalidations, 4
+            ) if self.invalidations else None,
+            'max_invalidation_lag': round(self.lag_max, 4)
+        }
+
+
+class NearCache:
+    """
+    A bounded, process wide LRU of values read from tenant caches, kept
+    for at most `ttl` seconds. Entries are keyed by the tenant cache alias
+    along with the key made by the wrapped cache, and values are kept
+    pickled, so that every hit gets its own copy which the caller is free
+    to mutate.
+
+    Writes through a `NearCachedCache` drop the written keys locally and
+    queue them up for the invalidation channel, so that every other worker
+    (on any node) drops them too. The queued keys are published off the
+    request path, in a single message every `publish_interval` seconds, so
+    that the channel carries a bounded number of messages however hot the
+    writes get. A value read from the remote cache is only stored if no
+    invalidation happened while it was being read, so a concurrent write
+    can't be shadowed by the value it replaced.
+
+    Other workers may serve a value for up to `ttl` seconds after it was
+    written, whenever its invalidation is delayed or lost.
+    """
+
+    def __init__(self, max_entries=1024, ttl=5, template_aliases=None,
+                 publish_interval=0.5):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._publish_interval = publish_interval
+        self.template_aliases = template_aliases
+
+        # (cache alias, made key) -> (pickled value, expires at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._invalidation_seq = 0
+
+        # cache alias -> _NearCacheStats
+        self._stats = {}
+        self._is_subscribed = False
+
+        # cache alias -> made keys to be published, None for every key
+        self._pending = {}
+        self._pending_since = None
+        self._publisher = None
+        self._stop_event = threading.Event()
+
+    @property
+    def channel_name(self):
+        return join_keys(
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            NEAR_CACHE_CHANNEL_KEY
+        )
+
+    def is_enabled_for(self, template_alias):
+        return self.template_aliases is None \
+            or template_alias in self.template_aliases
+
+    def wrap(self, cache_alias, cache):
+        return NearCachedCache(self, cache_alias, cache)
+
+    def _get_stats(self, cache_alias):
+        # expected to be called with the lock held.
+        stats = self._stats.get(cache_alias)
+        if stats is None:
+            stats = self._stats[cache_alias] = _NearCacheStats()
+
+        return stats
+
+    def lookup(self, cache_alias, made_key):
+        """
+        Returns the cached value or `_MISSING`, along with the
+        invalidation sequence to be passed on to `store` after a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((cache_alias, made_key))
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end((cache_alias, made_key))
+                self._get_stats(cache_alias).hits += 1
+                pickled_value = entry[0]
+            else:
+                if entry is not None:
+                    del self._entries[(cache_alias, made_key)]
+
+                self._get_stats(cache_alias).misses += 1
+                return _MISSING, self._invalidation_seq
+
+        return pickle.loads(pickled_value), None
+
+    def store(self, cache_alias, made_key, value, invalidation_seq):
+        try:
+            pickled_value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # left to be read from the wrapped cache every time.
+            return
+
+        expires_at = time.monotonic() + self._ttl
+        with self._lock:
+            if invalidation_seq != self._invalidation_seq:
+                return
+
+            self._entries[(cache_alias, made_key)] = (
+                pickled_value, expires_at
+            )
+            self._entries.move_to_end((cache_alias, made_key))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _drop(self, cache_alias, made_keys=None):
+        with self._lock:
+            self._invalidation_seq += 1
+
+            if made_keys is None:
+                for entry_key in [
+                    entry_key for entry_key in self._entries
+                    if entry_key[0] == cache_alias
+                ]:
+                    del self._entries[entry_key]
+            else:
+                for made_key in made_keys:
+                    self._entries.pop((cache_alias, made_key), None)
+
+    def invalidate(self, cache_alias, made_keys=None):
+        """
+        Drops the given keys (or every key) of the cache alias in this
+        worker and queues them to be published to the other workers.
+        """
+        self._drop(cache_alias, made_keys)
+
+        if not settings.TENANT_ROUTER_PUBSUB_ENABLED:
+            # nobody is listening, entries of the other workers expire.
+            return
+
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.time()
+
+            pending_keys = self._pending.get(cache_alias, _MISSING)
+            if made_keys is None or pending_keys is None:
+                self._pending[cache_alias] = None
+            else:
+                if pending_keys is _MISSING:
+                    pending_keys = self._pending[cache_alias] = set()
+
+                pending_keys.update(made_keys)
+                # more keys than a worker can hold, dropping all of them
+                # is cheaper to send.
+                if len(pending_keys) > self._max_entries:
+                    self._pending[cache_alias] = None
+
+            self._start_publisher()
+
+    def _start_publisher(self):
+        # expected to be called with the lock held.
+        if self._publisher is not None or self._stop_event.is_set():
+            return
+
+        self._publisher = threading.Thread(
+            target=self._run_publisher,
+            name='tenant_router_near_cache_publisher',
+            daemon=True
+        )
+        self._publisher.start()
+
+    def _run_publisher(self):
+        while True:
+            # invalidations queued in the meantime go out together.
+            if self._stop_event.wait(self._publish_interval):
+                return
+
+            with self._lock:
+                if not self._pending:
+                    self._publisher = None
+                    return
+
+            self.flush()
+
+    def flush(self):
+        """
+        Publishes the invalidations queued since the last flush to the
+        other workers, in a single message.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            sent_at = self._pending_since
+
+        if not pending:
+            return
+
+        payload = {
+            'proc_uuid': constants.PROC_UUID,
+            'invalidations': {
+                cache_alias: None if made_keys is None else list(made_keys)
+                for cache_alias, made_keys in pending.items()
+            },
+            'sent_at': sent_at
+        }
+        try:
+            pubsub_proxy.publish(self.channel_name, json.dumps(payload))
+        except Exception as e:
+            # the other workers catch up once their entries expire.
+            logger.warning(
+                "Unable to publish near cache invalidations for %s: %s",
+                ', '.join(sorted(pending)), e
+            )
+
+    def stop(self):
+        self._stop_event.set()
+        self.flush()
+
+    def forget(self, cache_alias):
+        self._drop(cache_alias)
+
+    @uuid_filter
+    def on_invalidation(self, event):
+        payload = event.data
+        for cache_alias, made_keys in payload['invalidations'].items():
+            self._drop(cache_alias, made_keys)
+
+        lag = max(0.0, time.time() - payload['sent_at'])
+        with self._lock:
+            for cache_alias in payload['invalidations']:
+                stats = self._get_stats(cache_alias)
+                stats.invalidations += 1
+                stats.lag_total += lag
+                stats.lag_max = max(stats.lag_max, lag)
+
+    def subscribe(self):
+        if self._is_subscribed:
+            return
+
+        pubsub_proxy.subscribe({self.channel_name: self.on_invalidation})
+        self._is_subscribed = True
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                cache_alias: stats.as_dict()
+                for cache_alias, stats in self._stats.items()
+            }
+
+
+class NearCachedCache(BaseCache):
+    """
+    Serves reads of a tenant cache from the `NearCache` and writes through
+    to the wrapped cache. Only writes made through the standard cache API
+    are invalidated, any other attribute is looked up on the wrapped
+    cache.
+    """
+
+    def __init__(self, near_cache, cache_alias, cache):
+        # BaseCache.__init__ is skipped on purpose, its attributes are
+        # those of the wrapped cache.
+        self._near_cache = near_cache
+        self._cache_alias = cache_alias
+        self._cache = cache
+
+    def __getattr__(self, name):
+        if name == '_cache':
+            raise AttributeError(name)
+
+        return getattr(self._cache, name)
+
+    def make_key(self, key, version=None):
+        return self._cache.make_key(key, version)
+
+    def get(self, key, default=None, version=None):
+        made_key = self._cache.make_key(key, version)
+        value, invalidation_seq = self._near_cache.lookup(
+            self._cache_alias, made_key
+        )
+        if value is not _MISSING:
+            return value
+
+        value = self._cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+
+        self._near_cache.store(
+            self._cache_alias, made_key, value, invalidation_seq
+        )
+        return value
+
+    def get_many(self, keys, version=None):
+        found_dict = {}
+        missing_keys = []
+        invalidation_seqs = {}
+
+        for key in keys:
+            made_key = self._cache.make_key(key, version)
+            value, invalidation_seq = self._near_cache.lookup(
+                self._cache_alias, made_key
+            )
+            if value is _MISSING:
+                missing_keys.append(key)
+                invalidation_seqs[key] = (made_key, invalidation_seq)
+            else:
+                found_dict[key] = value
+
+        if missing_keys:
+            fetched_dict = self._cache.get_many(missing_keys, version=version)
+            for key, value in fetched_dict.items():
+                made_key, invalidation_seq = invalidation_seqs[key]
+                self._near_cache.store(
+                    self._cache_alias, made_key, value, invalidation_seq
+                )
+            found_dict.update(fetched_dict)
+
+        return found_dict
+
+    def has_key(self, key, version=None):
+        value, _ = self._near_cache.lookup(
+            self._cache_alias, self._cache.make_key(key, version)
+        )
+        return value is not _MISSING or self._cache.has_key(
+            key, version=version
+        )
+
+    def _invalidate(self, keys, version=None):
+        self._near_cache.invalidate(
+            self._cache_alias,
+            [self._cache.make_key(key, version) for key in keys]
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        is_added = self._cache.add(key, value, timeout, version=version)
+        if is_added:
+            self._invalidate((key, ), version)
+
+        return is_added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        result = self._cache.set(key, value, timeout, version=version)
+        self._invalidate((key, ), version)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed_keys = self._cache.set_many(data, timeout, version=version)
+        self._invalidate(data, version)
+        return failed_keys
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        result = self._cache.delete(key, version=version)
+        self._invalidate((key, ), version)
+        return result
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        result = self._cache.delete_many(keys, version=version)
+        self._invalidate(keys, version)
+        return result
+
+    def incr(self, key, delta=1, version=None):
+        value = self._cache.incr(key, delta, version=version)
+        self._invalidate((key, ), version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        value = self._cache.decr(key, delta, version=version)
+        self._invalidate((key, ), version)
+        return value
+
+    def clear(self):
+        result = self._cache.clear()
+        self._near_cache.invalidate(self._cache_alias)
+        return result
+
+    def close(self, **kwargs):
+        return self._cache.close(**kwargs)
@@ -1,8 +1,9 @@
 import logging
 
 from django.core.cache import CacheHandler
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 
-from tenant_router.cache.utils import construct_cache_alias
+from tenant_router.cache.near_cache import NearCachedCache
 from tenant_router.managers.task_local import tls_tenant_manager
 
 
@@ -13,25 +14,64 @@ class TenantAwareCacheHandler(CacheHandler):
 
     def __init__(self, *args, **kwargs):
         self._manager = kwargs.pop('manager')
+        # template aliases are fixed once the template config is read,
+        # which happens before the handler is patched in.
+        self._template_aliases = frozenset(self._manager.template_aliases)
         super().__init__(*args, **kwargs)
 
     def __getitem__(self, alias):
-        tenant_alias = tls_tenant_manager.current_tenant_context.alias
         cache_alias = alias
+        is_tenant_alias = alias in self._template_aliases
 
-        if alias in self._manager.template_aliases:
-            cache_alias = construct_cache_alias(
-                tenant_alias=tenant_alias,
-                template_alias=alias
+        if is_tenant_alias:
+            cache_alias = self._manager.lookup_cache_alias(
+                tls_tenant_manager.current_tenant_context, alias
             )
 
-        logger.debug(
-            "Trying to fetch cache for alias {cache_alias}".format(
-                cache_alias=cache_alias
+        # formatted lazily since this runs on every cache access.
+        logger.debug("Trying to fetch cache for alias %s", cache_alias)
+
+        if not is_tenant_alias:
+            return super().__getitem__(cache_alias)
+
+        if not self._manager.is_namespace_loaded(cache_alias):
+            # fails closed, keys of an earlier namespace could be stale.
+            return self._manager.bypass_cache
+
+        if self._manager.shares_backends:
+            scoped_cache = self._manager.get_scoped_cache(cache_alias)
+            if scoped_cache is not None:
+                return scoped_cache
+
+        cache = super().__getitem__(cache_alias)
+        near_cache = self._manager.near_cache
+        if near_cache is not None and near_cache.is_enabled_for(alias) \
+                and not isinstance(cache, NearCachedCache):
+            # the wrapped cache replaces the backend in the thread's
+            # caches, so that it's only wrapped once.
+            cache = self._caches.caches[cache_alias] = \
+                near_cache.wrap(cache_alias, cache)
+
+        return cache
+
+    def get_or_set(self, alias, key, compute, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        """
+        Returns the value of `key` in the cache of `alias`, computing it
+        with `compute` on a miss. Concurrent misses are coalesced into a
+        single call to `compute` and hot keys are refreshed ahead of their
+        expiry. Values are stored in an envelope, so keys set here are
+        expected to be read only through this method.
+        """
+        cache_alias = alias
+        if alias in self._template_aliases:
+            cache_alias = self._manager.lookup_cache_alias(
+                tls_tenant_manager.current_tenant_context, alias
             )
-        )
 
-        return super().__getitem__(cache_alias)
+        return self._manager.single_flight.get_or_set(
+            cache_alias, self[alias], key, compute, timeout, version
+        )
 
     def __delitem__(self, key):
         logger.debug(
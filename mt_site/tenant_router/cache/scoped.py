@@ -0,0 +1,169 @@
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+
+# config keys which are applied per tenant by `TenantScopedCache` and
+# hence don't stop tenants from sharing a backend.
+TENANT_SCOPED_KEYS = ('KEY_PREFIX', 'VERSION', 'KEY_FUNCTION', 'TIMEOUT')
+
+# backends which can safely be used by several threads at once. Others
+# keep a backend per thread even when backends are shared.
+THREAD_SAFE_BACKENDS = frozenset({
+    'django_redis.cache.RedisCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def _get_raw_key(key, key_prefix, version):
+    # keys reach the shared backend fully made by `TenantScopedCache`.
+    return key
+
+
+def is_shareable(cache_config, thread_safe_backends=THREAD_SAFE_BACKENDS):
+    return cache_config.get('BACKEND') in thread_safe_backends
+
+
+def get_shared_backend_key(cache_config):
+    location = cache_config.get('LOCATION', '')
+    if isinstance(location, list):
+        location = tuple(location)
+
+    return repr((
+        cache_config['BACKEND'],
+        location,
+        sorted(cache_config.get('OPTIONS', {}).items())
+    ))
+
+
+def create_shared_backend(cache_config):
+    params = {
+        key: value for key, value in cache_config.items()
+        if key not in TENANT_SCOPED_KEYS
+    }
+    params['KEY_FUNCTION'] = _get_raw_key
+    backend_cls = import_string(params.pop('BACKEND'))
+    return backend_cls(params.pop('LOCATION', ''), params)
+
+
+class TenantScopedCache(BaseCache):
+    """
+    A cache of a single tenant on top of a backend shared by every tenant
+    whose config points at the same server. Keys are made with the
+    tenant's own key prefix (which always starts with its cache alias),
+    version and key function before being handed over to the shared
+    backend, which stores them as is, and the tenant's timeout applies
+    when none is given.
+
+    Only the standard cache API is supported. Since the backend is shared
+    across threads, it has to be thread safe, like the `django_redis`
+    backend (see `is_shareable`).
+    """
+
+    def __init__(self, backend, backend_key, cache_alias, cache_config):
+        key_prefix = cache_config.get('KEY_PREFIX', '')
+        super().__init__({
+            **cache_config,
+            'KEY_PREFIX': '{cache_alias}:{key_prefix}'.format(
+                cache_alias=cache_alias,
+                key_prefix=key_prefix
+            ) if key_prefix else cache_alias
+        })
+        self.backend = backend
+        self.backend_key = backend_key
+
+    def _get_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.add(
+            self.make_key(key, version), value, self._get_timeout(timeout)
+        )
+
+    def get(self, key, default=None, version=None):
+        return self.backend.get(self.make_key(key, version), default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.set(
+            self.make_key(key, version), value, self._get_timeout(timeout)
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.touch(
+            self.make_key(key, version), self._get_timeout(timeout)
+        )
+
+    def delete(self, key, version=None):
+        return self.backend.delete(self.make_key(key, version))
+
+    def get_many(self, keys, version=None):
+        scoped_keys = {self.make_key(key, version): key for key in keys}
+        return {
+            scoped_keys[scoped_key]: value
+            for scoped_key, value in self.backend.get_many(
+                scoped_keys
+            ).items()
+        }
+
+    def has_key(self, key, version=None):
+        return self.backend.has_key(self.make_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        return self.backend.incr(self.make_key(key, version), delta)
+
+    def decr(self, key, delta=1, version=None):
+        return self.backend.decr(self.make_key(key, version), delta)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        scoped_keys = {self.make_key(key, version): key for key in data}
+        failed_keys = self.backend.set_many(
+            {
+                scoped_key: data[key]
+                for scoped_key, key in scoped_keys.items()
+            },
+            self._get_timeout(timeout)
+        )
+        return [
+            scoped_keys.get(scoped_key, scoped_key)
+            for scoped_key in failed_keys or ()
+        ]
+
+    def delete_many(self, keys, version=None):
+        return self.backend.delete_many(
+            [self.make_key(key, version) for key in keys]
+        )
+
+    def clear(self):
+        # clearing the shared backend would wipe out every tenant, so only
+        # the keys of this tenant are deleted where the backend supports
+        # patterns, of every namespace rather than leaving earlier ones
+        # to age out.
+        if hasattr(self.backend, 'delete_pattern'):
+            get_key_patterns = getattr(
+                self.key_func, 'get_key_patterns', None
+            )
+            if get_key_patterns is None:
+                key_patterns = [self.key_func('*', self.key_prefix, '*')]
+            else:
+                key_patterns = get_key_patterns(self.key_prefix)
+
+            return sum(
+                self.backend.delete_pattern(key_pattern) or 0
+                for key_pattern in key_patterns
+            )
+
+        # otherwise the tenant is moved to a new namespace, leaving its
+        # keys to age out.
+        bump_namespace = getattr(self.key_func, 'bump_namespace', None)
+        if bump_namespace is None:
+            raise NotImplementedError(
+                "Clearing a tenant's cache requires a shared backend which "
+                "supports 'delete_pattern' or a namespaced key function."
+            )
+
+        bump_namespace()
+
+    def close(self, **kwargs):
+        # the shared backend outlives the request, it's closed once no
+        # scoped cache refers to it any longer.
+        pass
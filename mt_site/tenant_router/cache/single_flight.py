@@ -0,0 +1,279 @@
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from tenant_router.exceptions import SingleFlightError
+
+
+logger = logging.getLogger(__name__)
+
+
+ENVELOPE_MARKER = '__single_flight__'
+LOCK_KEY_SUFFIX = ':single_flight_lock'
+
+# deletes the lock only if it still holds the given token.
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _get_redis_client(cache):
+    """
+    Returns the `django_redis` client behind the cache (the backend it
+    shares for scoped caches), or None for any other backend.
+    """
+    backend = getattr(cache, 'backend', cache)
+    client = getattr(backend, 'client', None)
+    if not (hasattr(client, 'get_client') and hasattr(client, 'encode')):
+        return None
+
+    return client
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'exc')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.exc = None
+
+
+class _SingleFlightStats:
+    __slots__ = (
+        'hits', 'coalesced', 'recomputed', 'early_refreshes',
+        'early_refresh_failures', 'lock_waits', 'lock_timeouts'
+    )
+
+    def __init__(self):
+        for attr in self.__slots__:
+            setattr(self, attr, 0)
+
+    def as_dict(self):
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class SingleFlight:
+    """
+    Computes cache values at most once at a time per key. Values are
+    stored in an envelope along with the time it took to compute them and
+    their expiry, which is used to refresh hot keys a little ahead of
+    their expiry (probabilistic early expiration, with `beta` scaling how
+    early), so that most reads never see a miss.
+
+    On a miss, concurrent callers in the process wait for a single
+    computation, and across processes the computing caller holds a lock
+    in the cache itself (added with a `lock_timeout`) while the others
+    poll for the value. An early refresh never waits: when the lock is
+    already taken, or the refresh fails, the current value is returned.
+    """
+
+    def __init__(self, lock_timeout=10, beta=1.0, poll_interval=0.05):
+        self._lock_timeout = lock_timeout
+        self._beta = beta
+        self._poll_interval = poll_interval
+
+        # (cache alias, made key) -> _Flight
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        # cache alias -> _SingleFlightStats
+        self._stats = {}
+
+    def _incr(self, cache_alias, counter):
+        with self._lock:
+            stats = self._stats.get(cache_alias)
+            if stats is None:
+                stats = self._stats[cache_alias] = _SingleFlightStats()
+
+            setattr(stats, counter, getattr(stats, counter) + 1)
+
+    @staticmethod
+    def _read(cache, key, version):
+        envelope = cache.get(key, version=version)
+        if isinstance(envelope, dict) and envelope.get(ENVELOPE_MARKER):
+            return envelope
+
+        return None
+
+    def _should_refresh_early(self, envelope):
+        if envelope['expiry'] is None:
+            return False
+
+        # 1 - random() lies in (0, 1], keeping log away from 0.
+        return time.time() - envelope['delta'] * self._beta * math.log(
+            1 - random.random()
+        ) >= envelope['expiry']
+
+    def _compute_and_set(self, cache_alias, cache, key, compute, timeout,
+                         version):
+        st_time = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - st_time
+
+        cache.set(
+            key,
+            {
+                ENVELOPE_MARKER: 1,
+                'value': value,
+                'delta': delta,
+                'expiry': None if timeout is None else time.time() + timeout
+            },
+            timeout,
+            version=version
+        )
+        self._incr(cache_alias, 'recomputed')
+        return value
+
+    def _acquire(self, cache, lock_key, version):
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, self._lock_timeout, version=version):
+            return token
+
+        return None
+
+    @staticmethod
+    def _release(cache, lock_key, token, version):
+        # the lock may have expired and been taken over in the meantime,
+        # so it's only deleted if it still holds the token.
+        client = _get_redis_client(cache)
+        if client is not None:
+            try:
+                redis_client = client.get_client(write=True)
+            except NotImplementedError:
+                # sharded clients pick a server per key.
+                redis_client = None
+
+            if redis_client is not None:
+                # shared backends store the keys made by the scoped cache
+                # as is, so the made key is the key in redis either way.
+                redis_client.eval(
+                    RELEASE_SCRIPT, 1,
+                    cache.make_key(lock_key, version), client.encode(token)
+                )
+                return
+
+        # not atomic, a lock taken over between the two calls is deleted.
+        if cache.get(lock_key, version=version) == token:
+            cache.delete(lock_key, version=version)
+
+    def _refresh_early(self, cache_alias, cache, key, envelope, compute,
+                       timeout, version):
+        lock_key = key + LOCK_KEY_SUFFIX
+        token = self._acquire(cache, lock_key, version)
+        if token is None:
+            return envelope['value']
+
+        self._incr(cache_alias, 'early_refreshes')
+        try:
+            return self._compute_and_set(
+                cache_alias, cache, key, compute, timeout, version
+            )
+        except Exception:
+            # the current value is still good until its expiry.
+            logger.exception(
+                "Failed to refresh %s in %s ahead of its expiry",
+                key, cache_alias
+            )
+            self._incr(cache_alias, 'early_refresh_failures')
+            return envelope['value']
+        finally:
+            self._release(cache, lock_key, token, version)
+
+    def _fill(self, cache_alias, cache, key, compute, timeout, version):
+        lock_key = key + LOCK_KEY_SUFFIX
+        deadline = time.monotonic() + self._lock_timeout
+
+        while True:
+            token = self._acquire(cache, lock_key, version)
+            if token is not None:
+                try:
+                    return self._compute_and_set(
+                        cache_alias, cache, key, compute, timeout, version
+                    )
+                finally:
+                    self._release(cache, lock_key, token, version)
+
+            time.sleep(self._poll_interval)
+            envelope = self._read(cache, key, version)
+            if envelope is not None:
+                self._incr(cache_alias, 'lock_waits')
+                return envelope['value']
+
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    "Timed out waiting for %s to be computed in %s, "
+                    "computing it without the lock", key, cache_alias
+                )
+                self._incr(cache_alias, 'lock_timeouts')
+                return self._compute_and_set(
+                    cache_alias, cache, key, compute, timeout, version
+                )
+
+    def get_or_set(self, cache_alias, cache, key, compute,
+                   timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = cache.default_timeout
+
+        if timeout is not None and timeout <= 0:
+            # nothing would be cached anyway.
+            return compute()
+
+        envelope = self._read(cache, key, version)
+        if envelope is not None:
+            if not self._should_refresh_early(envelope):
+                self._incr(cache_alias, 'hits')
+                return envelope['value']
+
+            return self._refresh_early(
+                cache_alias, cache, key, envelope, compute, timeout, version
+            )
+
+        flight_key = (cache_alias, cache.make_key(key, version))
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[flight_key] = _Flight()
+
+        if not is_leader:
+            self._incr(cache_alias, 'coalesced')
+            if not flight.event.wait(self._lock_timeout):
+                return self._fill(
+                    cache_alias, cache, key, compute, timeout, version
+                )
+
+            if flight.exc is not None:
+                # raised afresh in every waiter, tracebacks of a shared
+                # exception would pile up across threads.
+                raise SingleFlightError(cache_alias, key) from flight.exc
+
+            return flight.value
+
+        try:
+            flight.value = self._fill(
+                cache_alias, cache, key, compute, timeout, version
+            )
+            return flight.value
+        except Exception as e:
+            flight.exc = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.event.set()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                cache_alias: stats.as_dict()
+                for cache_alias, stats in self._stats.items()
+            }
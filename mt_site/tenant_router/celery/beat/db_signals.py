@@ -37,9 +37,10 @@ def periodic_task_normalizer(sender, **kwargs):
     tenant_context = tls_tenant_manager.current_tenant_context
 
     if not _is_valid_schedule_name(instance.name):
+        # schedule names are arbitrary (and often one-off), so they're
+        # built directly rather than memoized on the tenant context.
         instance.name = construct_schedule_name(
-            tenant_alias=tenant_context.alias,
-            schedule_name=instance.name
+            tenant_context.alias, instance.name
         )
 
     headers = json.loads(instance.headers)
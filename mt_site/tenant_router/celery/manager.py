@@ -33,8 +33,7 @@ class _CeleryManager:
 
                 for tenant_context in tenant_context_manager.all():
                     final_schedule_name = construct_schedule_name(
-                        tenant_alias=tenant_context.alias,
-                        schedule_name=schedule_name
+                        tenant_context.alias, schedule_name
                     )
 
                     copy_schedule_dict = deepcopy(schedule_dict)
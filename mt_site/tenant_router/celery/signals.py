@@ -10,6 +10,7 @@ from tenant_router.bootstrap import on_worker_init, on_worker_exit
 from tenant_router.event_queue.manager import event_queue_manager
 from tenant_router.managers.tenant_context import tenant_context_manager
 from tenant_router.orm_backends.core import orm_managers
+from tenant_router.orm_backends.django_orm.replicas import reset_read_your_writes
 from tenant_router.managers.task_local import tls_tenant_manager
 
 
@@ -59,6 +60,7 @@ def task_pre_run_handler(**kwargs):
     )
 
     event_queue_manager.process_queue()
+    reset_read_your_writes()
 
     tls_tenant_manager.push_tenant_context(
         tenant_context_manager.get_by_id(
@@ -71,3 +73,6 @@ def task_pre_run_handler(**kwargs):
 def task_post_run_handler(**kwargs):
     logger.debug("Celery signal task_postrun fired")
     event_queue_manager.process_queue()
+
+    for orm_manager in orm_managers:
+        orm_manager.drain_retired_connections()
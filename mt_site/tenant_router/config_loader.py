@@ -14,9 +14,7 @@ class _TenantConfigLoader:
             )
 
     def _load_tenant_metadata(self, config_json):
-        from tenant_router.orm_backends.utils import (
-            ORM_CONFIG_PREFIX_KEY, construct_conn_alias
-        )
+        from tenant_router.orm_backends.utils import ORM_CONFIG_PREFIX_KEY
         from tenant_router.managers.tenant_context import TENANT_IDS_KEY
 
         all_tenant_metadata = config_json.get(constants.TENANT_METADATA, None)
@@ -25,7 +23,7 @@ class _TenantConfigLoader:
             final_config = {}
 
             for tenant_id, tenant_metadata in all_tenant_metadata.items():
-                tenant_alias = TenantContext.from_id(tenant_id).alias
+                tenant_context = TenantContext.from_id(tenant_id)
 
                 for service_name, service_config in tenant_metadata.items():
                     for component_name, component_config in service_config.items():
@@ -33,10 +31,8 @@ class _TenantConfigLoader:
                         if component_name == ORM_CONFIG_PREFIX_KEY:
                             for orm_key, orm_config in component_config.items():
                                 for template_alias, db_config in orm_config.items():
-                                    conn_alias = construct_conn_alias(
-                                        tenant_alias=tenant_alias,
-                                        orm_key=orm_key,
-                                        template_alias=template_alias
+                                    conn_alias = tenant_context.get_conn_alias(
+                                        orm_key, template_alias
                                     )
 
                                     final_config[conn_alias] = db_config
@@ -1,10 +1,7 @@
 from contextlib import ContextDecorator
 
 from tenant_router.schemas import TenantContext
-from tenant_router.managers.tenant_context import (
-    tenant_context_manager,
-    TenantContextNotFound
-)
+from tenant_router.managers.tenant_context import tenant_context_manager
 from tenant_router.managers.task_local import tls_tenant_manager
 
 
@@ -22,17 +19,7 @@ class tenant_context_bind(ContextDecorator):
         if isinstance(tenant_identifier, TenantContext):
             context = tenant_identifier
         else:
-            try:
-                context = tenant_context_manager.get_by_id(
-                    tenant_id=tenant_identifier
-                )
-            except TenantContextNotFound:
-                try:
-                    context = tenant_context_manager.get_by_alias(
-                        tenant_alias=tenant_identifier
-                    )
-                except TenantContextNotFound:
-                    raise
+            context = tenant_context_manager.resolve(tenant_identifier)
 
         return context
 
@@ -34,3 +34,47 @@ class DeconstructionError(Exception):
             schema=schema
         )
         super().__init__(exc_msg)
+
+
+class CircuitOpenError(Exception):
+    exc_msg_template = (
+        "The database for alias {conn_alias} is unavailable. Connection "
+        "attempts are suspended for another {retry_after:.0f}s."
+    )
+
+    def __init__(self, conn_alias, retry_after):
+        self.conn_alias = conn_alias
+        self.retry_after = retry_after
+        super().__init__(
+            self.exc_msg_template.format(
+                conn_alias=conn_alias,
+                retry_after=retry_after
+            )
+        )
+
+
+class CacheNamespaceUnavailableError(Exception):
+    exc_msg_template = (
+        "The cache namespace of alias {cache_alias} hasn't been read from "
+        "the config store yet."
+    )
+
+    def __init__(self, cache_alias):
+        self.cache_alias = cache_alias
+        super().__init__(
+            self.exc_msg_template.format(cache_alias=cache_alias)
+        )
+
+
+class SingleFlightError(Exception):
+    exc_msg_template = (
+        "Computing {key} in {cache_alias} failed in the caller it was "
+        "waiting on."
+    )
+
+    def __init__(self, cache_alias, key):
+        self.cache_alias = cache_alias
+        self.key = key
+        super().__init__(
+            self.exc_msg_template.format(cache_alias=cache_alias, key=key)
+        )
@@ -6,7 +6,7 @@ from django.core.management.commands.migrate import Command as MigrateCommand
 from tenant_router.context_decorators import tenant_context_bind
 from tenant_router.managers import tenant_context_manager
 from tenant_router.managers.tenant_context import TenantContextNotFound
-from tenant_router.orm_backends.utils import construct_conn_alias, deconstruct_conn_alias
+from tenant_router.orm_backends.utils import deconstruct_conn_alias
 
 
 class Command(MigrateCommand):
@@ -60,18 +60,18 @@ class Command(MigrateCommand):
                         "to proceed."
                     )
 
-                conn_alias = construct_conn_alias(
-                    tenant_alias=self._get_tenant_context(tenant_id).alias,
-                    orm_key=self.manager.ORM_KEY,
-                    template_alias=db_alias
-                )
+                conn_alias = self._get_tenant_context(
+                    tenant_id
+                ).get_conn_alias(self.manager.ORM_KEY, db_alias)
                 options["database"] = conn_alias
+                self.manager.ensure_schema(conn_alias)
 
                 with tenant_context_bind(tenant_id):
                     super().handle(*args, **options)
 
             elif db_alias in self.manager.conn_aliases:
                 tenant_alias, _, _ = deconstruct_conn_alias(db_alias)
+                self.manager.ensure_schema(db_alias)
                 with tenant_context_bind(tenant_alias):
                     super().handle(*args, **options)
 
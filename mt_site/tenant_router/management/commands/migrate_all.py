@@ -1,8 +1,10 @@
 import os
+from collections import Counter
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
 from tenant_router.managers import tenant_context_manager
+from tenant_router.orm_backends.base.migration_assistant import MigrationResult
 from tenant_router.orm_backends.core import orm_managers
 
 
@@ -27,6 +29,105 @@ class Command(BaseCommand):
             help="Excludes 'reserved aliases' from migration. Currently "
                  "pertains only to the 'django orm'"
         )
+        parser.add_argument(
+            "--workers", type=int,
+            help="Number of tenants migrated in parallel. Overrides the "
+                 "'workers' option of the migration asst, if any."
+        )
+        parser.add_argument(
+            "--max-per-server", type=int,
+            help="Maximum number of migrations run in parallel against a "
+                 "single database server."
+        )
+        parser.add_argument(
+            "--force", action='store_true',
+            help="Runs migrate even for tenants whose databases are already "
+                 "up to date."
+        )
+        parser.add_argument(
+            "--canary", action='append', dest='canary_tenant_ids',
+            help="Tenant to be migrated before all others as part of a staged "
+                 "rollout. Can be specified multiple times."
+        )
+        parser.add_argument(
+            "--wave-size", type=int,
+            help="Number of tenants in the first wave of a staged rollout."
+        )
+        parser.add_argument(
+            "--wave-growth", type=float,
+            help="Factor by which every subsequent wave of a staged rollout "
+                 "grows."
+        )
+        parser.add_argument(
+            "--max-failure-rate", type=float,
+            help="Failure rate (between 0 and 1) of a wave above which a "
+                 "staged rollout is halted."
+        )
+        parser.add_argument(
+            "--rollout-id", type=str,
+            help="Identifier under which the progress of a staged rollout is "
+                 "persisted. Defaults to a fingerprint of the migrations on disk."
+        )
+        parser.add_argument(
+            "--resume-rollout", action='store_true',
+            help="Resumes a halted staged rollout, keeping its persisted "
+                 "progress."
+        )
+        parser.add_argument(
+            "--restart-rollout", action='store_true',
+            help="Discards the persisted progress of the staged rollout and "
+                 "starts over."
+        )
+
+    def _write_progress(self, result, completed, total):
+        line = "[{completed}/{total}] {tenant_id} ({db_alias}): " \
+               "{status} in {elapsed:.2f}s".format(
+                   completed=completed,
+                   total=total,
+                   tenant_id=result.tenant_id or '-',
+                   db_alias=result.db_alias,
+                   status=result.status,
+                   elapsed=result.elapsed
+               )
+
+        if result.failed:
+            self.stderr.write(line)
+            self.stderr.write(result.error)
+        elif result.status == MigrationResult.MIGRATED:
+            self.stdout.write(self.style.SUCCESS(line))
+        else:
+            self.stdout.write(line)
+
+    def _write_summary(self, results):
+        counts = Counter(result.status for result in results)
+        rows = [
+            (status, counts.get(status, 0))
+            for status in (
+                MigrationResult.MIGRATED,
+                MigrationResult.UP_TO_DATE,
+                MigrationResult.FAILED,
+                MigrationResult.HALTED
+            )
+        ]
+        rows.append(('total', len(results)))
+
+        self.stdout.write("\n{:<12} {:>8}".format('status', 'count'))
+        self.stdout.write("{:<12} {:>8}".format('-' * 12, '-' * 8))
+        for status, count in rows:
+            self.stdout.write("{:<12} {:>8}".format(status, count))
+
+        failed_results = [result for result in results if result.failed]
+        if failed_results:
+            self.stdout.write("\nFailed:")
+            for result in failed_results:
+                self.stdout.write(
+                    "  {tenant_id} ({db_alias})".format(
+                        tenant_id=result.tenant_id or '-',
+                        db_alias=result.db_alias
+                    )
+                )
+
+        return len(failed_results)
 
     def handle(self, *args, **options):
         tenant_id = options["tenant_id"] or os.getenv("TENANT_ID")
@@ -39,9 +140,39 @@ class Command(BaseCommand):
                 tenant_context_manager.get_tenant_ids()
             )
 
+        results = []
         for orm_manager in orm_managers:
             if orm_manager.migration_asst:
-                orm_manager.migration_asst.perform_migrate(
-                    tenant_ids_to_migrate,
-                    exclude_reserved_aliases=exclude_reserved_aliases
+                results.extend(
+                    orm_manager.migration_asst.perform_migrate(
+                        tenant_ids_to_migrate,
+                        progress_callback=self._write_progress,
+                        exclude_reserved_aliases=exclude_reserved_aliases,
+                        workers=options["workers"],
+                        max_per_server=options["max_per_server"],
+                        skip_up_to_date=not options["force"],
+                        canary_tenant_ids=options["canary_tenant_ids"],
+                        wave_size=options["wave_size"],
+                        wave_growth=options["wave_growth"],
+                        max_failure_rate=options["max_failure_rate"],
+                        rollout_id=options["rollout_id"],
+                        resume_rollout=options["resume_rollout"],
+                        restart_rollout=options["restart_rollout"]
+                    ) or []
+                )
+
+        failed_count = self._write_summary(results)
+        if any(
+                result.status == MigrationResult.HALTED for result in results
+        ):
+            raise CommandError(
+                "Rollout halted. Re-run the command with '--resume-rollout' "
+                "to resume it."
+            )
+
+        if failed_count:
+            raise CommandError(
+                "Migration failed for {failed_count} database(s)".format(
+                    failed_count=failed_count
                 )
+            )
@@ -0,0 +1,110 @@
+import json
+import os
+
+from django.core.management import BaseCommand
+
+from tenant_router.managers import tenant_context_manager
+from tenant_router.orm_backends.core import orm_managers
+
+
+class Command(BaseCommand):
+    help = "Reports the count of pending migrations per app for every tenant."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tenant-id", type=str,
+            help="Reports only on the databases of the specified tenant. Can "
+                 "also be specified by the environment variable 'TENANT_ID'"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=16,
+            help="Number of tenant databases queried in parallel. "
+                 "(default: 16)"
+        )
+        parser.add_argument(
+            "--format", choices=('table', 'json'), default='table',
+            help="Output format. (default: table)"
+        )
+        parser.add_argument(
+            "--all", action='store_true', dest='include_up_to_date',
+            help="Includes tenants which are up to date in the output."
+        )
+
+    def _collect_status(self, tenant_ids, workers, include_up_to_date):
+        final_status_dict = {}
+
+        for orm_key, orm_manager in orm_managers.items():
+            if not orm_manager.migration_asst:
+                continue
+
+            status_dict = orm_manager.migration_asst.get_migration_status(
+                tenant_ids, workers=workers
+            )
+            for tenant_id, status in status_dict.items():
+                if include_up_to_date \
+                        or status['pending'] or status['error']:
+                    final_status_dict.setdefault(
+                        tenant_id, {}
+                    )[orm_key] = status
+
+        return final_status_dict
+
+    def _write_table(self, status_dict):
+        columns = sorted({
+            (orm_key, app_label)
+            for orm_status_dict in status_dict.values()
+            for orm_key, status in orm_status_dict.items()
+            for app_label in status['pending']
+        })
+
+        tenant_width = max(
+            [len('tenant')] + [len(tenant_id) for tenant_id in status_dict]
+        )
+        headers = ['tenant'.ljust(tenant_width)] + [
+            app_label for _, app_label in columns
+        ] + ['error']
+        self.stdout.write('  '.join(headers))
+
+        for tenant_id in sorted(status_dict):
+            orm_status_dict = status_dict[tenant_id]
+            row = [tenant_id.ljust(tenant_width)]
+
+            for orm_key, app_label in columns:
+                pending_count = orm_status_dict.get(
+                    orm_key, {}
+                ).get('pending', {}).get(app_label, 0)
+                row.append(str(pending_count).rjust(len(app_label)))
+
+            row.append('; '.join(
+                status['error'] for status in orm_status_dict.values()
+                if status['error']
+            ))
+            line = '  '.join(row).rstrip()
+
+            if any(status['error'] for status in orm_status_dict.values()):
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        self.stdout.write(
+            "\n{count} tenant(s) listed".format(count=len(status_dict))
+        )
+
+    def handle(self, *args, **options):
+        tenant_id = options["tenant_id"] or os.getenv("TENANT_ID")
+
+        if tenant_id:
+            tenant_ids = (tenant_id, )
+        else:
+            tenant_ids = tuple(tenant_context_manager.get_tenant_ids())
+
+        status_dict = self._collect_status(
+            tenant_ids,
+            workers=options["workers"],
+            include_up_to_date=options["include_up_to_date"]
+        )
+
+        if options["format"] == 'json':
+            self.stdout.write(json.dumps(status_dict, sort_keys=True))
+        else:
+            self._write_table(status_dict)
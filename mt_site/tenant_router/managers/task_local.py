@@ -4,8 +4,11 @@ from tenant_router.schemas import TenantContext
 
 class _TLSTenantManager:
 
+    # The stack is an immutable tuple which is replaced on every
+    # push/pop. A mutable default would be shared by every thread
+    # and every asyncio task that hasn't set the var yet.
     _tenant_context_var = contextvars.ContextVar(
-        'tenant_id_ctx_var', default=[TenantContext.from_id("__base__")]
+        'tenant_id_ctx_var', default=(TenantContext.from_id("__base__"), )
     )
 
     def _get_tenant_stack(self):
@@ -15,10 +18,15 @@ class _TLSTenantManager:
         if not context:
             raise Exception("A context must be specified")
 
-        self._get_tenant_stack().append(context)
+        self._tenant_context_var.set(
+            self._get_tenant_stack() + (context, )
+        )
 
     def pop_tenant_context(self):
-        return self._get_tenant_stack().pop()
+        tenant_stack = self._get_tenant_stack()
+        context = tenant_stack[-1]
+        self._tenant_context_var.set(tenant_stack[:-1])
+        return context
 
     @property
     def current_tenant_context(self):
@@ -1,6 +1,8 @@
 import logging
 import random
+import threading
 from builtins import Exception
+from types import MappingProxyType
 
 from django.core.cache import caches
 
@@ -21,24 +23,77 @@ class TenantContextNotFound(Exception):
 logger = logging.getLogger(__name__)
 
 
+class _TenantRegistrySnapshot:
+    """
+    An immutable, point in time view of all tenant contexts along with
+    the structures derived from them. Snapshots are never mutated once
+    published, so readers can use them without any locking.
+
+    Aliases derived from more than one tenant id (eg: 't1.test.com' and
+    't1-test.com') are left out of the alias index, since they can't be
+    resolved to a single tenant.
+    """
+    __slots__ = ('by_id', 'by_alias', 'ambiguous_aliases', 'ids', 'contexts')
+
+    def __init__(self, tenant_id_to_context_dict):
+        self.by_id = MappingProxyType(tenant_id_to_context_dict)
+
+        alias_to_context_dict = {}
+        ambiguous_aliases = set()
+        for tenant_context in tenant_id_to_context_dict.values():
+            current_context = alias_to_context_dict.setdefault(
+                tenant_context.alias, tenant_context
+            )
+            if current_context is not tenant_context:
+                ambiguous_aliases.add(tenant_context.alias)
+
+        for tenant_alias in ambiguous_aliases:
+            alias_to_context_dict.pop(tenant_alias)
+            logger.error(
+                "Tenant ids %s share the alias '%s', which won't resolve "
+                "to any of them",
+                sorted(
+                    tenant_context.id
+                    for tenant_context in tenant_id_to_context_dict.values()
+                    if tenant_context.alias == tenant_alias
+                ),
+                tenant_alias
+            )
+
+        self.by_alias = MappingProxyType(alias_to_context_dict)
+        self.ambiguous_aliases = frozenset(ambiguous_aliases)
+        self.ids = tuple(tenant_id_to_context_dict.keys())
+        self.contexts = tuple(tenant_id_to_context_dict.values())
+
+
 class _TenantContextManager:
     def __init__(self, name):
         self.name = name
-        self._tenant_id_to_context_dict = None
+        self._snapshot = _TenantRegistrySnapshot({})
+        # Serializes writers only. Readers just dereference
+        # `_snapshot` which is swapped atomically.
+        self._write_lock = threading.Lock()
         self._event_handler_dict = {
             TenantLifecycleEvent.ON_TENANT_CREATE: self.on_tenant_create,
             TenantLifecycleEvent.ON_TENANT_DELETE: self.on_tenant_delete
         }
 
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _publish(self, tenant_id_to_context_dict):
+        self._snapshot = _TenantRegistrySnapshot(tenant_id_to_context_dict)
+
     def all(self):
-        return self._tenant_id_to_context_dict.values()
+        return self._snapshot.contexts
 
     def get_tenant_ids(self):
-        return self._tenant_id_to_context_dict.keys()
+        return self._snapshot.ids
 
     def get_by_id(self, tenant_id):
         try:
-            return self._tenant_id_to_context_dict[
+            return self._snapshot.by_id[
                 tenant_id
             ]
         except KeyError:
@@ -48,44 +103,64 @@ class _TenantContextManager:
             )
 
     def get_by_alias(self, tenant_alias):
-        for tenant_context in self.all():
-            if tenant_context.alias == tenant_alias:
-                return tenant_context
+        snapshot = self._snapshot
+        try:
+            return snapshot.by_alias[
+                tenant_alias
+            ]
+        except KeyError:
+            if tenant_alias in snapshot.ambiguous_aliases:
+                raise TenantContextNotFound(
+                    "Alias '{tenant_alias}' is shared by more than one "
+                    "tenant".format(tenant_alias=tenant_alias)
+                )
 
-        raise TenantContextNotFound(
-            "Unable to find tenant context for alias "
-            "'{tenant_alias}'".format(tenant_alias=tenant_alias)
-        )
+            raise TenantContextNotFound(
+                "Unable to find tenant context for alias "
+                "'{tenant_alias}'".format(tenant_alias=tenant_alias)
+            )
 
-    def contains(self, tenant_identifier):
-        try:
-            _ = self.get_by_id(tenant_identifier)
-            result = True
-        except TenantContextNotFound:
-            try:
-                _ = self.get_by_alias(tenant_identifier)
-                result = True
-            except TenantContextNotFound:
-                result = False
+    def resolve(self, tenant_identifier):
+        """
+        Resolves either a tenant id or a tenant alias into the
+        corresponding tenant context.
+        """
+        snapshot = self._snapshot
+        context = snapshot.by_id.get(tenant_identifier)
+        if context is None:
+            context = snapshot.by_alias.get(tenant_identifier)
+
+        if context is None:
+            raise TenantContextNotFound(
+                "Unable to find tenant context for identifier "
+                "'{tenant_identifier}'".format(
+                    tenant_identifier=tenant_identifier
+                )
+            )
+
+        return context
 
-        return result
+    def contains(self, tenant_identifier):
+        snapshot = self._snapshot
+        return (
+            tenant_identifier in snapshot.by_id
+            or tenant_identifier in snapshot.by_alias
+        )
 
     def _init_tenant_contexts(self):
         config_store = caches[constants.CONFIG_STORE_ALIAS]
         tenant_ids = config_store.get(
             TENANT_IDS_KEY, []
         )
-        if not self._tenant_id_to_context_dict:
-            self._tenant_id_to_context_dict = {
-                tenant_id: TenantContext.from_id(tenant_id)
-                for tenant_id in tenant_ids
-            }
+        with self._write_lock:
+            if not self._snapshot.ids:
+                self._publish({
+                    tenant_id: TenantContext.from_id(tenant_id)
+                    for tenant_id in tenant_ids
+                })
 
     def get_random_context(self):
-        random_id = random.choice(
-            tuple(self._tenant_id_to_context_dict.keys())
-        )
-        return self.get_by_id(random_id)
+        return random.choice(self._snapshot.contexts)
 
     @uuid_filter
     def on_tenant_create(self, event):
@@ -98,9 +173,12 @@ class _TenantContextManager:
         payload = event.data
         tenant_id = payload.get("tenant_id", None)
         if tenant_id:
-            self._tenant_id_to_context_dict[
-                tenant_id
-            ] = TenantContext.from_id(tenant_id)
+            with self._write_lock:
+                tenant_id_to_context_dict = dict(self._snapshot.by_id)
+                tenant_id_to_context_dict[
+                    tenant_id
+                ] = TenantContext.from_id(tenant_id)
+                self._publish(tenant_id_to_context_dict)
 
     @uuid_filter
     def on_tenant_delete(self, event):
@@ -113,7 +191,10 @@ class _TenantContextManager:
         payload = event.data
         tenant_id = payload.get("tenant_id", None)
         if tenant_id:
-            self._tenant_id_to_context_dict.pop(tenant_id)
+            with self._write_lock:
+                tenant_id_to_context_dict = dict(self._snapshot.by_id)
+                tenant_id_to_context_dict.pop(tenant_id)
+                self._publish(tenant_id_to_context_dict)
 
     def _perform_tenant_channel_subscription(self):
         tenant_channel_observable.subscribe(
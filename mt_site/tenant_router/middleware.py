@@ -1,11 +1,19 @@
+import math
+import re
+from functools import lru_cache
 from http import HTTPStatus
 
-from django.urls import resolve
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import resolve, get_resolver, URLPattern, URLResolver
+from django.urls.resolvers import RoutePattern
 from django.utils.module_loading import import_string
 from django.http import JsonResponse
 
 from tenant_router.conf import settings
-from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.exceptions import (
+    CircuitOpenError,
+    ImproperlyConfiguredError
+)
 from tenant_router.managers.tenant_context import (
     tenant_context_manager,
     TenantContextNotFound
@@ -15,22 +23,202 @@ from tenant_router.managers.task_local import tls_tenant_manager
 
 WHITELIST_ROUTES = 'WHITELIST_ROUTES'
 TENANT_ID_RESOLVER = 'TENANT_ID_RESOLVER'
+WHITELIST_CACHE_SIZE = 'WHITELIST_CACHE_SIZE'
+
+_DEFAULT_WHITELIST_CACHE_SIZE = 1024
+_NAMED_GROUP_RE = re.compile(r'\(\?P<\w+>')
 
 
 class TenantIdResolveError(Exception):
     pass
 
 
+def _get_func_path(func):
+    # mirrors the way `ResolverMatch` computes `_func_path`
+    if not hasattr(func, '__name__'):
+        return func.__class__.__module__ + '.' + func.__class__.__name__
+
+    return func.__module__ + '.' + func.__name__
+
+
+def _is_match_whitelisted(resolver_match, whitelist_routes):
+    return (
+        resolver_match._func_path in whitelist_routes
+        or resolver_match.url_name in whitelist_routes
+        or resolver_match.route in whitelist_routes
+        or resolver_match.view_name in whitelist_routes
+    )
+
+
+class _RouteWhitelistIndex:
+    """
+    Compiles the whitelisted routes of the URLconf into a single matcher so
+    that most request paths can be classified without calling `resolve`.
+
+    - Whitelisted routes without any converters are stored as exact paths.
+    - Whitelisted routes with converters are folded into one regex which is
+      used as a negative filter i.e. a path which doesn't match it can never
+      resolve to a whitelisted route.
+    - Anything else falls back to `resolve` and the outcome is remembered in
+      a bounded LRU keyed by the path.
+    """
+
+    def __init__(self, whitelist_routes, cache_size, urlconf=None):
+        self._whitelist_routes = whitelist_routes
+        self._resolver = get_resolver(urlconf)
+        self._exact_paths = set()
+        self._route_regexes = []
+        self._can_prefilter = True
+
+        self._collect_routes(self._resolver.url_patterns)
+        self._combined_regex = self._compile_route_regexes()
+
+        self.is_whitelisted = lru_cache(maxsize=cache_size)(
+            self._is_whitelisted
+        )
+
+    def _is_pattern_whitelisted(self, pattern, route, namespaces):
+        url_name = pattern.name
+        func_path = _get_func_path(pattern.callback)
+        view_name = ':'.join(namespaces + [url_name or func_path])
+
+        return (
+            func_path in self._whitelist_routes
+            or url_name in self._whitelist_routes
+            or route in self._whitelist_routes
+            or view_name in self._whitelist_routes
+        )
+
+    def _collect_routes(
+            self, url_patterns, route='', regexes=(), namespaces=()
+    ):
+        for pattern in url_patterns:
+            current_regexes = regexes
+
+            if isinstance(pattern.pattern, RoutePattern) \
+                    and current_regexes is not None:
+                current_regexes = regexes + (pattern.pattern.regex.pattern,)
+            else:
+                # regex and locale prefix patterns can't be flattened
+                # reliably, so routes beneath them always get resolved.
+                current_regexes = None
+
+            current_route = URLResolver._join_route(
+                route, str(pattern.pattern)
+            )
+
+            if isinstance(pattern, URLResolver):
+                self._collect_routes(
+                    pattern.url_patterns,
+                    route=current_route,
+                    regexes=current_regexes,
+                    namespaces=namespaces + (
+                        (pattern.namespace, ) if pattern.namespace else ()
+                    )
+                )
+
+            elif isinstance(pattern, URLPattern) and \
+                    self._is_pattern_whitelisted(
+                        pattern, current_route, list(namespaces)
+                    ):
+                self._add_whitelisted_route(current_regexes)
+
+    def _add_whitelisted_route(self, regexes):
+        if regexes is None:
+            self._can_prefilter = False
+            return
+
+        regex = '^/' + ''.join(
+            regex[1:] if regex.startswith('^') else regex
+            for regex in regexes
+        )
+        path = self._get_exact_path(regex)
+
+        if path is not None and self._resolves_to_whitelisted(path):
+            self._exact_paths.add(path)
+        else:
+            self._route_regexes.append(
+                _NAMED_GROUP_RE.sub('(?:', regex)
+            )
+
+    @staticmethod
+    def _get_exact_path(regex):
+        literal = regex[1:]
+        if literal.endswith('$'):
+            literal = literal[:-1]
+        elif literal.endswith('\\Z'):
+            literal = literal[:-2]
+
+        unescaped = re.sub(r'\\(.)', r'\1', literal)
+        if re.escape(unescaped) != literal:
+            return None
+
+        return unescaped
+
+    def _resolves_to_whitelisted(self, path):
+        # guards against the exact path being shadowed by a
+        # route which appears earlier in the URLconf.
+        try:
+            return _is_match_whitelisted(
+                self._resolver.resolve(path), self._whitelist_routes
+            )
+        except Exception:
+            return False
+
+    def _compile_route_regexes(self):
+        if not self._can_prefilter or not self._route_regexes:
+            return None
+
+        try:
+            return re.compile('|'.join(
+                '(?:{regex})'.format(regex=regex)
+                for regex in self._route_regexes
+            ))
+        except re.error:
+            self._can_prefilter = False
+            return None
+
+    def _is_whitelisted(self, path):
+        if path in self._exact_paths:
+            return True
+
+        if self._can_prefilter and (
+                self._combined_regex is None
+                or not self._combined_regex.match(path)
+        ):
+            return False
+
+        return _is_match_whitelisted(
+            self._resolver.resolve(path), self._whitelist_routes
+        )
+
+
 class TenantContextMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self._is_async = iscoroutinefunction(self.get_response)
+        if self._is_async:
+            # Mark the instance as a coroutine function so that Django
+            # doesn't adapt it with a thread hop under ASGI.
+            markcoroutinefunction(self)
+
         self._whitelist_routes = {
             'tenant_router:tenant_create_view',
             'tenant_router:tenant_detail_view',
-            'tenant_router:tenant_db_health_check'
+            'tenant_router:tenant_db_health_check',
+            'tenant_router:tenant_db_circuit_breaker_state',
+            'tenant_router:tenant_near_cache_stats',
+            'tenant_router:tenant_single_flight_stats'
         }
         # One-time configuration and initialization.
         self._parse_middleware_settings()
+        self._whitelist_index = _RouteWhitelistIndex(
+            self._whitelist_routes,
+            cache_size=self._whitelist_cache_size
+        )
 
     def _set_whitelist_routes(self, routes):
         if not isinstance(routes, set):
@@ -58,6 +246,18 @@ class TenantContextMiddleware:
                     )
                 )
 
+    def _set_whitelist_cache_size(self, cache_size):
+        if not isinstance(cache_size, int) or cache_size < 0:
+            raise ImproperlyConfiguredError(
+                "Expected '{WHITELIST_CACHE_SIZE}' value to be a "
+                "non-negative 'int'. Got {cache_size} instead".format(
+                    cache_size=cache_size,
+                    WHITELIST_CACHE_SIZE=WHITELIST_CACHE_SIZE
+                )
+            )
+
+        self._whitelist_cache_size = cache_size
+
     def _parse_middleware_settings(self):
         settings_dict = settings.TENANT_ROUTER_MIDDLEWARE_SETTINGS
         self._set_whitelist_routes(
@@ -66,22 +266,30 @@ class TenantContextMiddleware:
         self._set_tenant_id_resolver(
             settings_dict.pop(TENANT_ID_RESOLVER, '')
         )
+        self._set_whitelist_cache_size(
+            settings_dict.pop(
+                WHITELIST_CACHE_SIZE, _DEFAULT_WHITELIST_CACHE_SIZE
+            )
+        )
 
-    def _is_route_whitelisted(self, path):
-        resolved_obj = resolve(path)
-        if resolved_obj._func_path in self._whitelist_routes:
-            return True
-
-        if resolved_obj.url_name in self._whitelist_routes:
-            return True
+    def _is_route_whitelisted(self, request):
+        # Re-use the match if some other component has already
+        # resolved the request.
+        resolver_match = getattr(request, 'resolver_match', None)
 
-        if resolved_obj.route in self._whitelist_routes:
-            return True
+        if resolver_match is None:
+            urlconf = getattr(request, 'urlconf', None)
+            if urlconf is None:
+                return self._whitelist_index.is_whitelisted(
+                    request.path_info
+                )
 
-        if resolved_obj.view_name in self._whitelist_routes:
-            return True
+            # per request urlconfs bypass the index.
+            resolver_match = resolve(request.path_info, urlconf=urlconf)
 
-        return False
+        return _is_match_whitelisted(
+            resolver_match, self._whitelist_routes
+        )
 
     def _get_tenant_id(self, request):
         if self._tenant_id_resolver:
@@ -97,37 +305,80 @@ class TenantContextMiddleware:
 
         return tenant_id
 
+    def _get_tenant_context(self, request):
+        """
+        Returns a tuple of the tenant context to be pushed for the request
+        (if any) and an error response to be returned in its place.
+        Performs no I/O so that it can be called from both the sync and the
+        async code paths.
+        """
+        if self._is_route_whitelisted(request):
+            return None, None
+
+        tenant_id = self._get_tenant_id(request)
+        try:
+            return tenant_context_manager.get_by_id(
+                tenant_id=tenant_id
+            ), None
+        except TenantContextNotFound:
+            return None, JsonResponse(
+                {
+                    "err_msg": "Unable to find tenant with id {tenant_id}. "
+                               "Please verify if the tenant still exists in the "
+                               "platform and try again.".format(tenant_id=tenant_id)
+                },
+                status=HTTPStatus.BAD_REQUEST
+            )
+
     def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+
         # Code to be executed for each request before
         # the view (and later middleware) are called.
-        should_clear_ctxt = False
+        tenant_context, error_response = self._get_tenant_context(request)
+        if error_response:
+            return error_response
 
-        if not self._is_route_whitelisted(request.path):
-            tenant_id = self._get_tenant_id(request)
-            try:
-                tls_tenant_manager.push_tenant_context(
-                    tenant_context_manager.get_by_id(
-                        tenant_id=tenant_id
-                    )
-                )
-                should_clear_ctxt = True
-            except TenantContextNotFound:
-                return JsonResponse(
-                    {
-                        "err_msg": "Unable to find tenant with id {tenant_id}. "
-                                   "Please verify if the tenant still exists in the "
-                                   "platform and try again.".format(tenant_id=tenant_id)
-                    },
-                    status=HTTPStatus.BAD_REQUEST
-                )
+        if not tenant_context:
+            return self.get_response(request)
+
+        tls_tenant_manager.push_tenant_context(tenant_context)
+        try:
+            return self.get_response(request)
+        finally:
+            # Code to be executed for each request/response after
+            # the view is called.
+            tls_tenant_manager.pop_tenant_context()
 
-        response = self.get_response(request)
+    async def __acall__(self, request):
+        # The tenant stack lives in a `ContextVar` which is local to
+        # the task serving this request, so the context can be pushed
+        # and popped right here in the event loop.
+        tenant_context, error_response = self._get_tenant_context(request)
+        if error_response:
+            return error_response
 
-        # Code to be executed for each request/response after
-        # the view is called.
-        if should_clear_ctxt:
+        if not tenant_context:
+            return await self.get_response(request)
+
+        tls_tenant_manager.push_tenant_context(tenant_context)
+        try:
+            return await self.get_response(request)
+        finally:
             tls_tenant_manager.pop_tenant_context()
 
+    def process_exception(self, request, exception):
+        # fails fast while the breaker of a tenant's database is open
+        # rather than surfacing it as a server error.
+        if not isinstance(exception, CircuitOpenError):
+            return None
+
+        response = JsonResponse(
+            {"err_msg": str(exception)},
+            status=HTTPStatus.SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = str(max(1, math.ceil(exception.retry_after)))
         return response
 
     # def process_view(self, request, view_func, view_args, view_kwargs):
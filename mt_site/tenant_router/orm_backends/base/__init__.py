@@ -1,3 +1,3 @@
 from .manager import BaseOrmManager  # noqa: F401
-from .migration_assistant import BaseMigrationAsst  # noqa: F401
+from .migration_assistant import BaseMigrationAsst, MigrationResult  # noqa: F401
 from .router import BaseOrmRouter  # noqa: F401
@@ -1,4 +1,6 @@
+import threading
 from copy import copy
+from types import MappingProxyType
 
 from django.conf import settings
 from django.utils.module_loading import import_string
@@ -25,6 +27,19 @@ class BaseOrmManager:
     ROUTER_CLS = None
 
     def __init__(self, settings_dict=None):
+        # tenant alias -> {template alias -> conn alias} for every
+        # registered config. Inner dicts are replaced rather than
+        # mutated, so routers can read them without locking.
+        self._conn_alias_table = {}
+
+        # every registered conn alias along with a lazily built frozen
+        # view of it which is handed out to readers and dropped on
+        # every change.
+        self._conn_alias_lock = threading.Lock()
+        self._registered_conn_aliases = set()
+        self._static_conn_aliases = frozenset()
+        self._conn_aliases_view = None
+
         # setting up template config
         template_key = settings_dict.pop('SETTINGS_KEY')
         self._setup_template_config(template_key)
@@ -101,16 +116,79 @@ class BaseOrmManager:
     def template_aliases(self):
         return self._template_aliases
 
+    def _add_to_conn_alias_table(
+            self, tenant_alias, template_alias, conn_alias
+    ):
+        with self._conn_alias_lock:
+            self._conn_alias_table[tenant_alias] = {
+                **self._conn_alias_table.get(tenant_alias, {}),
+                template_alias: conn_alias
+            }
+            self._registered_conn_aliases.add(conn_alias)
+            self._conn_aliases_view = None
+
+    def _remove_from_conn_alias_table(self, tenant_alias, template_alias):
+        with self._conn_alias_lock:
+            template_alias_dict = dict(
+                self._conn_alias_table.get(tenant_alias, {})
+            )
+            conn_alias = template_alias_dict.pop(template_alias, None)
+
+            if template_alias_dict:
+                self._conn_alias_table[tenant_alias] = template_alias_dict
+            else:
+                self._conn_alias_table.pop(tenant_alias, None)
+
+            self._registered_conn_aliases.discard(conn_alias)
+            self._conn_aliases_view = None
+
+    def _set_static_conn_aliases(self, conn_aliases):
+        # conn aliases which are not bound to any tenant (like reserved
+        # aliases) but should still be reported by `conn_aliases`.
+        with self._conn_alias_lock:
+            self._static_conn_aliases = frozenset(conn_aliases)
+            self._conn_aliases_view = None
+
+    def lookup_conn_alias(self, tenant_alias, template_alias):
+        """
+        Returns the registered conn alias for the given tenant and
+        template alias without building any strings. Falls back to
+        constructing the alias for tenants without a registered config.
+        """
+        try:
+            return self._conn_alias_table[tenant_alias][template_alias]
+        except KeyError:
+            return construct_conn_alias(
+                tenant_alias=tenant_alias,
+                orm_key=self.ORM_KEY,
+                template_alias=template_alias
+            )
+
+    def get_conn_alias_map(self, tenant_alias):
+        """
+        Returns a read-only view of template alias -> conn alias for
+        every config registered for the given tenant.
+        """
+        return MappingProxyType(
+            self._conn_alias_table.get(tenant_alias, {})
+        )
+
     def conn_aliases_for_tenant(self, tenant_alias):
-        return {
-            conn_alias
-            for conn_alias in self.conn_aliases
-            if conn_alias.startswith(tenant_alias)
-        }
+        return frozenset(
+            self._conn_alias_table.get(tenant_alias, {}).values()
+        )
 
     @property
     def conn_aliases(self):
-        raise NotImplementedError('Subclasses must define this property')
+        conn_aliases = self._conn_aliases_view
+        if conn_aliases is None:
+            with self._conn_alias_lock:
+                conn_aliases = self._conn_aliases_view = (
+                    self._static_conn_aliases
+                    | frozenset(self._registered_conn_aliases)
+                )
+
+        return conn_aliases
 
     def setup_router(self, router_opts):
         """
@@ -138,22 +216,44 @@ class BaseOrmManager:
     def refresh_stale_connections(self):
         raise NotImplementedError('Subclasses must define this method')
 
+    def drain_retired_connections(self):
+        """
+        Called at the end of a unit of work outside of a request (like a
+        celery task) to close connections retired during it.
+        """
+        pass
+
+    def warm_up(self, conn_aliases):
+        """
+        Subclasses can override this method to open connections to the
+        given conn aliases ahead of their first use.
+        """
+        pass
+
     def format_conn_url(self, conn_url):
         return conn_url
 
-    def perform_health_check(self):
+    def perform_health_check(self, tenant_alias=None):
         raise NotImplementedError('Subclasses must define this method')
 
-    def get_current_conn_alias(self, template_alias):
-        tenant_alias = tls_tenant_manager.current_tenant_context.alias
+    def get_circuit_breaker_state(self):
+        return {}
 
-        conn_alias = construct_conn_alias(
-            tenant_alias=tenant_alias,
-            orm_key=self.ORM_KEY,
-            template_alias=template_alias
-        )
+    def on_worker_init(self):
+        """
+        Subclasses can override this method to start any per worker
+        (i.e post fork) machinery like background threads.
+        """
+        pass
 
-        return conn_alias
+    def on_worker_exit(self):
+        pass
+
+    def get_current_conn_alias(self, template_alias):
+        return self.lookup_conn_alias(
+            tls_tenant_manager.current_tenant_context.alias,
+            template_alias
+        )
 
     def get_current_db_config(self, template_alias=DEFAULT_CONN_ALIAS):
         raise NotImplementedError('Subclasses must define this method')
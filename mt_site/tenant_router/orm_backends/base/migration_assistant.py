@@ -1,4 +1,36 @@
 
+class MigrationResult:
+    MIGRATED = 'migrated'
+    UP_TO_DATE = 'up_to_date'
+    FAILED = 'failed'
+    HALTED = 'halted'
+
+    def __init__(
+            self,
+            db_alias,
+            tenant_id=None,
+            status=MIGRATED,
+            elapsed=0.0,
+            error=''
+    ):
+        self.db_alias = db_alias
+        self.tenant_id = tenant_id
+        self.status = status
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def failed(self):
+        return self.status == self.FAILED
+
+    def __repr__(self):
+        return '<MigrationResult {db_alias} {tenant_id} {status}>'.format(
+            db_alias=self.db_alias,
+            tenant_id=self.tenant_id,
+            status=self.status
+        )
+
+
 class BaseMigrationAsst:
     def __init__(self, manager, **options):
         self._manager = manager
@@ -7,5 +39,19 @@ class BaseMigrationAsst:
     def manager(self):
         return self._manager
 
-    def perform_migrate(self, tenant_ids, **kwargs):
+    def perform_migrate(self, tenant_ids, progress_callback=None, **kwargs):
+        """
+        Migrates the databases of the given tenants and returns a list of
+        `MigrationResult`. If given, `progress_callback` is invoked with
+        every result as soon as it's available, along with the count of
+        completed and total migrations.
+        """
         raise NotImplementedError('Subclasses must define this method')
+
+    def get_migration_status(self, tenant_ids, **kwargs):
+        """
+        Subclasses can override this method to report the pending
+        migrations of the given tenants, as a dict of tenant id to a dict
+        with the keys 'pending' (app label -> count) and 'error'.
+        """
+        return {}
@@ -1,16 +1,19 @@
 from django.core.cache import caches
 from django.utils.module_loading import import_string
 
+from tenant_router.bulk_config_loader import bulk_config_loader
 from tenant_router.conf import settings
 from tenant_router.constants import constants
-from tenant_router.exceptions import ImproperlyConfiguredError
-from tenant_router.managers.tenant_context import tenant_context_manager
-from tenant_router.orm_backends.utils import ORM_CONFIG_PREFIX_KEY
+from tenant_router.exceptions import (
+    DeconstructionError, ImproperlyConfiguredError
+)
+from tenant_router.orm_backends.utils import (
+    ORM_CONFIG_PREFIX_KEY, deconstruct_conn_alias
+)
 from tenant_router.pubsub.filters import uuid_filter
 from tenant_router.tenant_channel_observer import (
     tenant_channel_observable, TenantLifecycleEvent
 )
-from tenant_router.utils import join_keys
 
 
 class InvalidManagerClassError(Exception):
@@ -131,26 +134,27 @@ class _OrmManager:
     @staticmethod
     def _construct_orm_config(orm_keys):
         orm_config = {}
-        service_name = settings.TENANT_ROUTER_SERVICE_NAME
         config_store = caches[constants.CONFIG_STORE_ALIAS]
 
-        for tenant_context in tenant_context_manager.all():
-            for orm_key in orm_keys:
-                prefix_key = join_keys(
-                    tenant_context.alias,
-                    service_name,
-                    ORM_CONFIG_PREFIX_KEY,
-                    orm_key
-                )
+        all_db_config = bulk_config_loader.load(
+            config_store, ORM_CONFIG_PREFIX_KEY
+        )
 
-                for conn_alias in config_store.iter_keys(prefix_key + "*"):
-                    db_config = config_store.get(conn_alias)
-                    if orm_key in orm_config:
-                        orm_config[orm_key][conn_alias] = db_config
-                    else:
-                        orm_config[orm_key] = {
-                            conn_alias: db_config
-                        }
+        for conn_alias, db_config in all_db_config.items():
+            try:
+                _, orm_key, _ = deconstruct_conn_alias(conn_alias)
+            except DeconstructionError:
+                continue
+
+            if orm_key not in orm_keys:
+                continue
+
+            if orm_key in orm_config:
+                orm_config[orm_key][conn_alias] = db_config
+            else:
+                orm_config[orm_key] = {
+                    conn_alias: db_config
+                }
 
         return orm_config
 
@@ -189,6 +193,7 @@ class _OrmManager:
                 orm_manager = self.get(orm_key)
                 for conn_alias, db_config in config.items():
                     orm_manager.register_config(conn_alias, db_config)
+                orm_manager.warm_up(config.keys())
 
     @uuid_filter
     def on_tenant_update(self, event):
@@ -210,6 +215,14 @@ class _OrmManager:
                 for conn_alias in config:
                     orm_manager.delete_config(conn_alias)
 
+    def on_worker_init(self):
+        for orm_manager in self:
+            orm_manager.on_worker_init()
+
+    def on_worker_exit(self):
+        for orm_manager in self:
+            orm_manager.on_worker_exit()
+
     def _perform_tenant_channel_subscription(self):
         tenant_channel_observable.subscribe(
             lifecycle_event=TenantLifecycleEvent.ON_TENANT_CREATE,
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+
+from tenant_router.exceptions import CircuitOpenError
+
+
+logger = logging.getLogger(__name__)
+
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class _BreakerState:
+    __slots__ = ('state', 'failures', 'opened_at', 'rejected')
+
+    def __init__(self):
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    Guards connection establishment per conn alias. The breaker of an
+    alias opens after `failure_threshold` consecutive failed connection
+    attempts, after which connecting to the alias fails fast with
+    `CircuitOpenError` instead of waiting out the connect timeout. Once
+    `cooldown` seconds have passed, the breaker is half open and lets a
+    single attempt through: it closes if the attempt succeeds and opens
+    again otherwise.
+
+    The router calls `check` before any connection work for the alias,
+    which fails fast while the breaker is open, and `guard` once the
+    thread's connection is in place, which wraps its connection attempts.
+    Only connection attempts are guarded, so a thread which already holds
+    an open connection to the alias is unaffected.
+    """
+    _WRAPPED_ATTR = '_tenant_router_circuit_breaker'
+
+    def __init__(self, conn_handler, failure_threshold=5, cooldown=30):
+        self._conn_handler = conn_handler
+        self._failure_threshold = max(1, failure_threshold)
+        self._cooldown = cooldown
+
+        # conn alias -> _BreakerState. Only aliases which have seen a
+        # failure are tracked.
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _get_retry_after(self, breaker_state):
+        return self._cooldown - (time.monotonic() - breaker_state.opened_at)
+
+    def _before_connect(self, conn_alias):
+        breaker_state = self._states.get(conn_alias)
+        if breaker_state is None or breaker_state.state == STATE_CLOSED:
+            return
+
+        with self._lock:
+            retry_after = self._get_retry_after(breaker_state)
+            if breaker_state.state == STATE_OPEN and retry_after <= 0:
+                # this attempt is the probe, every other attempt is
+                # rejected until its outcome is known.
+                breaker_state.state = STATE_HALF_OPEN
+                return
+
+            if breaker_state.state != STATE_CLOSED:
+                breaker_state.rejected += 1
+                raise CircuitOpenError(conn_alias, max(0, retry_after))
+
+    def _on_success(self, conn_alias):
+        if conn_alias not in self._states:
+            return
+
+        with self._lock:
+            breaker_state = self._states.pop(conn_alias, None)
+
+        if breaker_state is not None \
+                and breaker_state.state != STATE_CLOSED:
+            logger.info(
+                "Circuit breaker closed for alias {conn_alias}".format(
+                    conn_alias=conn_alias
+                )
+            )
+
+    def _on_failure(self, conn_alias):
+        with self._lock:
+            breaker_state = self._states.setdefault(
+                conn_alias, _BreakerState()
+            )
+            breaker_state.failures += 1
+
+            if breaker_state.state == STATE_HALF_OPEN \
+                    or breaker_state.failures >= self._failure_threshold:
+                if breaker_state.state != STATE_OPEN:
+                    logger.warning(
+                        "Circuit breaker opened for alias {conn_alias} "
+                        "after {failures} consecutive failures".format(
+                            conn_alias=conn_alias,
+                            failures=breaker_state.failures
+                        )
+                    )
+
+                breaker_state.state = STATE_OPEN
+                breaker_state.opened_at = time.monotonic()
+
+    def _wrap_connect(self, conn_alias, connect):
+        def guarded_connect():
+            self._before_connect(conn_alias)
+            try:
+                connect()
+            except Exception:
+                self._on_failure(conn_alias)
+                raise
+
+            self._on_success(conn_alias)
+
+        return guarded_connect
+
+    def check(self, conn_alias):
+        """
+        Raises `CircuitOpenError` if the breaker of the alias rejects
+        connection attempts and the thread has no open connection to it.
+        Once the cooldown is over, the route is let through so that its
+        connection attempt can be the probe.
+        """
+        breaker_state = self._states.get(conn_alias)
+        if breaker_state is None or breaker_state.state == STATE_CLOSED:
+            return
+
+        connection = getattr(
+            self._conn_handler._connections, conn_alias, None
+        )
+        if connection is not None and connection.connection is not None:
+            return
+
+        with self._lock:
+            retry_after = self._get_retry_after(breaker_state)
+            if breaker_state.state == STATE_OPEN and retry_after <= 0:
+                return
+
+            if breaker_state.state != STATE_CLOSED:
+                breaker_state.rejected += 1
+                raise CircuitOpenError(conn_alias, max(0, retry_after))
+
+    def guard(self, conn_alias):
+        """
+        Wraps `connect` of the thread's connection to the alias, once per
+        connection.
+        """
+        connection = getattr(
+            self._conn_handler._connections, conn_alias, None
+        )
+        if connection is None \
+                or getattr(connection, self._WRAPPED_ATTR, False):
+            return
+
+        connection.connect = self._wrap_connect(
+            conn_alias, connection.connect
+        )
+        setattr(connection, self._WRAPPED_ATTR, True)
+
+    def allows(self, conn_alias):
+        breaker_state = self._states.get(conn_alias)
+        return breaker_state is None or breaker_state.state == STATE_CLOSED
+
+    def forget(self, conn_alias):
+        with self._lock:
+            self._states.pop(conn_alias, None)
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                conn_alias: {
+                    'state': breaker_state.state,
+                    'failures': breaker_state.failures,
+                    'rejected': breaker_state.rejected,
+                    'open_for': round(now - breaker_state.opened_at, 3)
+                    if breaker_state.opened_at is not None else None
+                }
+                for conn_alias, breaker_state in self._states.items()
+            }
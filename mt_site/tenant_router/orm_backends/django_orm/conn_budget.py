@@ -0,0 +1,199 @@
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadState:
+    __slots__ = ('lru', 'hits', 'misses', 'evictions', '__weakref__')
+
+    def __init__(self):
+        # conn alias -> the thread's connection for it once it has been
+        # opened (None until then), ordered from least to most recently
+        # used.
+        self.lru = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class ConnectionBudget:
+    """
+    Caps the number of tenant connections a process (and each of its
+    threads) keeps open. Since Django connections are thread local, every
+    thread tracks the aliases it has routed to and closes its own least
+    recently used connections whenever either budget is exceeded.
+
+    The process wide count is that of connections which are actually open.
+    Every connection opened for a routed alias is tracked (through the
+    `connection_created` signal) and only counted for as long as it stays
+    open, so connections closed by any thread, in any way (like
+    `close_old_connections`), stop counting right away.
+
+    Connections inside an atomic block are never evicted. Note that this
+    only makes a difference when connections are persistent i.e
+    `CONN_MAX_AGE` is non-zero, since otherwise Django closes them at the
+    end of every request anyway.
+    """
+
+    def __init__(self, conn_handler, max_per_process=None, max_per_thread=None):
+        self._conn_handler = conn_handler
+        self._max_per_process = max_per_process
+        self._max_per_thread = max_per_thread
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._thread_states = weakref.WeakSet()
+
+        # connections of every thread which have been opened for a routed
+        # alias. Closed ones are dropped whenever they're counted.
+        self._tracked_connections = weakref.WeakSet()
+
+        connection_created.connect(self._on_connection_created)
+
+    def _get_thread_state(self):
+        try:
+            return self._local.state
+        except AttributeError:
+            state = self._local.state = _ThreadState()
+            with self._lock:
+                self._thread_states.add(state)
+            return state
+
+    def _get_all_thread_states(self):
+        with self._lock:
+            return list(self._thread_states)
+
+    def _track(self, state, connection):
+        state.lru[connection.alias] = connection
+        with self._lock:
+            self._tracked_connections.add(connection)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        # fired in the thread opening the connection. Connections to
+        # aliases which haven't been routed to (like reserved ones) are
+        # none of the budget's business.
+        state = self._get_thread_state()
+        if connection.alias in state.lru:
+            self._track(state, connection)
+
+    def _get_process_count(self):
+        with self._lock:
+            closed_connections = [
+                connection for connection in self._tracked_connections
+                if connection.connection is None
+            ]
+            for connection in closed_connections:
+                self._tracked_connections.discard(connection)
+
+            return len(self._tracked_connections)
+
+    def _is_over_budget(self, state, is_opening):
+        if self._max_per_thread is not None \
+                and len(state.lru) > self._max_per_thread:
+            return True
+
+        # the alias being routed to counts as open, since it's about to be.
+        if self._max_per_process is not None \
+                and self._get_process_count() + is_opening \
+                > self._max_per_process:
+            return True
+
+        return False
+
+    @staticmethod
+    def _is_open(connection):
+        return connection is not None and connection.connection is not None
+
+    def _get_open_connection(self, conn_alias):
+        if not hasattr(self._conn_handler._connections, conn_alias):
+            return None
+
+        connection = self._conn_handler[conn_alias]
+        if connection.connection is None:
+            return None
+
+        return connection
+
+    def _prune_closed(self, state, exclude):
+        # drops aliases whose connection has already been closed
+        # elsewhere (e.g by `close_old_connections`)
+        for conn_alias, connection in tuple(state.lru.items()):
+            if conn_alias != exclude and not self._is_open(connection):
+                state.lru.pop(conn_alias, None)
+
+    def _evict_one(self, state, exclude):
+        """
+        Closes the least recently used connection of the thread which can
+        be closed. Returns False once there's none left, since nothing the
+        thread does can lower the count any further.
+        """
+        for conn_alias, connection in tuple(state.lru.items()):
+            if conn_alias == exclude:
+                continue
+
+            if not self._is_open(connection):
+                state.lru.pop(conn_alias, None)
+                continue
+
+            if connection.in_atomic_block:
+                continue
+
+            state.lru.pop(conn_alias, None)
+            logger.debug(
+                "Evicting connection for alias {conn_alias}".format(
+                    conn_alias=conn_alias
+                )
+            )
+            connection.close()
+            state.evictions += 1
+            return True
+
+        return False
+
+    def _enforce(self, state, conn_alias, is_opening):
+        if not self._is_over_budget(state, is_opening):
+            return
+
+        self._prune_closed(state, exclude=conn_alias)
+        while self._is_over_budget(state, is_opening):
+            if not self._evict_one(state, exclude=conn_alias):
+                break
+
+    def touch(self, conn_alias):
+        state = self._get_thread_state()
+
+        if conn_alias in state.lru:
+            state.lru.move_to_end(conn_alias)
+            state.hits += 1
+            return
+
+        state.misses += 1
+        state.lru[conn_alias] = None
+
+        # the connection may already be open, like one adopted from the
+        # warmer which was opened on another thread.
+        connection = self._get_open_connection(conn_alias)
+        if connection is not None:
+            self._track(state, connection)
+
+        self._enforce(state, conn_alias, is_opening=connection is None)
+
+    def forget(self, conn_alias):
+        self._get_thread_state().lru.pop(conn_alias, None)
+
+    def get_stats(self):
+        thread_states = self._get_all_thread_states()
+        return {
+            'open': self._get_process_count(),
+            'hits': sum(state.hits for state in thread_states),
+            'misses': sum(state.misses for state in thread_states),
+            'evictions': sum(state.evictions for state in thread_states),
+            'max_per_process': self._max_per_process,
+            'max_per_thread': self._max_per_thread,
+        }
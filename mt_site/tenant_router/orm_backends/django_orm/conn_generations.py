@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionGenerations:
+    """
+    Tracks a generation counter per conn alias, bumped whenever the
+    config behind the alias is updated or deleted. Every connection
+    is stamped with the generation it was created for, so a thread
+    holding a connection from an older generation drops it the next time
+    the alias is routed to and lazily reconnects with the new config.
+
+    A stale connection which is open is retired rather than dropped: the
+    request (or task) using it carries on with it, and it's drained i.e
+    closed once the request finishes, or forcibly closed on the first
+    check `retire_deadline` seconds after the config change. Threads
+    without an open connection pick up the new config right away.
+
+    Only the writers (config updates, retirements) take the lock; the
+    check on the routing path is a couple of dict and attribute lookups.
+    """
+    _GENERATION_ATTR = '_tenant_router_generation'
+
+    def __init__(self, conn_handler, retire_deadline=30):
+        self._conn_handler = conn_handler
+        self._retire_deadline = retire_deadline
+        self._lock = threading.Lock()
+
+        # conn alias -> (retired connection, retired at) of the
+        # current thread.
+        self._local = threading.local()
+
+        # conn alias -> count of retired connections across threads
+        # which are yet to be closed.
+        self._pending_counts = {}
+        self._counters = {'retired': 0, 'drained': 0, 'forced': 0}
+
+        # conn alias -> generation, and the time of the latest bump
+        self._generations = {}
+        self._bumped_at = {}
+
+        # aliases whose config has been deleted. Connections to these
+        # are never routed to again and so are closed at the end of
+        # every request instead.
+        self._deleted_aliases = frozenset()
+
+    def bump(self, conn_alias, deleted=False):
+        with self._lock:
+            self._generations[conn_alias] = \
+                self._generations.get(conn_alias, 0) + 1
+            self._bumped_at[conn_alias] = time.monotonic()
+
+            if deleted:
+                self._deleted_aliases = self._deleted_aliases | {conn_alias}
+            else:
+                self._deleted_aliases = self._deleted_aliases - {conn_alias}
+
+    def revive(self, conn_alias):
+        # called when a config is registered, which only matters for an
+        # alias that was deleted earlier.
+        if conn_alias in self._deleted_aliases:
+            self.bump(conn_alias)
+
+    def get_generation(self, conn_alias):
+        return self._generations.get(conn_alias, 0)
+
+    def stamp(self, connection, generation):
+        setattr(connection, self._GENERATION_ATTR, generation)
+
+    def is_current(self, conn_alias, connection):
+        return getattr(connection, self._GENERATION_ATTR, 0) \
+            == self._generations.get(conn_alias, 0)
+
+    def _drop_connection(self, conn_alias, connection):
+        logger.debug(
+            "Dropping stale connection for alias {conn_alias}".format(
+                conn_alias=conn_alias
+            )
+        )
+        connection.close()
+        delattr(self._conn_handler._connections, conn_alias)
+
+    def _get_retired(self):
+        try:
+            return self._local.retired
+        except AttributeError:
+            self._local.retired = {}
+            return self._local.retired
+
+    def _update_counts(self, conn_alias, counter, delta):
+        with self._lock:
+            self._counters[counter] += 1
+
+            pending_count = self._pending_counts.get(conn_alias, 0) + delta
+            if pending_count:
+                self._pending_counts[conn_alias] = pending_count
+            else:
+                self._pending_counts.pop(conn_alias, None)
+
+    def _retire(self, conn_alias, connection):
+        """
+        Returns True if the stale connection should continue to be used
+        for now, False if it should be dropped right away.
+        """
+        retired = self._get_retired()
+        retired_entry = retired.get(conn_alias)
+
+        if retired_entry is None or retired_entry[0] is not connection:
+            if connection.connection is None:
+                # nothing is in flight on it. If it was closed inside an
+                # atomic block, the block is left to unwind first.
+                return connection.in_atomic_block
+
+            logger.debug(
+                "Retiring stale connection for alias {conn_alias}".format(
+                    conn_alias=conn_alias
+                )
+            )
+            # the deadline runs from the config change rather than from
+            # when the thread notices it.
+            retired_entry = retired[conn_alias] = (
+                connection,
+                self._bumped_at.get(conn_alias, time.monotonic())
+            )
+            self._update_counts(conn_alias, 'retired', 1)
+
+        if time.monotonic() - retired_entry[1] < self._retire_deadline:
+            return True
+
+        logger.warning(
+            "Force closing retired connection for alias {conn_alias} "
+            "after {deadline}s".format(
+                conn_alias=conn_alias,
+                deadline=self._retire_deadline
+            )
+        )
+        del retired[conn_alias]
+        self._update_counts(conn_alias, 'forced', -1)
+
+        if connection.in_atomic_block:
+            # the transaction is aborted, but the wrapper is left in place
+            # for the atomic block to unwind and dropped on a later check.
+            connection.close()
+            return True
+
+        return False
+
+    def check(self, conn_alias):
+        generation = self._generations.get(conn_alias, 0)
+        connection = getattr(
+            self._conn_handler._connections, conn_alias, None
+        )
+
+        if connection is not None:
+            if getattr(connection, self._GENERATION_ATTR, 0) == generation:
+                return
+
+            if self._retire(conn_alias, connection):
+                return
+
+            self._drop_connection(conn_alias, connection)
+
+        # created eagerly so that it can be stamped with the generation
+        # of the config it's created from.
+        self.stamp(self._conn_handler[conn_alias], generation)
+
+    def close_deleted(self, **kwargs):
+        for conn_alias in self._deleted_aliases:
+            connection = getattr(
+                self._conn_handler._connections, conn_alias, None
+            )
+            if connection is not None and not connection.in_atomic_block:
+                self._drop_connection(conn_alias, connection)
+
+    def drain(self, **kwargs):
+        """
+        Closes the connections retired in the current thread, once the
+        request or task which was using them has finished.
+        """
+        retired = self._get_retired()
+
+        for conn_alias, (connection, _) in list(retired.items()):
+            if connection.in_atomic_block:
+                continue
+
+            del retired[conn_alias]
+            if getattr(
+                self._conn_handler._connections, conn_alias, None
+            ) is connection:
+                self._drop_connection(conn_alias, connection)
+            else:
+                connection.close()
+
+            self._update_counts(conn_alias, 'drained', -1)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'pending': dict(self._pending_counts)
+            }
@@ -0,0 +1,300 @@
+import concurrent.futures
+import copy
+import heapq
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.db.utils import load_backend
+
+from tenant_router.conf import settings
+from tenant_router.constants import constants
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+HOT_CONN_ALIASES_PREFIX_KEY = 'hot_conn_aliases'
+
+
+class ConnectionWarmer:
+    """
+    Opens connections ahead of the first request that needs them, on a
+    pool of at most `max_workers` background threads so that warming up
+    never floods the database servers.
+
+    Since Django connections are thread local, a warmed connection is
+    parked until the first thread that routes to its alias without a
+    connection of its own adopts it. Parked connections which aren't
+    adopted within `idle_timeout` seconds, or whose config has changed
+    since, are closed instead. Idle ones are closed by a background reaper
+    as they expire, which runs only while connections are parked.
+
+    The number of times every alias is routed to is also counted, and the
+    `hot_count` busiest aliases are persisted in the config store when
+    the worker exits, to be warmed up by the workers that start next.
+    """
+
+    def __init__(
+            self,
+            conn_handler,
+            conn_generations,
+            max_workers=4,
+            hot_count=20,
+            idle_timeout=60
+    ):
+        self._conn_handler = conn_handler
+        self._conn_generations = conn_generations
+        self._max_workers = max_workers
+        self._hot_count = hot_count
+        self._idle_timeout = idle_timeout
+
+        # conn alias -> (connection, warmed at)
+        self._parked = {}
+        self._pending_aliases = set()
+        self._lock = threading.Lock()
+
+        # conn alias -> times routed to. Increments aren't synchronised,
+        # an approximate count is good enough to rank the aliases.
+        self._route_counts = {}
+
+        self._executor = None
+        self._reaper = None
+        self._stop_event = threading.Event()
+        self._counters = {'warmed': 0, 'adopted': 0, 'discarded': 0}
+
+    @property
+    def _config_store(self):
+        return caches[constants.CONFIG_STORE_ALIAS]
+
+    @property
+    def _hot_aliases_key(self):
+        return join_keys(
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            HOT_CONN_ALIASES_PREFIX_KEY
+        )
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix='tenant_router_conn_warmer'
+                )
+
+            return self._executor
+
+    def _increment(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _discard(self, connection):
+        # the connection may have been opened by another thread.
+        connection._thread_ident = threading.get_ident()
+        connection.close()
+        self._increment('discarded')
+
+    def _open(self, conn_alias):
+        generation = self._conn_generations.get_generation(conn_alias)
+
+        try:
+            self._conn_handler.ensure_defaults(conn_alias)
+            self._conn_handler.prepare_test_settings(conn_alias)
+            settings_dict = copy.deepcopy(
+                self._conn_handler.databases[conn_alias]
+            )
+            backend = load_backend(settings_dict['ENGINE'])
+            connection = backend.DatabaseWrapper(settings_dict, conn_alias)
+            connection.ensure_connection()
+        except Exception as e:
+            logger.warning(
+                "Unable to warm up connection for alias {conn_alias}: "
+                "{exc_info}".format(conn_alias=conn_alias, exc_info=e)
+            )
+            return
+        finally:
+            with self._lock:
+                self._pending_aliases.discard(conn_alias)
+
+        self._conn_generations.stamp(connection, generation)
+        with self._lock:
+            replaced_entry = self._parked.get(conn_alias)
+            self._parked[conn_alias] = (connection, time.monotonic())
+            self._counters['warmed'] += 1
+            self._start_reaper()
+
+        if replaced_entry is not None:
+            self._discard(replaced_entry[0])
+
+    def _start_reaper(self):
+        # expected to be called with the lock held.
+        if self._reaper is not None or self._stop_event.is_set():
+            return
+
+        self._reaper = threading.Thread(
+            target=self._run_reaper,
+            name='tenant_router_conn_reaper',
+            daemon=True
+        )
+        self._reaper.start()
+
+    def _run_reaper(self):
+        while True:
+            with self._lock:
+                if not self._parked:
+                    self._reaper = None
+                    return
+
+                # sleeps until the oldest parked connection goes idle.
+                delay = min(
+                    warmed_at for _, warmed_at in self._parked.values()
+                ) + self._idle_timeout - time.monotonic()
+
+            if self._stop_event.wait(max(delay, 0)):
+                return
+
+            self._discard_idle()
+
+    def _discard_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle_aliases = [
+                conn_alias
+                for conn_alias, (_, warmed_at) in self._parked.items()
+                if now - warmed_at >= self._idle_timeout
+            ]
+            idle_connections = [
+                self._parked.pop(conn_alias)[0] for conn_alias in idle_aliases
+            ]
+
+        for connection in idle_connections:
+            self._discard(connection)
+
+    def warm(self, conn_aliases):
+        self._discard_idle()
+
+        with self._lock:
+            conn_aliases = [
+                conn_alias for conn_alias in conn_aliases
+                if conn_alias not in self._parked
+                and conn_alias not in self._pending_aliases
+            ]
+            self._pending_aliases.update(conn_aliases)
+
+        if not conn_aliases:
+            return
+
+        executor = self._get_executor()
+        for conn_alias in conn_aliases:
+            executor.submit(self._open, conn_alias)
+
+    def on_route(self, conn_alias):
+        self._route_counts[conn_alias] = \
+            self._route_counts.get(conn_alias, 0) + 1
+
+        if conn_alias not in self._parked \
+                or hasattr(self._conn_handler._connections, conn_alias):
+            return
+
+        with self._lock:
+            parked_entry = self._parked.pop(conn_alias, None)
+
+        if parked_entry is None:
+            # adopted by another thread in the meantime.
+            return
+
+        connection, warmed_at = parked_entry
+        if time.monotonic() - warmed_at >= self._idle_timeout \
+                or not self._conn_generations.is_current(
+                    conn_alias, connection
+                ):
+            self._discard(connection)
+            return
+
+        connection._thread_ident = threading.get_ident()
+        setattr(self._conn_handler._connections, conn_alias, connection)
+        self._increment('adopted')
+
+    def forget(self, conn_alias):
+        self._route_counts.pop(conn_alias, None)
+
+        with self._lock:
+            parked_entry = self._parked.pop(conn_alias, None)
+
+        if parked_entry is not None:
+            self._discard(parked_entry[0])
+
+    def get_hot_aliases(self):
+        try:
+            hot_alias_counts = self._config_store.get(
+                self._hot_aliases_key, {}
+            )
+        except Exception as e:
+            logger.warning(
+                "Unable to fetch hot conn aliases: {exc_info}".format(
+                    exc_info=e
+                )
+            )
+            return []
+
+        return heapq.nlargest(
+            self._hot_count, hot_alias_counts, key=hot_alias_counts.get
+        )
+
+    def save_hot_aliases(self):
+        if not self._route_counts:
+            return
+
+        try:
+            hot_alias_counts = self._config_store.get(
+                self._hot_aliases_key, {}
+            )
+
+            # earlier counts are halved on every save so that the ranking
+            # follows recent traffic.
+            alias_counts = {
+                conn_alias: count // 2
+                for conn_alias, count in hot_alias_counts.items()
+            }
+            for conn_alias, count in list(self._route_counts.items()):
+                alias_counts[conn_alias] = \
+                    alias_counts.get(conn_alias, 0) + count
+
+            self._config_store.set(
+                self._hot_aliases_key,
+                {
+                    conn_alias: alias_counts[conn_alias]
+                    for conn_alias in heapq.nlargest(
+                        self._hot_count * 2, alias_counts,
+                        key=alias_counts.get
+                    )
+                    if alias_counts[conn_alias]
+                }
+            )
+        except Exception as e:
+            logger.warning(
+                "Unable to save hot conn aliases: {exc_info}".format(
+                    exc_info=e
+                )
+            )
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            parked_connections = [
+                connection for connection, _ in self._parked.values()
+            ]
+            self._parked = {}
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        for connection in parked_connections:
+            self._discard(connection)
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._counters, 'parked': len(self._parked)}
@@ -0,0 +1,348 @@
+import concurrent.futures
+import copy
+import logging
+import math
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler, load_backend
+
+
+logger = logging.getLogger(__name__)
+
+
+class _ProbeRun:
+    __slots__ = ('conn_alias', 'started_at')
+
+    def __init__(self, conn_alias):
+        self.conn_alias = conn_alias
+        # set by the worker thread once the probe starts running.
+        self.started_at = None
+
+
+class HealthChecker:
+    """
+    Probes the databases behind conn aliases concurrently on a pool of
+    worker threads. Every probe opens a short-lived connection of its own
+    (rather than the thread local one from `connections`) which is closed
+    as soon as the probe completes, so request threads neither block on
+    an unreachable database nor end up holding a connection per tenant.
+
+    Every probe gets `timeout` seconds from the moment it starts running
+    (time spent queued for a worker doesn't count). A probe which times
+    out is left to finish in the background and its result is recorded
+    once it does. Only a single probe runs per conn alias at a time,
+    concurrent checks share it.
+
+    Results are cached for `cache_ttl` seconds. `is_healthy` never blocks
+    on a probe: it answers from the last result and, once that has
+    expired, re-probes the conn alias in the background. When a
+    `probe_interval` is given, a background thread refreshes the results
+    of every conn alias at that interval once `start` is called.
+    Otherwise the thread re-probes just the replicas, every `cache_ttl`
+    seconds, so that one which has recovered is picked again.
+    """
+
+    _POSTGRES_ENGINE_MARKERS = ('postgresql', 'postgis')
+
+    def __init__(
+            self,
+            conn_handler,
+            max_workers=8,
+            timeout=5,
+            cache_ttl=30,
+            probe_interval=None
+    ):
+        self._conn_handler = conn_handler
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._cache_ttl = cache_ttl
+        self._probe_interval = probe_interval
+
+        # conn alias -> (checked at, result dict)
+        self._results = {}
+
+        # conn alias -> (future, _ProbeRun) of the probe in flight for it.
+        # Guards `_results` as well.
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        self._prober = None
+        self._stop_event = threading.Event()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix='tenant_router_health_check'
+                    )
+
+        return self._executor
+
+    def _get_probe_settings(self, conn_alias):
+        # fills in the defaults the same way `connections[conn_alias]`
+        # would, on a copy of the config in a handler of its own so that
+        # the shared `databases` dict is never written to. Returns None if
+        # the conn alias has been deleted in the meantime.
+        db_config = self._conn_handler.databases.get(conn_alias)
+        if db_config is None:
+            return None
+
+        conn_handler = ConnectionHandler({
+            DEFAULT_DB_ALIAS: copy.deepcopy(db_config)
+        })
+        conn_handler.ensure_defaults(DEFAULT_DB_ALIAS)
+        conn_handler.prepare_test_settings(DEFAULT_DB_ALIAS)
+        settings_dict = conn_handler.databases[DEFAULT_DB_ALIAS]
+
+        if any(
+                marker in settings_dict['ENGINE']
+                for marker in self._POSTGRES_ENGINE_MARKERS
+        ):
+            settings_dict['OPTIONS'].setdefault(
+                'connect_timeout', max(1, math.ceil(self._timeout))
+            )
+
+        return settings_dict
+
+    @staticmethod
+    def _probe(probe_run, settings_dict):
+        probe_run.started_at = time.monotonic()
+        conn_alias = probe_run.conn_alias
+        result = True
+        msg = ''
+
+        try:
+            backend = load_backend(settings_dict['ENGINE'])
+            connection = backend.DatabaseWrapper(settings_dict, conn_alias)
+
+            try:
+                connection.ensure_connection()
+                if not connection.is_usable():
+                    result = False
+                    msg = 'Unable to connect to the database for ' \
+                          'alias {conn_alias}'.format(conn_alias=conn_alias)
+            finally:
+                connection.close()
+
+        except Exception as e:
+            result = False
+            msg = 'Unable to connect to the database for alias ' \
+                  '{conn_alias}: {exc_info}'.format(
+                      conn_alias=conn_alias,
+                      exc_info=e
+                  )
+
+        return {
+            'result': result,
+            'msg': msg
+        }
+
+    def _is_fresh(self, cached_result, now):
+        return cached_result is not None \
+            and now - cached_result[0] < self._cache_ttl
+
+    def _on_probe_done(self, conn_alias, future):
+        # runs in the worker thread, as soon as the probe completes
+        # (including the ones which have already been reported as timed
+        # out). Dropped if the conn alias has been forgotten meanwhile.
+        with self._lock:
+            in_flight = self._in_flight.get(conn_alias)
+            if in_flight is None or in_flight[0] is not future:
+                return
+
+            del self._in_flight[conn_alias]
+            self._results[conn_alias] = (time.monotonic(), future.result())
+
+    def _submit(self, conn_alias, settings_dict):
+        with self._lock:
+            in_flight = self._in_flight.get(conn_alias)
+            if in_flight is not None:
+                return in_flight
+
+            probe_run = _ProbeRun(conn_alias)
+            future = self._get_executor().submit(
+                self._probe, probe_run, settings_dict
+            )
+            in_flight = self._in_flight[conn_alias] = (future, probe_run)
+
+        # outside of the lock, since it runs right away if the probe has
+        # completed already.
+        future.add_done_callback(
+            lambda future: self._on_probe_done(conn_alias, future)
+        )
+        return in_flight
+
+    def _get_timed_out_result(self, probe_run):
+        if probe_run.started_at is None:
+            msg = 'Health check for alias {conn_alias} did not start in ' \
+                  'time'.format(conn_alias=probe_run.conn_alias)
+        else:
+            msg = 'Health check timed out after {timeout}s for alias ' \
+                  '{conn_alias}'.format(
+                      timeout=self._timeout,
+                      conn_alias=probe_run.conn_alias
+                  )
+
+        return {
+            'result': False,
+            'msg': msg
+        }
+
+    def _wait(self, in_flight):
+        """
+        Waits for every probe in `in_flight` (future -> _ProbeRun) to
+        either complete or exceed its timeout, and returns the futures
+        which timed out. Queued probes are waited for as long as it would
+        take for the probes ahead of them to time out.
+        """
+        pending = set(in_flight)
+        timed_out = set()
+        batch_deadline = time.monotonic() + self._timeout * math.ceil(
+            len(in_flight) / self._max_workers
+        )
+
+        while pending:
+            now = time.monotonic()
+            next_deadline = batch_deadline
+
+            for future in tuple(pending):
+                started_at = in_flight[future].started_at
+                if started_at is None:
+                    continue
+
+                deadline = started_at + self._timeout
+                if deadline <= now:
+                    pending.discard(future)
+                    timed_out.add(future)
+                else:
+                    next_deadline = min(next_deadline, deadline)
+
+            if not pending:
+                break
+
+            if now >= batch_deadline:
+                timed_out.update(pending)
+                break
+
+            done, _ = concurrent.futures.wait(
+                pending,
+                timeout=next_deadline - now,
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            pending.difference_update(done)
+
+        return timed_out
+
+    def check(self, conn_aliases, use_cache=True):
+        health_check_dict = {}
+        now = time.monotonic()
+
+        # future -> _ProbeRun
+        in_flight = {}
+        for conn_alias in conn_aliases:
+            cached_result = self._results.get(conn_alias)
+            if use_cache and self._is_fresh(cached_result, now):
+                health_check_dict[conn_alias] = cached_result[1]
+                continue
+
+            # read in the calling thread.
+            settings_dict = self._get_probe_settings(conn_alias)
+            if settings_dict is None:
+                health_check_dict[conn_alias] = {
+                    'result': False,
+                    'msg': 'No database is configured for alias '
+                           '{conn_alias}'.format(conn_alias=conn_alias)
+                }
+                continue
+
+            future, probe_run = self._submit(conn_alias, settings_dict)
+            in_flight[future] = probe_run
+
+        timed_out = self._wait(in_flight)
+
+        for future, probe_run in in_flight.items():
+            conn_alias = probe_run.conn_alias
+
+            if future not in timed_out:
+                health_check_dict[conn_alias] = future.result()
+                continue
+
+            with self._lock:
+                # it may well have completed in the meantime.
+                if future.done():
+                    health_check_dict[conn_alias] = future.result()
+                    continue
+
+                # recorded until the probe completes, which then
+                # replaces it.
+                health_check_dict[conn_alias] = \
+                    self._get_timed_out_result(probe_run)
+                self._results[conn_alias] = (
+                    time.monotonic(), health_check_dict[conn_alias]
+                )
+
+        return health_check_dict
+
+    def _refresh(self, conn_alias):
+        if conn_alias in self._in_flight:
+            return
+
+        settings_dict = self._get_probe_settings(conn_alias)
+        if settings_dict is not None:
+            self._submit(conn_alias, settings_dict)
+
+    def is_healthy(self, conn_alias):
+        cached_result = self._results.get(conn_alias)
+        if not self._is_fresh(cached_result, time.monotonic()):
+            # the result is replaced once the probe completes.
+            self._refresh(conn_alias)
+
+        # aliases which haven't been checked yet are assumed to be healthy.
+        return cached_result is None or cached_result[1]['result']
+
+    def forget(self, conn_alias):
+        with self._lock:
+            self._results.pop(conn_alias, None)
+            self._in_flight.pop(conn_alias, None)
+
+    def _run_prober(self, get_conn_aliases, probe_interval):
+        while not self._stop_event.wait(probe_interval):
+            try:
+                self.check(get_conn_aliases(), use_cache=False)
+            except Exception:
+                logger.exception("Background health check failed")
+
+    def start(self, get_conn_aliases, get_replica_aliases=None):
+        if self._prober is not None:
+            return
+
+        if self._probe_interval:
+            probe_interval = self._probe_interval
+        elif get_replica_aliases is not None and self._cache_ttl:
+            probe_interval = self._cache_ttl
+            get_conn_aliases = get_replica_aliases
+        else:
+            return
+
+        self._stop_event.clear()
+        self._prober = threading.Thread(
+            target=self._run_prober,
+            args=(get_conn_aliases, probe_interval),
+            name='tenant_router_health_prober',
+            daemon=True
+        )
+        self._prober.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._prober = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
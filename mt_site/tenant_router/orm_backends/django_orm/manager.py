@@ -1,5 +1,6 @@
 import dj_database_url
 
+from django.core.signals import request_finished
 from django.db import close_old_connections, DEFAULT_DB_ALIAS, connections
 from django.utils.functional import cached_property
 from django.utils.module_loading import import_string
@@ -11,9 +12,20 @@ from tenant_router.orm_backends.base.manager import BaseOrmManager
 from tenant_router.orm_backends.django_orm.\
     migration_assistant import DjangoOrmMigrationAsst
 
+from tenant_router.orm_backends.django_orm.circuit_breaker import CircuitBreaker
+from tenant_router.orm_backends.django_orm.conn_budget import ConnectionBudget
+from tenant_router.orm_backends.django_orm.conn_warmer import ConnectionWarmer
+from tenant_router.orm_backends.django_orm.conn_generations import (
+    ConnectionGenerations
+)
+from tenant_router.orm_backends.django_orm.health_check import HealthChecker
+from tenant_router.orm_backends.django_orm.replicas import ReplicaSet
 from tenant_router.orm_backends.django_orm.router import DjangoOrmRouter
+from tenant_router.orm_backends.django_orm.schema_routing import SchemaRouting
 from tenant_router.orm_backends.django_orm.test_util import TenantAwareTestRunner
-from tenant_router.orm_backends.utils import deconstruct_conn_alias
+from tenant_router.orm_backends.utils import (
+    construct_conn_alias, deconstruct_conn_alias
+)
 
 
 class DjangoOrmManager(BaseOrmManager):
@@ -22,10 +34,35 @@ class DjangoOrmManager(BaseOrmManager):
     MIGRATION_ASST_CLS = DjangoOrmMigrationAsst
     ROUTER_CLS = DjangoOrmRouter
 
+    ROUTING_MODE_DATABASE = 'database'
+    ROUTING_MODE_SCHEMA = 'schema'
+
+    # template aliases of the form '<template_alias>_replica_<name>'
+    # register a read replica for '<template_alias>'.
+    REPLICA_MARKER = '_replica_'
+
     # Class specific attributes
     reserved_aliases = set()
 
     def __init__(self, *args, **kwargs):
+        # callables invoked by the router with the conn alias of
+        # every query that it routes.
+        self._route_hooks = ()
+        self._conn_budget = None
+        self._conn_warmer = None
+        self._circuit_breaker = None
+        self._schema_routing = None
+
+        # tenant alias -> {template alias -> ReplicaSet}. Inner dicts are
+        # replaced rather than mutated, same as the conn alias table.
+        self._replica_table = {}
+        self._replica_aliases = frozenset()
+
+        # 'app_label' or 'app_label.model_name' -> template alias
+        self._model_template_alias_table = {}
+        self._mapped_template_aliases = frozenset()
+        self._template_alias_by_model = {}
+
         super().__init__(*args, **kwargs)
 
         options = kwargs.get(
@@ -33,6 +70,12 @@ class DjangoOrmManager(BaseOrmManager):
         ).pop('OPTIONS', {})
 
         self._update_reserved_conn_aliases(options)
+        self._validate_model_template_aliases()
+        self._setup_conn_generations(options)
+        self._setup_conn_warmer(options)
+        self._setup_circuit_breaker(options)
+        self._setup_conn_budget(options)
+        self._setup_health_checker(options)
         self._flush_template_defs()
         self._setup_test_util()
         self._setup_migrate_cmd()
@@ -53,6 +96,119 @@ class DjangoOrmManager(BaseOrmManager):
         self.__class__.reserved_aliases.update(
             reserved_conn_aliases
         )
+        self._set_static_conn_aliases(
+            alias for alias in self.reserved_aliases
+            if alias in self._conn_handler.databases
+        )
+
+    def _setup_conn_generations(self, options_dict):
+        retire_deadline = options_dict.pop('CONN_RETIRE_DEADLINE', 30)
+
+        if not isinstance(retire_deadline, (int, float)) \
+                or retire_deadline < 0:
+            raise ImproperlyConfiguredError(
+                "'CONN_RETIRE_DEADLINE' is expected to be a non negative "
+                "number of seconds. Got '{value}' instead.".format(
+                    value=retire_deadline
+                )
+            )
+
+        self._conn_generations = ConnectionGenerations(
+            self._conn_handler, retire_deadline=retire_deadline
+        )
+        self.add_route_hook(self._conn_generations.check)
+        request_finished.connect(
+            self._conn_generations.close_deleted,
+            dispatch_uid='tenant_router_close_deleted_connections'
+        )
+        request_finished.connect(
+            self._conn_generations.drain,
+            dispatch_uid='tenant_router_drain_retired_connections'
+        )
+
+    def _setup_conn_warmer(self, options_dict):
+        warm_up_dict = options_dict.pop('WARM_UP', None)
+        if warm_up_dict is None:
+            return
+
+        if not isinstance(warm_up_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'WARM_UP' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(warm_up_dict)
+                )
+            )
+
+        self._conn_warmer = ConnectionWarmer(
+            self._conn_handler,
+            self._conn_generations,
+            max_workers=warm_up_dict.get('MAX_WORKERS', 4),
+            hot_count=warm_up_dict.get('HOT_COUNT', 20),
+            idle_timeout=warm_up_dict.get('IDLE_TIMEOUT', 60)
+        )
+        # runs ahead of the generation check, which would otherwise open
+        # a connection of its own for the thread.
+        self.add_route_hook(self._conn_warmer.on_route, first=True)
+
+    def _setup_circuit_breaker(self, options_dict):
+        circuit_breaker_dict = options_dict.pop('CIRCUIT_BREAKER', None)
+        if circuit_breaker_dict is None:
+            return
+
+        if not isinstance(circuit_breaker_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'CIRCUIT_BREAKER' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(circuit_breaker_dict)
+                )
+            )
+
+        self._circuit_breaker = CircuitBreaker(
+            self._conn_handler,
+            failure_threshold=circuit_breaker_dict.get(
+                'FAILURE_THRESHOLD', 5
+            ),
+            cooldown=circuit_breaker_dict.get('COOLDOWN', 30)
+        )
+
+    def _setup_conn_budget(self, options_dict):
+        conn_budget_dict = options_dict.pop('CONN_BUDGET', None)
+        if conn_budget_dict is None:
+            return
+
+        if not isinstance(conn_budget_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'CONN_BUDGET' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(conn_budget_dict)
+                )
+            )
+
+        self._conn_budget = ConnectionBudget(
+            self._conn_handler,
+            max_per_process=conn_budget_dict.get('MAX_PER_PROCESS'),
+            max_per_thread=conn_budget_dict.get('MAX_PER_THREAD')
+        )
+        self.add_route_hook(self._conn_budget.touch)
+
+    def _setup_health_checker(self, options_dict):
+        health_check_dict = options_dict.pop('HEALTH_CHECK', {})
+
+        if not isinstance(health_check_dict, dict):
+            raise ImproperlyConfiguredError(
+                "'HEALTH_CHECK' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(health_check_dict)
+                )
+            )
+
+        self._health_checker = HealthChecker(
+            self._conn_handler,
+            max_workers=health_check_dict.get('MAX_WORKERS', 8),
+            timeout=health_check_dict.get('TIMEOUT', 5),
+            cache_ttl=health_check_dict.get('CACHE_TTL', 30),
+            probe_interval=health_check_dict.get('PROBE_INTERVAL')
+        )
 
     def _flush_template_defs(self):
         for alias in tuple(
@@ -89,21 +245,241 @@ class DjangoOrmManager(BaseOrmManager):
         )
 
     @property
-    def conn_aliases(self):
-        aliases = (
-            set(self._conn_handler.databases.keys())
-            - self.template_aliases
+    def route_hooks(self):
+        return self._route_hooks
+
+    def add_route_hook(self, hook, first=False):
+        if first:
+            self._route_hooks = (hook, ) + self._route_hooks
+        else:
+            self._route_hooks = self._route_hooks + (hook, )
+
+    @property
+    def conn_generations(self):
+        return self._conn_generations
+
+    @property
+    def conn_warmer(self):
+        return self._conn_warmer
+
+    @property
+    def circuit_breaker(self):
+        return self._circuit_breaker
+
+    @property
+    def conn_budget(self):
+        return self._conn_budget
+
+    @property
+    def schema_routing(self):
+        return self._schema_routing
+
+    def get_shared_conn(self, conn_alias):
+        # returns (shared alias, schema) in the 'schema' routing mode
+        # and None otherwise.
+        if self._schema_routing is None:
+            return None
+
+        return self._schema_routing.get_shared_conn(conn_alias)
+
+    def activate_schema(self, shared_alias, schema):
+        self._schema_routing.activate(shared_alias, schema)
+
+    def ensure_schema(self, conn_alias):
+        # creates the schema backing `conn_alias` if it's missing. A no-op
+        # in the 'database' routing mode.
+        if self._schema_routing is not None:
+            self._schema_routing.ensure_schema(conn_alias)
+
+    def _split_replica_alias(self, template_alias):
+        primary_template_alias, marker, replica_name = \
+            template_alias.partition(self.REPLICA_MARKER)
+
+        if marker and primary_template_alias in self.template_aliases:
+            return primary_template_alias, replica_name
+
+        return template_alias, None
+
+    @staticmethod
+    def _get_replica_weight(conn_alias, replica_weight):
+        try:
+            replica_weight = int(replica_weight)
+        except (TypeError, ValueError):
+            replica_weight = 0
+
+        if replica_weight < 1:
+            raise ImproperlyConfiguredError(
+                "'REPLICA_WEIGHT' for conn alias '{conn_alias}' is expected "
+                "to be a positive integer.".format(conn_alias=conn_alias)
+            )
+
+        return replica_weight
+
+    def _add_replica(
+            self, tenant_alias, template_alias, conn_alias, weight
+    ):
+        replica_sets = self._replica_table.get(tenant_alias, {})
+        self._replica_table[tenant_alias] = {
+            **replica_sets,
+            template_alias: replica_sets.get(
+                template_alias, ReplicaSet(())
+            ).with_replica(conn_alias, weight)
+        }
+        self._replica_aliases = self._replica_aliases | {conn_alias}
+
+    def _remove_replica(self, tenant_alias, template_alias, conn_alias):
+        replica_sets = dict(self._replica_table.get(tenant_alias, {}))
+        replica_set = replica_sets.pop(
+            template_alias, ReplicaSet(())
+        ).without_replica(conn_alias)
+
+        if replica_set:
+            replica_sets[template_alias] = replica_set
+
+        if replica_sets:
+            self._replica_table[tenant_alias] = replica_sets
+        else:
+            self._replica_table.pop(tenant_alias, None)
+
+        self._replica_aliases = self._replica_aliases - {conn_alias}
+
+    @property
+    def replica_aliases(self):
+        return self._replica_aliases
+
+    def pick_replica(self, tenant_alias, template_alias):
+        """
+        Returns the next healthy replica of the given tenant and template
+        alias, or None if there isn't any and the read should go to the
+        primary.
+        """
+        try:
+            replica_set = self._replica_table[tenant_alias][template_alias]
+        except KeyError:
+            return None
+
+        return replica_set.pick(self._is_replica_available)
+
+    def _is_replica_available(self, conn_alias):
+        return self._health_checker.is_healthy(conn_alias) and (
+            self._circuit_breaker is None
+            or self._circuit_breaker.allows(conn_alias)
+        )
+
+    def _setup_routing_mode(self, routing_mode):
+        if routing_mode == self.ROUTING_MODE_SCHEMA:
+            self._schema_routing = SchemaRouting(self._conn_handler)
+
+        elif routing_mode != self.ROUTING_MODE_DATABASE:
+            raise ImproperlyConfiguredError(
+                "Invalid 'ROUTING_MODE' {routing_mode}. Expected one of "
+                "'{database}' or '{schema}'.".format(
+                    routing_mode=routing_mode,
+                    database=self.ROUTING_MODE_DATABASE,
+                    schema=self.ROUTING_MODE_SCHEMA
+                )
+            )
+
+    def _setup_model_template_aliases(self, model_template_aliases):
+        if not isinstance(model_template_aliases, dict):
+            raise ImproperlyConfiguredError(
+                "'MODEL_TEMPLATE_ALIASES' is expected to be of type 'dict'. "
+                "Got type '{type_}' instead.".format(
+                    type_=type(model_template_aliases)
+                )
+            )
+
+        self._model_template_alias_table = {
+            model_label.lower(): template_alias
+            for model_label, template_alias in model_template_aliases.items()
+        }
+        self._mapped_template_aliases = frozenset(
+            self._model_template_alias_table.values()
         )
 
-        if self.DEFAULT_CONN_ALIAS in aliases \
-                and self.DEFAULT_CONN_ALIAS not in self.reserved_aliases:
-            # if 'default' alias is neither a template nor a reserved alias
-            # then it points to the `DUMMY` db conf and so removing it.
-            aliases.remove(self.DEFAULT_CONN_ALIAS)
+    def _validate_model_template_aliases(self):
+        # runs only once the reserved aliases are known.
+        for model_label, template_alias in \
+                self._model_template_alias_table.items():
+            if template_alias not in self.template_aliases \
+                    and template_alias not in self.reserved_aliases:
+                raise ImproperlyConfiguredError(
+                    "'MODEL_TEMPLATE_ALIASES' maps '{model_label}' to "
+                    "'{template_alias}' which is neither a template nor a "
+                    "reserved alias.".format(
+                        model_label=model_label,
+                        template_alias=template_alias
+                    )
+                )
 
-        return aliases
+    def is_migration_routed_to(self, conn_alias, app_label, model_name=None):
+        """
+        Tells whether 'MODEL_TEMPLATE_ALIASES' routes the given model to
+        `conn_alias`. Models which aren't mapped keep migrating to every
+        alias other than the ones that some model has been mapped to.
+        """
+        if not self._model_template_alias_table:
+            return True
+
+        target_alias = self.get_template_alias_for_migration(
+            app_label, model_name
+        )
+        template_alias = self.get_template_alias_for_conn_alias(conn_alias)
+
+        if target_alias == template_alias:
+            return True
+
+        return target_alias == self.DEFAULT_CONN_ALIAS \
+            and template_alias not in self._mapped_template_aliases
+
+    def get_template_alias_for_model(self, model):
+        """
+        Returns the template (or reserved) alias that queries for `model`
+        are routed to, as per the 'MODEL_TEMPLATE_ALIASES' router option.
+        The result is memoized per model class.
+        """
+        try:
+            return self._template_alias_by_model[model]
+        except KeyError:
+            pass
+
+        template_alias = self._model_template_alias_table.get(
+            model._meta.label_lower
+        ) or self._model_template_alias_table.get(
+            model._meta.app_label, self.DEFAULT_CONN_ALIAS
+        )
+        self._template_alias_by_model[model] = template_alias
+        return template_alias
+
+    def get_template_alias_for_migration(self, app_label, model_name=None):
+        if model_name is not None:
+            template_alias = self._model_template_alias_table.get(
+                '{app_label}.{model_name}'.format(
+                    app_label=app_label, model_name=model_name
+                ).lower()
+            )
+            if template_alias:
+                return template_alias
+
+        return self._model_template_alias_table.get(
+            app_label, self.DEFAULT_CONN_ALIAS
+        )
+
+    def get_template_alias_for_conn_alias(self, conn_alias):
+        if conn_alias in self.reserved_aliases:
+            return conn_alias
+
+        _, _, template_alias = deconstruct_conn_alias(conn_alias)
+        return template_alias
 
     def setup_router(self, router_opts):
+        self._setup_routing_mode(
+            router_opts.get('ROUTING_MODE', self.ROUTING_MODE_DATABASE)
+        )
+        self._setup_model_template_aliases(
+            router_opts.get('MODEL_TEMPLATE_ALIASES', {})
+        )
+
         mig_strategy_path = router_opts.get(
             'MIGRATE_STRATEGY', ''
         )
@@ -125,11 +501,26 @@ class DjangoOrmManager(BaseOrmManager):
             conn_alias,
             db_config
     ):
-        _, _, template_alias = deconstruct_conn_alias(conn_alias)
-        template_config = self.get_template_config(
+        tenant_alias, _, template_alias = deconstruct_conn_alias(conn_alias)
+        primary_template_alias, replica_name = self._split_replica_alias(
             template_alias
         )
+        template_config = self.get_template_config(
+            primary_template_alias
+        )
         final_db_config = {**template_config, **db_config}
+        replica_weight = self._get_replica_weight(
+            conn_alias, final_db_config.pop('REPLICA_WEIGHT', 1)
+        )
+
+        if replica_name is not None:
+            # test databases of replicas mirror the primary.
+            final_db_config['TEST'] = {
+                **final_db_config.get('TEST', {}),
+                'MIRROR': construct_conn_alias(
+                    tenant_alias, self.ORM_KEY, primary_template_alias
+                )
+            }
 
         if conn_alias in self.reserved_aliases:
             raise Exception(
@@ -141,19 +532,63 @@ class DjangoOrmManager(BaseOrmManager):
                 )
             )
 
+        if self._schema_routing is not None:
+            final_db_config = self._schema_routing.register(
+                conn_alias, tenant_alias, final_db_config
+            )
+
         self._conn_handler.databases[conn_alias] = final_db_config
+        self._add_to_conn_alias_table(
+            tenant_alias, template_alias, conn_alias
+        )
+        self._conn_generations.revive(conn_alias)
+
+        if replica_name is not None:
+            self._add_replica(
+                tenant_alias, primary_template_alias,
+                conn_alias, replica_weight
+            )
 
     def update_config(self, conn_alias, updated_db_config):
         self.register_config(
             conn_alias, db_config=updated_db_config
         )
-        if self._is_conn_created(conn_alias):
-            print("removing old ", conn_alias)
-            self._conn_handler[conn_alias].close()
-            del self._conn_handler[conn_alias]
+        # open connections, including the one in this thread, are retired
+        # by the generation check in the router and closed once the
+        # request using them finishes.
+        self._conn_generations.bump(conn_alias)
+
+        # the new config may well point to a healthy server.
+        if self._circuit_breaker:
+            self._circuit_breaker.forget(conn_alias)
 
     def delete_config(self, conn_alias):
+        tenant_alias, _, template_alias = deconstruct_conn_alias(conn_alias)
+        self._remove_from_conn_alias_table(tenant_alias, template_alias)
+
+        primary_template_alias, replica_name = self._split_replica_alias(
+            template_alias
+        )
+        if replica_name is not None:
+            self._remove_replica(
+                tenant_alias, primary_template_alias, conn_alias
+            )
         self._conn_handler.databases.pop(conn_alias)
+        self._conn_generations.bump(conn_alias, deleted=True)
+
+        if self._schema_routing is not None:
+            self._schema_routing.unregister(conn_alias)
+
+        if self._conn_budget:
+            self._conn_budget.forget(conn_alias)
+
+        if self._conn_warmer:
+            self._conn_warmer.forget(conn_alias)
+
+        if self._circuit_breaker:
+            self._circuit_breaker.forget(conn_alias)
+
+        self._health_checker.forget(conn_alias)
 
         if self._is_conn_created(conn_alias):
             print("removing deleted ", conn_alias)
@@ -163,6 +598,24 @@ class DjangoOrmManager(BaseOrmManager):
     def refresh_stale_connections(self):
         close_old_connections()
 
+    def drain_retired_connections(self):
+        self._conn_generations.drain()
+
+    def warm_up(self, conn_aliases):
+        if not self._conn_warmer:
+            return
+
+        aliases_to_warm = set()
+        for conn_alias in conn_aliases:
+            # in the 'schema' routing mode the shared alias is the one
+            # that ends up being connected to.
+            shared_conn = self.get_shared_conn(conn_alias)
+            aliases_to_warm.add(
+                conn_alias if shared_conn is None else shared_conn[0]
+            )
+
+        self._conn_warmer.warm(aliases_to_warm)
+
     def format_conn_url(self, conn_url):
         config_dict = dj_database_url.parse(conn_url)
         config_dict.pop('ENGINE')
@@ -184,27 +637,34 @@ class DjangoOrmManager(BaseOrmManager):
             for conn_alias in self.conn_aliases
         }.items()
 
-    def _check_health(self, conn_alias):
-        result = True
-        msg = ''
-        connection = self._conn_handler[conn_alias]
-        connection.ensure_connection()
+    def perform_health_check(self, tenant_alias=None):
+        if tenant_alias is None:
+            conn_aliases = self.conn_aliases
+        else:
+            conn_aliases = self.conn_aliases_for_tenant(tenant_alias)
 
-        if not connection.is_usable():
-            result = False
-            msg = 'Unable to connect to the database for ' \
-                  'alias {conn_alias}'.format(conn_alias=conn_alias)
+        return self._health_checker.check(conn_aliases)
 
-        return result, msg
+    def get_circuit_breaker_state(self):
+        if self._circuit_breaker is None:
+            return {}
 
-    def perform_health_check(self):
-        health_check_dict = {}
+        return self._circuit_breaker.get_stats()
 
-        for conn_alias in self.conn_aliases:
-            result, msg = self._check_health(conn_alias)
-            health_check_dict[conn_alias] = {
-                'result': result,
-                'msg': msg
-            }
+    def on_worker_init(self):
+        self._health_checker.start(
+            lambda: self.conn_aliases, lambda: self.replica_aliases
+        )
+
+        if self._conn_warmer:
+            self._conn_warmer.warm(
+                conn_alias for conn_alias in self._conn_warmer.get_hot_aliases()
+                if conn_alias in self._conn_handler.databases
+            )
+
+    def on_worker_exit(self):
+        self._health_checker.stop()
 
-        return health_check_dict
+        if self._conn_warmer:
+            self._conn_warmer.save_hot_aliases()
+            self._conn_warmer.stop()
@@ -1,33 +1,474 @@
-from django.core.management import call_command, CommandError
+import concurrent.futures
+import contextlib
+import itertools
+import threading
+import time
+from collections import defaultdict, OrderedDict
 
-from tenant_router.orm_backends.base.migration_assistant import BaseMigrationAsst
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.managers import tenant_context_manager
+from tenant_router.managers.tenant_context import TenantContextNotFound
+from tenant_router.orm_backends.base.migration_assistant import (
+    BaseMigrationAsst, MigrationResult
+)
+from tenant_router.orm_backends.django_orm.migration_runner import (
+    MigrationRunner
+)
+from tenant_router.orm_backends.django_orm.rollout import (
+    get_rollout_fingerprint, MigrationRollout
+)
 
 
 class DjangoOrmMigrationAsst(BaseMigrationAsst):
+    """
+    Migrates tenant databases on a pool of `workers` threads, running at
+    most `max_per_server` migrations against a single database server at
+    a time. Migrations are loaded from disk once per run and applied to
+    every database through a `MigrationRunner` rather than `call_command`,
+    which isn't safe to be run from several threads. Databases whose
+    `django_migrations` table already contains every node of the graph
+    are skipped without building a migration plan at all.
+
+    Passing any of the `rollout` options migrates tenants in waves as
+    described in `MigrationRollout`.
+    """
+
+    def __init__(
+            self,
+            manager,
+            workers=1,
+            max_per_server=None,
+            rollout=None,
+            **options
+    ):
+        super().__init__(manager, **options)
+        self._workers = workers
+        self._max_per_server = max_per_server
+        self._rollout_opts = rollout or {}
+
+    def _run_migrations(self, runner, conn_alias, tenant_id):
+        if tenant_id is None:
+            # a reserved alias.
+            runner.migrate(conn_alias)
+            return
+
+        self.manager.ensure_schema(conn_alias)
+        with tenant_context_bind(tenant_id):
+            runner.migrate(conn_alias)
+
+    def _perform_migrate(self, runner, template_alias, conn_alias,
+                         tenant_id=None):
+        st_time = time.perf_counter()
+
+        try:
+            self._run_migrations(runner, conn_alias, tenant_id)
+            status = MigrationResult.MIGRATED
+            error = ''
+        except Exception as e:
+            status = MigrationResult.FAILED
+            error = "Migration failed for database alias '{template_alias}' " \
+                    "for tenant '{tenant_id}': {exc_info}".format(
+                        template_alias=template_alias,
+                        tenant_id=tenant_id,
+                        exc_info=e
+                    )
+
+        return MigrationResult(
+            template_alias,
+            tenant_id=tenant_id,
+            status=status,
+            elapsed=time.perf_counter() - st_time,
+            error=error
+        )
+
+    @staticmethod
+    def _get_target_nodes():
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        return frozenset(loader.graph.nodes)
 
-    def _perform_migrate(self, template_alias, tenant_id=None):
+    def _get_conn_alias(self, tenant_id):
+        tenant_context = tenant_context_manager.get_by_id(tenant_id)
+        return tenant_context.get_conn_alias(
+            self.manager.ORM_KEY, self.manager.DEFAULT_CONN_ALIAS
+        )
+
+    @staticmethod
+    def _is_up_to_date(conn_alias, target_nodes):
         try:
-            call_command(
-                "migrate",
-                database=template_alias,
+            applied_nodes = MigrationRecorder(
+                connections[conn_alias]
+            ).applied_migrations()
+            return target_nodes.issubset(applied_nodes)
+        except Exception:
+            # let `migrate` surface the actual error.
+            return False
+
+    @staticmethod
+    def _close_connection(conn_alias):
+        # worker threads outlive a single tenant and so their
+        # connections have to be closed explicitly.
+        if hasattr(connections._connections, conn_alias):
+            connections[conn_alias].close()
+
+    def _get_server_key(self, tenant_id):
+        try:
+            db_config = connections.databases[
+                self._get_conn_alias(tenant_id)
+            ]
+        except (KeyError, TenantContextNotFound):
+            return None
+
+        return db_config.get('HOST'), db_config.get('PORT')
+
+    def _group_by_server(self, tenant_ids):
+        tenant_ids_by_server = OrderedDict()
+        for tenant_id in tenant_ids:
+            tenant_ids_by_server.setdefault(
+                self._get_server_key(tenant_id), []
+            ).append(tenant_id)
+
+        return tenant_ids_by_server
+
+    @staticmethod
+    def _interleave(tenant_ids_by_server):
+        # orders tenants round-robin across servers so that workers
+        # rarely have to wait on the cap of a single server.
+        for tenant_ids in itertools.zip_longest(
+                *tenant_ids_by_server.values()
+        ):
+            for tenant_id in tenant_ids:
+                if tenant_id is not None:
+                    yield tenant_id
+
+    def _get_conn_aliases(self, tenant_id):
+        # template alias -> conn alias for every database of the tenant
+        # that has to be migrated, starting with the default one.
+        tenant_context = tenant_context_manager.get_by_id(tenant_id)
+        conn_aliases = OrderedDict([(
+            self.manager.DEFAULT_CONN_ALIAS,
+            tenant_context.get_conn_alias(
+                self.manager.ORM_KEY, self.manager.DEFAULT_CONN_ALIAS
+            )
+        )])
+
+        for template_alias, conn_alias in sorted(
+                self.manager.get_conn_alias_map(tenant_context.alias).items()
+        ):
+            if conn_alias not in self.manager.replica_aliases:
+                conn_aliases.setdefault(template_alias, conn_alias)
+
+        return conn_aliases
+
+    def _migrate_conn_alias(
+            self, runner, tenant_id, template_alias, conn_alias,
+            skip_up_to_date
+    ):
+        st_time = time.perf_counter()
+        try:
+            if skip_up_to_date \
+                    and self._is_up_to_date(conn_alias, runner.target_nodes):
+                return MigrationResult(
+                    template_alias,
+                    tenant_id=tenant_id,
+                    status=MigrationResult.UP_TO_DATE,
+                    elapsed=time.perf_counter() - st_time
+                )
+
+            return self._perform_migrate(
+                runner,
+                template_alias=template_alias,
+                conn_alias=conn_alias,
                 tenant_id=tenant_id
             )
-        except CommandError:
-            print(
-                "Migration failed for database alias '{template_alias}' "
-                "for tenant '{tenant_id}'".format(
+        finally:
+            self._close_connection(conn_alias)
+
+    def _migrate_tenant(self, runner, tenant_id, skip_up_to_date,
+                        server_semaphore):
+        with server_semaphore:
+            try:
+                conn_aliases = self._get_conn_aliases(tenant_id)
+            except TenantContextNotFound as e:
+                return [
+                    MigrationResult(
+                        self.manager.DEFAULT_CONN_ALIAS,
+                        tenant_id=tenant_id,
+                        status=MigrationResult.FAILED,
+                        error=str(e)
+                    )
+                ]
+
+            return [
+                self._migrate_conn_alias(
+                    runner, tenant_id, template_alias, conn_alias,
+                    skip_up_to_date
+                )
+                for template_alias, conn_alias in conn_aliases.items()
+            ]
+
+    def _count_migrations(self, tenant_ids):
+        # progress is reported per database, a tenant which can't be
+        # found counts as one, failed, migration.
+        count = 0
+        for tenant_id in tenant_ids:
+            try:
+                count += len(self._get_conn_aliases(tenant_id))
+            except TenantContextNotFound:
+                count += 1
+
+        return count
+
+    def _migrate_tenants(self, runner, tenant_ids, skip_up_to_date, workers,
+                         max_per_server, progress_callback, total,
+                         completed=0):
+        tenant_ids_by_server = self._group_by_server(tenant_ids)
+        server_semaphores = {
+            server_key: (
+                threading.BoundedSemaphore(max_per_server)
+                if max_per_server else contextlib.nullcontext()
+            )
+            for server_key in tenant_ids_by_server
+        }
+        server_key_by_tenant_id = {
+            tenant_id: server_key
+            for server_key, ids in tenant_ids_by_server.items()
+            for tenant_id in ids
+        }
+
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='tenant_router_migrate'
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._migrate_tenant,
+                    runner,
+                    tenant_id,
+                    skip_up_to_date,
+                    server_semaphores[server_key_by_tenant_id[tenant_id]]
+                )
+                for tenant_id in self._interleave(tenant_ids_by_server)
+            ]
+
+            for future in concurrent.futures.as_completed(futures):
+                for result in future.result():
+                    results.append(result)
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(result, completed, total)
+
+        return results
+
+    def _get_conn_alias_migration_status(self, conn_alias, nodes_by_app):
+        status = {
+            'pending': {},
+            'error': None
+        }
+
+        try:
+            applied_nodes = MigrationRecorder(
+                connections[conn_alias]
+            ).applied_migrations()
+        except Exception as e:
+            status['error'] = str(e)
+            return status
+        finally:
+            self._close_connection(conn_alias)
+
+        for app_label, nodes in nodes_by_app.items():
+            pending_count = len(nodes.difference(applied_nodes))
+            if pending_count:
+                status['pending'][app_label] = pending_count
+
+        return status
+
+    def _get_tenant_migration_status(self, tenant_id, nodes_by_app):
+        # 'pending' and 'error' sum up those of every database of the
+        # tenant, which are listed under 'databases' by template alias.
+        status = {
+            'pending': {},
+            'error': None,
+            'databases': {}
+        }
+
+        try:
+            conn_aliases = self._get_conn_aliases(tenant_id)
+        except TenantContextNotFound as e:
+            status['error'] = str(e)
+            return status
+
+        errors = []
+        for template_alias, conn_alias in conn_aliases.items():
+            conn_alias_status = self._get_conn_alias_migration_status(
+                conn_alias, nodes_by_app
+            )
+            status['databases'][template_alias] = conn_alias_status
+
+            for app_label, pending_count in \
+                    conn_alias_status['pending'].items():
+                status['pending'][app_label] = \
+                    status['pending'].get(app_label, 0) + pending_count
+
+            if conn_alias_status['error']:
+                errors.append('{template_alias}: {error}'.format(
                     template_alias=template_alias,
-                    tenant_id=tenant_id
+                    error=conn_alias_status['error']
+                ))
+
+        status['error'] = '; '.join(errors) or None
+        return status
+
+    def get_migration_status(self, tenant_ids, workers=None):
+        """
+        Returns a dict of tenant id to the count of pending migrations per
+        app, read from the `django_migrations` table of every database of
+        every tenant (replicas aside) concurrently and diffed against the
+        migration graph on disk.
+        """
+        nodes_by_app = defaultdict(set)
+        for app_label, migration_name in self._get_target_nodes():
+            nodes_by_app[app_label].add((app_label, migration_name))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers or self._workers,
+                thread_name_prefix='tenant_router_migration_status'
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._get_tenant_migration_status,
+                    tenant_id,
+                    nodes_by_app
+                ): tenant_id
+                for tenant_id in tenant_ids
+            }
+
+            return {
+                futures[future]: future.result()
+                for future in concurrent.futures.as_completed(futures)
+            }
+
+    def _get_rollout(self, target_nodes, kwargs):
+        rollout_opts = {
+            **self._rollout_opts,
+            **{
+                key: kwargs[key]
+                for key in (
+                    'canary_tenant_ids', 'wave_size',
+                    'wave_growth', 'max_failure_rate', 'state_ttl'
                 )
+                if kwargs.get(key) is not None
+            }
+        }
+        if not rollout_opts and not any(
+                kwargs.get(key)
+                for key in ('rollout_id', 'resume_rollout', 'restart_rollout')
+        ):
+            return None
+
+        rollout_id = kwargs.get('rollout_id') or get_rollout_fingerprint(
+            target_nodes
+        )
+        rollout = MigrationRollout(rollout_id, **rollout_opts)
+        rollout.validate_canary_tenant_ids(tenant_context_manager.contains)
+
+        if kwargs.get('restart_rollout', False):
+            rollout.reset_state()
+        else:
+            rollout.load_state()
+
+        if kwargs.get('resume_rollout', False) and rollout.halted:
+            rollout.resume()
+
+        return rollout
+
+    def _perform_rollout(self, runner, rollout, tenant_ids, skip_up_to_date,
+                         workers, max_per_server, progress_callback, total):
+        results = []
+        attempted_tenant_ids = set()
+
+        for is_canary, wave_tenant_ids in rollout.plan_waves(tenant_ids):
+            if rollout.refresh_halted():
+                break
+
+            wave_results = self._migrate_tenants(
+                runner, wave_tenant_ids, skip_up_to_date, workers,
+                max_per_server, progress_callback, total,
+                completed=len(results)
             )
+            results.extend(wave_results)
+            attempted_tenant_ids.update(wave_tenant_ids)
 
-    def perform_migrate(self, tenant_ids, **kwargs):
-        for tenant_id in tenant_ids:
-            self._perform_migrate(
-                template_alias=self.manager.DEFAULT_CONN_ALIAS,
-                tenant_id=tenant_id
+            if not rollout.record_wave(wave_results, is_canary):
+                break
+
+        # tenants completed by an earlier run aren't reported as progress.
+        results.extend(
+            MigrationResult(
+                self.manager.DEFAULT_CONN_ALIAS,
+                tenant_id=tenant_id,
+                status=MigrationResult.UP_TO_DATE
+            )
+            for tenant_id in tenant_ids
+            if tenant_id not in attempted_tenant_ids
+            and rollout.is_completed(tenant_id)
+        )
+
+        if rollout.halted:
+            results.extend(
+                MigrationResult(
+                    self.manager.DEFAULT_CONN_ALIAS,
+                    tenant_id=tenant_id,
+                    status=MigrationResult.HALTED
+                )
+                for tenant_id in tenant_ids
+                if tenant_id not in attempted_tenant_ids
+                and not rollout.is_completed(tenant_id)
             )
+
+        return results
+
+    def perform_migrate(self, tenant_ids, progress_callback=None, **kwargs):
+        workers = kwargs.get('workers') or self._workers
+        max_per_server = kwargs.get('max_per_server') or self._max_per_server
+        skip_up_to_date = kwargs.get('skip_up_to_date', True)
+
         exclude_reserved_aliases = kwargs.get("exclude_reserved_aliases", False)
-        if not exclude_reserved_aliases:
-            for alias in self.manager.reserved_aliases:
-                self._perform_migrate(alias)
+        reserved_aliases = () if exclude_reserved_aliases \
+            else tuple(self.manager.reserved_aliases)
+
+        runner = MigrationRunner()
+        rollout = self._get_rollout(runner.target_nodes, kwargs)
+
+        if rollout is None:
+            total = self._count_migrations(tenant_ids) + len(reserved_aliases)
+            results = self._migrate_tenants(
+                runner, tenant_ids, skip_up_to_date, workers,
+                max_per_server, progress_callback, total
+            )
+        else:
+            total = self._count_migrations([
+                tenant_id for tenant_id in tenant_ids
+                if not rollout.is_completed(tenant_id)
+            ]) + len(reserved_aliases)
+            results = self._perform_rollout(
+                runner, rollout, tenant_ids, skip_up_to_date, workers,
+                max_per_server, progress_callback, total
+            )
+            if rollout.halted:
+                # reserved aliases are left untouched as well.
+                return results
+
+        completed = total - len(reserved_aliases)
+        for alias in reserved_aliases:
+            result = self._perform_migrate(runner, alias, alias)
+            results.append(result)
+            completed += 1
+            if progress_callback:
+                progress_callback(result, completed, total)
+
+        return results
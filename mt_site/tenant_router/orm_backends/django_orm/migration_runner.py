@@ -0,0 +1,136 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management import CommandError
+from django.core.management.sql import (
+    emit_post_migrate_signal, emit_pre_migrate_signal
+)
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.migrations.state import ModelState
+from django.utils.module_loading import module_has_submodule
+
+
+class _PreloadedMigrationLoader(MigrationLoader):
+    """
+    Builds the graph of a single connection out of migrations which have
+    already been loaded from disk, rather than importing every migration
+    module once again.
+    """
+
+    def __init__(self, connection, disk_loader):
+        self._disk_loader = disk_loader
+        super().__init__(connection, ignore_no_migrations=True)
+
+    def load_disk(self):
+        self.disk_migrations = self._disk_loader.disk_migrations
+        self.unmigrated_apps = self._disk_loader.unmigrated_apps
+        self.migrated_apps = self._disk_loader.migrated_apps
+
+
+class _MigrationExecutor(MigrationExecutor):
+
+    def __init__(self, connection, disk_loader):
+        self.connection = connection
+        self.loader = _PreloadedMigrationLoader(connection, disk_loader)
+        self.recorder = MigrationRecorder(connection)
+        self.progress_callback = None
+
+
+class MigrationRunner:
+    """
+    Applies every migration on disk to a database alias the same way
+    `migrate` (without any arguments) does, except that migrations are
+    loaded from disk just once, when the runner is created, rather than
+    once per alias. Unlike `call_command`, `migrate` can safely be called
+    for different aliases from several threads at the same time.
+    """
+
+    def __init__(self):
+        # registers the `pre_migrate` and `post_migrate` handlers of
+        # every app, which `migrate` would do on every run.
+        for app_config in apps.get_app_configs():
+            if module_has_submodule(app_config.module, 'management'):
+                import_module('.management', app_config.name)
+
+        self._disk_loader = MigrationLoader(None, ignore_no_migrations=True)
+
+    @property
+    def target_nodes(self):
+        return frozenset(self._disk_loader.graph.nodes)
+
+    def _get_executor(self, connection):
+        executor = _MigrationExecutor(connection, self._disk_loader)
+
+        # raises if any migration has been applied before its
+        # dependencies.
+        executor.loader.check_consistent_history(connection)
+
+        conflicts = executor.loader.detect_conflicts()
+        if conflicts:
+            raise CommandError(
+                "Conflicting migrations detected; multiple leaf nodes in the "
+                "migration graph: ({conflicts}).".format(
+                    conflicts='; '.join(
+                        '{names} in {app_label}'.format(
+                            names=', '.join(names),
+                            app_label=app_label
+                        )
+                        for app_label, names in conflicts.items()
+                    )
+                )
+            )
+
+        return executor
+
+    @staticmethod
+    def _render_post_migrate_apps(post_migrate_state):
+        # `post_migrate` handlers have access to every model, with its
+        # relationships, same as in `migrate`.
+        post_migrate_state.clear_delayed_apps_cache()
+        post_migrate_apps = post_migrate_state.apps
+
+        with post_migrate_apps.bulk_update():
+            model_keys = []
+            for model_state in post_migrate_apps.real_models:
+                model_key = model_state.app_label, model_state.name_lower
+                model_keys.append(model_key)
+                post_migrate_apps.unregister_model(*model_key)
+
+        post_migrate_apps.render_multiple([
+            ModelState.from_model(apps.get_model(*model_key))
+            for model_key in model_keys
+        ])
+        return post_migrate_apps
+
+    def migrate(self, db_alias):
+        """
+        Applies the pending migrations of `db_alias` and returns the count
+        of migrations applied.
+        """
+        connection = connections[db_alias]
+        connection.prepare_database()
+
+        executor = self._get_executor(connection)
+        targets = executor.loader.graph.leaf_nodes()
+        plan = executor.migration_plan(targets)
+
+        pre_migrate_state = executor._create_project_state(
+            with_applied_migrations=True
+        )
+        emit_pre_migrate_signal(
+            0, False, db_alias, apps=pre_migrate_state.apps, plan=plan
+        )
+
+        post_migrate_state = executor.migrate(
+            targets, plan=plan, state=pre_migrate_state.clone()
+        )
+
+        emit_post_migrate_signal(
+            0, False, db_alias,
+            apps=self._render_post_migrate_apps(post_migrate_state),
+            plan=plan
+        )
+        return len(plan)
@@ -0,0 +1,91 @@
+import itertools
+from contextvars import ContextVar
+
+
+# (tenant alias, template alias) pairs written to in the current
+# request/task, whose reads are pinned to the primary.
+_written_aliases = ContextVar(
+    'tenant_router_written_aliases', default=frozenset()
+)
+
+
+def mark_written(tenant_alias, template_alias):
+    written_aliases = _written_aliases.get()
+    if (tenant_alias, template_alias) not in written_aliases:
+        _written_aliases.set(
+            written_aliases | {(tenant_alias, template_alias)}
+        )
+
+
+def is_written(tenant_alias, template_alias):
+    return (tenant_alias, template_alias) in _written_aliases.get()
+
+
+def reset_read_your_writes(**kwargs):
+    _written_aliases.set(frozenset())
+
+
+def _get_weighted_sequence(replicas):
+    # smooth weighted round robin, precomputed for one full cycle so
+    # that replicas with a higher weight are spread out evenly
+    # instead of being picked back to back.
+    total_weight = sum(weight for _, weight in replicas)
+    current_weights = [0] * len(replicas)
+    sequence = []
+
+    for _ in range(total_weight):
+        for index, (_, weight) in enumerate(replicas):
+            current_weights[index] += weight
+
+        picked_index = max(
+            range(len(replicas)), key=current_weights.__getitem__
+        )
+        current_weights[picked_index] -= total_weight
+        sequence.append(replicas[picked_index][0])
+
+    return sequence
+
+
+class ReplicaSet:
+    """
+    An immutable set of (conn alias, weight) pairs for the replicas of
+    a single tenant and template alias. Adding or removing a replica
+    returns a new set.
+    """
+    __slots__ = ('replicas', '_cycle', '_cycle_length')
+
+    def __init__(self, replicas):
+        self.replicas = tuple(replicas)
+
+        sequence = _get_weighted_sequence(self.replicas)
+        self._cycle = itertools.cycle(sequence)
+        self._cycle_length = len(sequence)
+
+    def with_replica(self, conn_alias, weight):
+        return ReplicaSet(
+            tuple(
+                replica for replica in self.replicas
+                if replica[0] != conn_alias
+            ) + ((conn_alias, weight), )
+        )
+
+    def without_replica(self, conn_alias):
+        return ReplicaSet(
+            replica for replica in self.replicas
+            if replica[0] != conn_alias
+        )
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def pick(self, is_healthy):
+        """
+        Returns the next healthy replica in the cycle or None if there
+        isn't any.
+        """
+        for _ in range(self._cycle_length):
+            conn_alias = next(self._cycle)
+            if is_healthy(conn_alias):
+                return conn_alias
+
+        return None
@@ -0,0 +1,201 @@
+import hashlib
+import logging
+
+from django.core.cache import caches
+
+from tenant_router.conf import settings
+from tenant_router.constants import constants
+from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+ROLLOUT_PREFIX_KEY = 'migration_rollout'
+
+# 30 days
+DEFAULT_STATE_TTL = 30 * 24 * 60 * 60
+
+
+def get_rollout_fingerprint(target_nodes):
+    return hashlib.sha1(
+        repr(sorted(target_nodes)).encode()
+    ).hexdigest()[:12]
+
+
+class MigrationRollout:
+    """
+    Splits tenants into waves: the canary tenants first, followed by
+    waves that start at `wave_size` tenants and grow by a factor of
+    `wave_growth`. The rollout halts after a wave whose failure rate is
+    above `max_failure_rate`, or after any canary failure.
+
+    Tenants that have been migrated (or found up to date) are persisted
+    in the config store under the rollout id after every wave, so a
+    rollout that was interrupted resumes with the remaining tenants. The
+    rollout id defaults to a fingerprint of the migrations on disk, so
+    adding a migration starts a fresh rollout. The persisted state expires
+    `state_ttl` seconds after the last wave.
+
+    A halted rollout stays halted, across runs, until it's explicitly
+    resumed. The persisted flag is checked ahead of every wave so that a
+    rollout halted elsewhere stops as well.
+    """
+
+    def __init__(
+            self,
+            rollout_id,
+            canary_tenant_ids=(),
+            wave_size=10,
+            wave_growth=2,
+            max_failure_rate=0.1,
+            state_ttl=DEFAULT_STATE_TTL
+    ):
+        self.rollout_id = rollout_id
+        self._canary_tenant_ids = tuple(canary_tenant_ids)
+        self._wave_size = max(1, wave_size)
+        self._wave_growth = max(1, wave_growth)
+        self._max_failure_rate = max_failure_rate
+        self._state_ttl = state_ttl
+
+        self._completed = set()
+        self.halted = False
+
+    @property
+    def _config_store(self):
+        return caches[constants.CONFIG_STORE_ALIAS]
+
+    @property
+    def _state_key(self):
+        return join_keys(
+            settings.TENANT_ROUTER_SERVICE_NAME,
+            ROLLOUT_PREFIX_KEY,
+            self.rollout_id
+        )
+
+    def validate_canary_tenant_ids(self, is_known_tenant_id):
+        unknown_tenant_ids = [
+            tenant_id for tenant_id in self._canary_tenant_ids
+            if not is_known_tenant_id(tenant_id)
+        ]
+        if unknown_tenant_ids:
+            raise ImproperlyConfiguredError(
+                "Unknown canary tenant ids {tenant_ids} for rollout "
+                "{rollout_id}.".format(
+                    tenant_ids=', '.join(
+                        "'{tenant_id}'".format(tenant_id=tenant_id)
+                        for tenant_id in unknown_tenant_ids
+                    ),
+                    rollout_id=self.rollout_id
+                )
+            )
+
+    def load_state(self):
+        state = self._config_store.get(self._state_key, {})
+        self._completed = set(state.get('completed', ()))
+        self.halted = state.get('halted', False)
+
+        if self.halted:
+            logger.warning(
+                "Rollout {rollout_id} has been halted and has to be "
+                "resumed explicitly".format(rollout_id=self.rollout_id)
+            )
+
+        if self._completed:
+            logger.info(
+                "Resuming rollout {rollout_id} with {count} tenants "
+                "already migrated".format(
+                    rollout_id=self.rollout_id,
+                    count=len(self._completed)
+                )
+            )
+
+    def _save_state(self):
+        self._config_store.set(
+            self._state_key,
+            {
+                'completed': sorted(self._completed),
+                'halted': self.halted
+            },
+            self._state_ttl
+        )
+
+    def reset_state(self):
+        self._completed = set()
+        self.halted = False
+        self._config_store.delete(self._state_key)
+
+    def resume(self):
+        # keeps the tenants migrated so far.
+        self.halted = False
+        self._save_state()
+
+    def refresh_halted(self):
+        state = self._config_store.get(self._state_key)
+        if state is not None and state.get('halted', False):
+            self.halted = True
+
+        return self.halted
+
+    def is_completed(self, tenant_id):
+        return tenant_id in self._completed
+
+    def plan_waves(self, tenant_ids):
+        pending_tenant_ids = [
+            tenant_id for tenant_id in tenant_ids
+            if tenant_id not in self._completed
+        ]
+        pending_set = set(pending_tenant_ids)
+
+        canary_wave = tuple(
+            tenant_id for tenant_id in self._canary_tenant_ids
+            if tenant_id in pending_set
+        )
+        if canary_wave:
+            yield True, canary_wave
+
+        canary_set = set(canary_wave)
+        remaining_tenant_ids = [
+            tenant_id for tenant_id in pending_tenant_ids
+            if tenant_id not in canary_set
+        ]
+
+        wave_size = self._wave_size
+        st_index = 0
+        while st_index < len(remaining_tenant_ids):
+            yield False, tuple(
+                remaining_tenant_ids[st_index: st_index + int(wave_size)]
+            )
+            st_index += int(wave_size)
+            wave_size *= self._wave_growth
+
+    def record_wave(self, results, is_canary):
+        # a halt from elsewhere mustn't be overwritten when saving.
+        self.refresh_halted()
+
+        # a tenant counts as failed if any of its databases failed.
+        failed_tenant_ids = {
+            result.tenant_id for result in results if result.failed
+        }
+        wave_tenant_ids = {result.tenant_id for result in results}
+        self._completed.update(wave_tenant_ids - failed_tenant_ids)
+
+        failed_count = len(failed_tenant_ids)
+        wave_count = len(wave_tenant_ids)
+        failure_rate = failed_count / wave_count if wave_count else 0
+        if (is_canary and failed_count) \
+                or failure_rate > self._max_failure_rate:
+            self.halted = True
+            logger.error(
+                "Halting rollout {rollout_id}: {failed_count} of "
+                "{count} tenants failed in the {wave} wave".format(
+                    rollout_id=self.rollout_id,
+                    failed_count=failed_count,
+                    count=wave_count,
+                    wave='canary' if is_canary else 'current'
+                )
+            )
+
+        self._save_state()
+        return not self.halted
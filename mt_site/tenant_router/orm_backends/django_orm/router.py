@@ -1,8 +1,19 @@
+from django.core.signals import request_started
+
 from tenant_router.orm_backends.base.router import BaseOrmRouter
-from tenant_router.orm_backends.utils import construct_conn_alias
+from tenant_router.orm_backends.django_orm.replicas import (
+    is_written, mark_written, reset_read_your_writes
+)
 from tenant_router.managers.task_local import tls_tenant_manager
 
 
+# reads go back to replicas at the start of every request.
+request_started.connect(
+    reset_read_your_writes,
+    dispatch_uid='tenant_router_reset_read_your_writes'
+)
+
+
 class DjangoOrmRouter(BaseOrmRouter):
     _migrate_strategy = None
     APP_LABELS_TO_EXCLUDE = {
@@ -13,33 +24,81 @@ class DjangoOrmRouter(BaseOrmRouter):
     def set_migrate_strategy(cls, migrate_strategy):
         cls._migrate_strategy = migrate_strategy
 
+    def _route(self, template_alias, for_write=False):
+        tenant_alias = tls_tenant_manager.current_tenant_context.alias
+        conn_alias = None
+
+        if for_write:
+            # subsequent reads in the same request/task are pinned to
+            # the primary so that they see this write.
+            mark_written(tenant_alias, template_alias)
+        elif not is_written(tenant_alias, template_alias):
+            conn_alias = self.manager.pick_replica(
+                tenant_alias, template_alias
+            )
+
+        if conn_alias is None:
+            conn_alias = self.manager.lookup_conn_alias(
+                tenant_alias, template_alias
+            )
+
+        # in the 'schema' routing mode, tenants on the same database
+        # are routed to a single shared alias.
+        shared_conn = self.manager.get_shared_conn(conn_alias)
+        if shared_conn is not None:
+            conn_alias, schema = shared_conn
+
+        circuit_breaker = self.manager.circuit_breaker
+        if circuit_breaker is not None:
+            # fails fast while the breaker of the alias is open, ahead of
+            # the connection work in the route hooks.
+            circuit_breaker.check(conn_alias)
+
+        for hook in self.manager.route_hooks:
+            hook(conn_alias)
+
+        if circuit_breaker is not None:
+            # the thread's connection is in place by now.
+            circuit_breaker.guard(conn_alias)
+
+        if shared_conn is not None:
+            self.manager.activate_schema(conn_alias, schema)
+
+        return conn_alias
+
     def db_for_read(self, model, **hints):
         # print("read db called")
-        context = tls_tenant_manager.current_tenant_context
-        return construct_conn_alias(
-            tenant_alias=context.alias,
-            orm_key=self.manager.ORM_KEY,
-            template_alias=self.manager.DEFAULT_CONN_ALIAS
-        )
+        template_alias = self.manager.get_template_alias_for_model(model)
+        if template_alias in self.manager.reserved_aliases:
+            return template_alias
+
+        return self._route(template_alias)
 
     def db_for_write(self, model, **hints):
         # print("write db called")
-        context = tls_tenant_manager.current_tenant_context
-        return construct_conn_alias(
-            tenant_alias=context.alias,
-            orm_key=self.manager.ORM_KEY,
-            template_alias=self.manager.DEFAULT_CONN_ALIAS
-        )
+        template_alias = self.manager.get_template_alias_for_model(model)
+        if template_alias in self.manager.reserved_aliases:
+            return template_alias
+
+        return self._route(template_alias, for_write=True)
 
     def allow_relation(self, *args, **kwargs):
         return True
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         # print("allow migrate called")
+        if db in self.manager.replica_aliases:
+            return False
+
         if db in self.manager.conn_aliases:
             if app_label in self.APP_LABELS_TO_EXCLUDE:
                 return False
 
+            if not self.manager.is_migration_routed_to(
+                    db, app_label, model_name=model_name
+            ):
+                return False
+
             if self._migrate_strategy:
                 return self._migrate_strategy(
                     db, app_label, model_name=model_name, **hints
@@ -0,0 +1,301 @@
+import hashlib
+import logging
+import re
+import threading
+from functools import wraps
+
+from django.db.backends.signals import connection_created
+
+from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.managers.task_local import tls_tenant_manager
+from tenant_router.utils import join_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaRouting:
+    """
+    Backs the `schema` routing mode. Tenants whose configs point to the
+    same physical database (engine, host, port, name and user) share a
+    single connection alias and are told apart by the `search_path` of
+    that connection.
+
+    The `search_path` is set right before every query runs on a shared
+    connection (through an execute wrapper), as per the tenant current at
+    that point rather than the one current when the query was routed,
+    since a queryset can well be evaluated long after it was routed. The
+    schema last routed to in the thread is used when the current tenant
+    has no schema on that database. A `SET` is only issued when the
+    connection isn't known to be on the schema already, and what is known
+    is dropped whenever the connection rolls back, since that may undo a
+    `SET` issued inside the transaction.
+
+    Every tenant conn alias is still present in `databases` (with its
+    `search_path` pinned through the connection options) so that
+    management commands like `migrate` keep working against a single
+    tenant. Only the router hands out the shared alias.
+    """
+    SHARED_ALIAS_PREFIX = 'tenant_router_shared'
+    PHYSICAL_KEYS = ('ENGINE', 'HOST', 'PORT', 'NAME', 'USER')
+    SUPPORTED_ENGINES = (
+        'django.db.backends.postgresql',
+        'django.db.backends.postgresql_psycopg2',
+        'django.contrib.gis.db.backends.postgis',
+    )
+
+    _SCHEMA_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    def __init__(self, conn_handler):
+        self._conn_handler = conn_handler
+        self._lock = threading.Lock()
+
+        # conn alias -> (shared alias, schema)
+        self._shared_conn_table = {}
+
+        # shared alias -> frozenset of conn aliases pointing to it
+        self._shared_alias_refs = {}
+
+        # (shared alias, tenant alias) -> (schema, frozenset of the
+        # tenant's conn aliases using it)
+        self._schema_table = {}
+
+        # conn alias -> tenant alias
+        self._conn_tenant_table = {}
+
+        # shared alias -> schema last routed to, per thread.
+        self._local = threading.local()
+
+        connection_created.connect(self._on_connection_created)
+
+    def _get_shared_alias(self, db_config):
+        physical_key = repr(
+            tuple(str(db_config.get(key, '')) for key in self.PHYSICAL_KEYS)
+        )
+        return join_keys(
+            self.SHARED_ALIAS_PREFIX,
+            hashlib.sha1(physical_key.encode()).hexdigest()[:12]
+        )
+
+    def _validate(self, conn_alias, db_config, schema):
+        if db_config.get('ENGINE') not in self.SUPPORTED_ENGINES:
+            raise ImproperlyConfiguredError(
+                "The 'schema' routing mode requires a PostgreSQL engine. "
+                "Got '{engine}' for conn alias '{conn_alias}' instead.".format(
+                    engine=db_config.get('ENGINE'),
+                    conn_alias=conn_alias
+                )
+            )
+
+        if not self._SCHEMA_NAME_RE.match(schema):
+            raise ImproperlyConfiguredError(
+                "Invalid schema name '{schema}' for conn alias "
+                "'{conn_alias}'.".format(
+                    schema=schema,
+                    conn_alias=conn_alias
+                )
+            )
+
+    @staticmethod
+    def _pin_search_path(db_config, schema):
+        options = dict(db_config.get('OPTIONS', {}))
+        options['options'] = ' '.join(
+            filter(None, (
+                options.get('options', ''),
+                '-c search_path={schema}'.format(schema=schema)
+            ))
+        )
+        return {**db_config, 'OPTIONS': options}
+
+    def register(self, conn_alias, tenant_alias, db_config):
+        """
+        Maps `conn_alias` onto the shared alias of its physical database
+        and returns the config to be stored against `conn_alias` itself.
+        The schema defaults to the tenant alias unless the config has a
+        `SCHEMA` key.
+        """
+        db_config = dict(db_config)
+        schema = db_config.pop('SCHEMA', None) or tenant_alias
+        self._validate(conn_alias, db_config, schema)
+
+        shared_alias = self._get_shared_alias(db_config)
+
+        with self._lock:
+            schema_key = (shared_alias, tenant_alias)
+            current_schema, refs = self._schema_table.get(
+                schema_key, (schema, frozenset())
+            )
+            if current_schema != schema and refs - {conn_alias}:
+                # the schema of a query is picked by its tenant, so a
+                # tenant can't have two of them on the same database.
+                raise ImproperlyConfiguredError(
+                    "Conn alias '{conn_alias}' maps tenant "
+                    "'{tenant_alias}' to schema '{schema}' while another "
+                    "of its conn aliases on the same database uses "
+                    "'{current_schema}'.".format(
+                        conn_alias=conn_alias,
+                        tenant_alias=tenant_alias,
+                        schema=schema,
+                        current_schema=current_schema
+                    )
+                )
+
+            self._unregister(conn_alias)
+
+            self._conn_handler.databases[shared_alias] = db_config
+            self._shared_alias_refs[shared_alias] = (
+                self._shared_alias_refs.get(shared_alias, frozenset())
+                | {conn_alias}
+            )
+            self._shared_conn_table[conn_alias] = (shared_alias, schema)
+            self._conn_tenant_table[conn_alias] = tenant_alias
+            self._schema_table[schema_key] = (
+                schema,
+                self._schema_table.get(
+                    schema_key, (schema, frozenset())
+                )[1] | {conn_alias}
+            )
+
+        return self._pin_search_path(db_config, schema)
+
+    def _unregister(self, conn_alias):
+        shared_conn = self._shared_conn_table.pop(conn_alias, None)
+        if shared_conn is None:
+            return
+
+        shared_alias, schema = shared_conn
+        schema_key = (
+            shared_alias, self._conn_tenant_table.pop(conn_alias, None)
+        )
+        _, schema_refs = self._schema_table.pop(
+            schema_key, (schema, frozenset())
+        )
+        if schema_refs - {conn_alias}:
+            self._schema_table[schema_key] = (
+                schema, schema_refs - {conn_alias}
+            )
+
+        refs = self._shared_alias_refs.get(shared_alias, frozenset()) \
+            - {conn_alias}
+
+        if refs:
+            self._shared_alias_refs[shared_alias] = refs
+            return
+
+        # no tenant left on this physical database.
+        self._shared_alias_refs.pop(shared_alias, None)
+        self._conn_handler.databases.pop(shared_alias, None)
+
+        if hasattr(self._conn_handler._connections, shared_alias):
+            logger.debug(
+                "Removing shared connection {shared_alias}".format(
+                    shared_alias=shared_alias
+                )
+            )
+            self._conn_handler[shared_alias].close()
+            del self._conn_handler[shared_alias]
+
+    def unregister(self, conn_alias):
+        with self._lock:
+            self._unregister(conn_alias)
+
+    def get_shared_conn(self, conn_alias):
+        return self._shared_conn_table.get(conn_alias)
+
+    @property
+    def shared_aliases(self):
+        return set(self._shared_alias_refs.keys())
+
+    def activate(self, shared_alias, schema):
+        """
+        Records `schema` as the one last routed to for `shared_alias` in
+        the current thread. Nothing is sent to the database until a query
+        actually runs.
+        """
+        try:
+            self._local.routed_schemas[shared_alias] = schema
+        except AttributeError:
+            self._local.routed_schemas = {shared_alias: schema}
+
+    def _get_schema(self, shared_alias):
+        schema_entry = self._schema_table.get((
+            shared_alias, tls_tenant_manager.current_tenant_context.alias
+        ))
+        if schema_entry is not None:
+            return schema_entry[0]
+
+        return getattr(self._local, 'routed_schemas', {}).get(shared_alias)
+
+    @staticmethod
+    def _forget_active_schema(connection):
+        connection._tenant_router_schema_state = None
+
+    def _track_rollbacks(self, connection):
+        # a `SET` issued inside a transaction (or a savepoint) is undone
+        # when it's rolled back.
+        for method_name in ('rollback', 'savepoint_rollback'):
+            method = getattr(connection, method_name)
+
+            @wraps(method)
+            def wrapper(*args, _method=method, **kwargs):
+                self._forget_active_schema(connection)
+                return _method(*args, **kwargs)
+
+            setattr(connection, method_name, wrapper)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if connection.alias not in self._shared_alias_refs:
+            return
+
+        # the wrapper object outlives reconnects.
+        self._forget_active_schema(connection)
+        if getattr(connection, '_tenant_router_schema_routed', False):
+            return
+
+        connection._tenant_router_schema_routed = True
+        self._track_rollbacks(connection)
+        connection.execute_wrappers.insert(0, self._execute_in_schema)
+
+    def _set_search_path(self, cursor, connection, schema):
+        cursor.execute(
+            'SET search_path TO {schema}'.format(
+                schema=connection.ops.quote_name(schema)
+            )
+        )
+
+    def _execute_in_schema(self, execute, sql, params, many, context):
+        connection = context['connection']
+        schema = self._get_schema(connection.alias)
+
+        # (raw connection, schema)
+        state = getattr(connection, '_tenant_router_schema_state', None)
+        if schema is not None and state != (connection.connection, schema):
+            # issued on the raw cursor, which bypasses the wrappers.
+            self._set_search_path(
+                context['cursor'].cursor, connection, schema
+            )
+            connection._tenant_router_schema_state = (
+                connection.connection, schema
+            )
+
+        return execute(sql, params, many, context)
+
+    def ensure_schema(self, conn_alias):
+        shared_conn = self.get_shared_conn(conn_alias)
+        if shared_conn is None:
+            return
+
+        shared_alias, schema = shared_conn
+        connection = self._conn_handler[shared_alias]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE SCHEMA IF NOT EXISTS {schema}'.format(
+                    schema=connection.ops.quote_name(schema)
+                )
+            )
+
+    def get_stats(self):
+        return {
+            'tenant_aliases': len(self._shared_conn_table),
+            'shared_aliases': len(self._shared_alias_refs),
+        }
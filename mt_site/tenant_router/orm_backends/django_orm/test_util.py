@@ -4,7 +4,6 @@ from django.test.runner import DiscoverRunner
 
 from tenant_router.context_decorators import tenant_context_bind
 from tenant_router.managers import tenant_context_manager
-from tenant_router.orm_backends.utils import construct_conn_alias
 
 
 class TenantAwareTestRunner(DiscoverRunner):
@@ -16,10 +15,8 @@ class TenantAwareTestRunner(DiscoverRunner):
 
     def _expand_template_alias_to_all_tenants(self, template_alias):
         return {
-            construct_conn_alias(
-                tenant_alias=tenant_context.alias,
-                orm_key=self.manager.ORM_KEY,
-                template_alias=template_alias
+            tenant_context.get_conn_alias(
+                self.manager.ORM_KEY, template_alias
             )
             for tenant_context in tenant_context_manager.all()
         }
@@ -1,7 +1,6 @@
 import json
 from json import JSONDecodeError
 from threading import Thread, Event
-import time
 
 from asgiref.sync import sync_to_async
 from redis import Redis
@@ -20,17 +19,14 @@ class RedisEventListener(BaseEventListener):
         self._is_stopped = Event()
 
     def _service_loop(self):
-        msg_counter = 0
         try:
             while not self._is_stopped.is_set():
+                # blocks until a message arrives rather than polling, so
+                # that messages are handled as fast as they come in.
                 self._pubsub.get_message(
-                    ignore_subscribe_messages=True
+                    ignore_subscribe_messages=True,
+                    timeout=1.0
                 )
-                msg_counter += 1
-
-                if msg_counter == 5:
-                    msg_counter = 0
-                    time.sleep(1)
 
         except Exception as e:
             print("Exception occurred in thread {name}: {exc_info}".format(
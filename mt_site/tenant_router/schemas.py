@@ -1,11 +1,27 @@
+import threading
+import weakref
+
+from tenant_router.cache.utils import construct_cache_alias
 from tenant_router.constants import constants
+from tenant_router.orm_backends.utils import construct_conn_alias
 
 
 class TenantContext:
+    """
+    Tenant contexts are interned per tenant id, i.e `from_id` hands out
+    the same instance for a given id for as long as it's referenced.
+    Every key derived from the tenant alias (conn aliases, cache aliases,
+    channel names etc.,) is built once per context and memoized.
+    """
+    __slots__ = ('id', 'alias', '_derived_keys', '__weakref__')
+
+    _interned = weakref.WeakValueDictionary()
+    _intern_lock = threading.Lock()
 
     def __init__(self, id, alias):
         self.id = id
         self.alias = alias
+        self._derived_keys = {}
 
     @staticmethod
     def _get_tenant_alias(id):
@@ -15,8 +31,44 @@ class TenantContext:
 
     @classmethod
     def from_id(cls, id):
-        tenant_alias = cls._get_tenant_alias(id)
-        return cls(id, tenant_alias)
+        try:
+            return cls._interned[id]
+        except KeyError:
+            pass
+
+        with cls._intern_lock:
+            context = cls._interned.get(id)
+            if context is None:
+                context = cls(id, cls._get_tenant_alias(id))
+                cls._interned[id] = context
+
+        return context
+
+    def get_derived_key(self, builder, *args):
+        """
+        Returns `builder(self.alias, *args)`, computing it only on the
+        first call. `builder` is expected to be a pure, module level
+        function since it's a part of the memo key. Memoized keys live as
+        long as the context, so this is only meant for bounded families
+        of keys like conn aliases, cache aliases and channel names.
+        """
+        key = (builder, args)
+        try:
+            return self._derived_keys[key]
+        except KeyError:
+            derived_key = builder(self.alias, *args)
+            self._derived_keys[key] = derived_key
+            return derived_key
+
+    def get_conn_alias(self, orm_key, template_alias):
+        return self.get_derived_key(
+            construct_conn_alias, orm_key, template_alias
+        )
+
+    def get_cache_alias(self, template_alias):
+        return self.get_derived_key(
+            construct_cache_alias, template_alias
+        )
 
     def __str__(self):
         return self.alias
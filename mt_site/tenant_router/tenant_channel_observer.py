@@ -24,14 +24,20 @@ class TenantLifecycleEvent(str, Enum):
         return {cls.ON_TENANT_UPDATE, cls.ON_TENANT_DELETE}
 
 
+def _construct_tenant_bound_channel_name(tenant_alias, lifecycle_event):
+    return join_keys(
+        tenant_alias,
+        settings.TENANT_ROUTER_SERVICE_NAME,
+        lifecycle_event
+    )
+
+
 def construct_tenant_channel_name(
         lifecycle_event, tenant_context=None
 ):
     if lifecycle_event in TenantLifecycleEvent.get_tenant_bound_events():
-        return join_keys(
-            tenant_context.alias,
-            settings.TENANT_ROUTER_SERVICE_NAME,
-            lifecycle_event
+        return tenant_context.get_derived_key(
+            _construct_tenant_bound_channel_name, lifecycle_event
         )
     else:
         return lifecycle_event
@@ -0,0 +1,65 @@
+import fnmatch
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from tenant_router.bulk_config_loader import _BulkConfigLoader
+from tenant_router.managers.tenant_context import _TenantRegistrySnapshot
+from tenant_router.schemas import TenantContext
+
+
+class _ConfigStore:
+    def __init__(self, data):
+        self.data = data
+        self.get_many_calls = []
+
+    def iter_keys(self, pattern, itersize=None):
+        return (key for key in self.data if fnmatch.fnmatch(key, pattern))
+
+    def get_many(self, keys):
+        self.get_many_calls.append(keys)
+        return {key: self.data[key] for key in keys}
+
+
+class BulkConfigLoaderTest(SimpleTestCase):
+
+    def setUp(self):
+        snapshot = _TenantRegistrySnapshot({
+            tenant_id: TenantContext.from_id(tenant_id)
+            for tenant_id in ('t1.test.com', 't2.test.com')
+        })
+        patcher = mock.patch(
+            'tenant_router.bulk_config_loader.tenant_context_manager',
+            mock.Mock(snapshot=snapshot)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.config_store = _ConfigStore({
+            't1_test_com_mt_site_orm_config_default': {'NAME': 't1'},
+            't1_test_com_mt_site_orm_config_replica': {'NAME': 't1_r'},
+            't2_test_com_mt_site_orm_config_default': {'NAME': 't2'},
+            't3_test_com_mt_site_orm_config_default': {'NAME': 't3'},
+            't1_test_com_mt_site_cache_config_default': {},
+            't1_test_com_other_service_orm_config_default': {},
+        })
+
+    def test_only_known_tenants_are_loaded(self):
+        config_dict = _BulkConfigLoader().load(
+            self.config_store, 'orm_config'
+        )
+
+        self.assertEqual(config_dict, {
+            't1_test_com_mt_site_orm_config_default': {'NAME': 't1'},
+            't1_test_com_mt_site_orm_config_replica': {'NAME': 't1_r'},
+            't2_test_com_mt_site_orm_config_default': {'NAME': 't2'},
+        })
+
+    def test_reads_are_batched(self):
+        loader = _BulkConfigLoader()
+        loader._READ_BATCH_SIZE = 2
+
+        loader.load(self.config_store, 'orm_config')
+        self.assertEqual(
+            [len(keys) for keys in self.config_store.get_many_calls], [2, 1]
+        )
@@ -0,0 +1,125 @@
+from django.core.cache.backends import locmem
+from django.test import SimpleTestCase, override_settings
+
+from tenant_router.cache.utils import (
+    construct_cache_alias,
+    CACHE_CONFIG_PREFIX_KEY
+)
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.utils import make_cache_config_manager, make_event
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant_router_test_default',
+    },
+    'other': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant_router_test_other',
+    },
+    'tenant_router_config_store': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant_router_test_config_store',
+        'TIMEOUT': None,
+    },
+}
+
+
+class CacheConfigManagerTestMixin:
+    cache_settings = None
+
+    def setUp(self):
+        settings_override = override_settings(CACHES=CACHES)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.manager = make_cache_config_manager(self.cache_settings)
+        self.cache_handler = self.manager._cache_handler
+
+    def _register(self, tenant_alias, template_alias='default', **config):
+        cache_alias = construct_cache_alias(tenant_alias, template_alias)
+        self.manager.on_tenant_create(make_event({
+            CACHE_CONFIG_PREFIX_KEY: {
+                cache_alias: {
+                    # locmem caches of the same location are shared by
+                    # the whole process.
+                    'LOCATION': '{test_id}:{cache_alias}'.format(
+                        test_id=self.id(), cache_alias=cache_alias
+                    ),
+                    **config
+                }
+            }
+        }))
+        return cache_alias
+
+    def _delete(self, cache_alias):
+        self.manager.on_tenant_delete(make_event({
+            CACHE_CONFIG_PREFIX_KEY: [cache_alias]
+        }))
+
+
+class CacheAliasTableTest(CacheConfigManagerTestMixin, SimpleTestCase):
+
+    def test_registered_configs_are_looked_up(self):
+        t1_default = self._register('t1')
+        t1_other = self._register('t1', 'other')
+        t1 = TenantContext.from_id('t1')
+
+        self.assertEqual(
+            self.manager.lookup_cache_alias(t1, 'default'), t1_default
+        )
+        self.assertEqual(
+            self.manager.lookup_cache_alias(t1, 'other'), t1_other
+        )
+
+    def test_unregistered_tenants_fall_back_to_the_derived_alias(self):
+        t2 = TenantContext.from_id('t2')
+
+        self.assertEqual(
+            self.manager.lookup_cache_alias(t2, 'default'),
+            t2.get_cache_alias('default')
+        )
+
+    def test_deleted_configs_are_dropped(self):
+        t1_default = self._register('t1')
+        t1_other = self._register('t1', 'other')
+
+        self._delete(t1_default)
+        self.assertEqual(
+            self.manager._cache_alias_table, {'t1': {'other': t1_other}}
+        )
+
+        self._delete(t1_other)
+        self.assertEqual(self.manager._cache_alias_table, {})
+
+    def test_tables_are_replaced_rather_than_mutated(self):
+        t1_default = self._register('t1')
+        template_alias_dict = self.manager._cache_alias_table['t1']
+
+        self._register('t1', 'other')
+        self._delete(t1_default)
+
+        # readers holding on to it never see it change.
+        self.assertEqual(template_alias_dict, {'default': t1_default})
+
+    def test_the_handler_resolves_the_current_tenants_cache(self):
+        self._register('t1')
+        self._register('t2')
+
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.cache_handler['default'].set('key', 't1')
+
+        with tenant_context_bind(TenantContext.from_id('t2')):
+            self.assertIsNone(self.cache_handler['default'].get('key'))
+            self.cache_handler['default'].set('key', 't2')
+
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.assertEqual(self.cache_handler['default'].get('key'), 't1')
+
+        # reserved aliases aren't resolved per tenant.
+        self.assertIs(
+            self.cache_handler['tenant_router_config_store']._cache,
+            locmem._caches['tenant_router_test_config_store']
+        )
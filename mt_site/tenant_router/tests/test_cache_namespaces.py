@@ -0,0 +1,222 @@
+import fnmatch
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from tenant_router.cache.namespaces import CacheNamespaces
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.exceptions import CacheNamespaceUnavailableError
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.test_cache_config_manager import (
+    CacheConfigManagerTestMixin
+)
+from tenant_router.tests.utils import make_event
+
+
+class PatternLocMemCache(LocMemCache):
+
+    def delete_pattern(self, pattern):
+        with self._lock:
+            keys = [
+                key for key in self._cache if fnmatch.fnmatch(key, pattern)
+            ]
+            for key in keys:
+                self._delete(key)
+
+        return len(keys)
+
+
+class CacheNamespacesTestMixin(CacheConfigManagerTestMixin):
+
+    def setUp(self):
+        super().setUp()
+        self.namespaces = self.manager._namespaces
+        self.addCleanup(self.namespaces.stop)
+
+        patcher = mock.patch('tenant_router.cache.namespaces.pubsub_proxy')
+        self.pubsub_proxy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _register(self, tenant_alias, template_alias='default', **config):
+        cache_alias = super()._register(tenant_alias, template_alias, **config)
+        self.addCleanup(
+            caches['tenant_router_config_store'].delete,
+            self.namespaces._get_store_key(cache_alias)
+        )
+        return cache_alias
+
+    def _wait_for(self, predicate):
+        deadline = time.monotonic() + 5
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+
+class CacheNamespacesTest(CacheNamespacesTestMixin, SimpleTestCase):
+
+    def test_bumps_make_earlier_keys_unreachable(self):
+        self._register('t1')
+
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.cache_handler['default'].set('key', 'value')
+            self.manager.bump_tenant_namespaces('t1')
+
+            self.assertIsNone(self.cache_handler['default'].get('key'))
+
+    def test_versions_are_read_once_registered(self):
+        # bumped by another worker before this one knew of the tenant.
+        cache_alias = self._register('t1')
+        self.namespaces.bump(cache_alias)
+        self.namespaces.forget(cache_alias)
+
+        self._register('t1')
+
+        self.assertEqual(self.namespaces.get(cache_alias), 1)
+
+    def test_keys_are_made_without_reading_the_config_store(self):
+        cache_alias = self._register('t1')
+
+        with mock.patch.object(
+                CacheNamespaces, '_config_store',
+                new_callable=mock.PropertyMock
+        ) as config_store, tenant_context_bind(TenantContext.from_id('t1')):
+            self.cache_handler['default'].set('key', 'value')
+            self.cache_handler['default'].get('key')
+
+        self.assertEqual(config_store.mock_calls, [])
+        self.assertEqual(self.namespaces.get(cache_alias), 0)
+
+    def test_bumps_from_other_workers_are_applied(self):
+        cache_alias = self._register('t1')
+
+        self.namespaces.on_bump(make_event({
+            'cache_alias': cache_alias, 'version': 3
+        }))
+        # a late broadcast can't undo it.
+        self.namespaces.on_bump(make_event({
+            'cache_alias': cache_alias, 'version': 2
+        }))
+
+        self.assertEqual(self.namespaces.get(cache_alias), 3)
+
+    def test_missed_bumps_are_picked_up_in_the_background(self):
+        cache_alias = self._register('t1')
+        namespaces = CacheNamespaces(refresh_interval=0.01)
+        self.addCleanup(namespaces.stop)
+        namespaces.load([cache_alias])
+
+        namespaces.start(lambda: [cache_alias])
+        self.namespaces.bump(cache_alias)
+
+        self._wait_for(lambda: namespaces.get(cache_alias) == 1)
+
+    def test_unread_versions_bypass_the_cache(self):
+        with mock.patch.object(
+                CacheNamespaces, '_config_store',
+                new_callable=mock.PropertyMock
+        ) as config_store, self.assertLogs(
+            'tenant_router.cache.namespaces', level='WARNING'
+        ):
+            config_store.return_value.get_many.side_effect = ConnectionError
+            cache_alias = self._register('t1')
+
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            cache = self.cache_handler['default']
+            self.assertIsInstance(cache, DummyCache)
+            cache.set('key', 'value')
+            self.assertIsNone(cache.get('key'))
+
+        # caches looked up by their full alias refuse to make keys.
+        with self.assertRaises(CacheNamespaceUnavailableError):
+            self.cache_handler[cache_alias].set('key', 'value')
+
+        # until the version is read.
+        self.namespaces.load([cache_alias])
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.assertNotIsInstance(
+                self.cache_handler['default'], DummyCache
+            )
+
+    def test_versions_are_kept_when_they_cant_be_reread(self):
+        cache_alias = self._register('t1')
+        self.namespaces.bump(cache_alias)
+
+        with mock.patch.object(
+                CacheNamespaces, '_config_store',
+                new_callable=mock.PropertyMock
+        ) as config_store, self.assertLogs(
+            'tenant_router.cache.namespaces', level='WARNING'
+        ):
+            config_store.return_value.get_many.side_effect = ConnectionError
+            self.namespaces.load([cache_alias])
+
+        self.assertEqual(self.namespaces.get(cache_alias), 1)
+
+    def test_workers_reload_versions_and_refresh_them(self):
+        cache_alias = self._register('t1')
+        self.namespaces.bump(cache_alias)
+        self.namespaces.forget(cache_alias)
+
+        with mock.patch.object(self.namespaces, 'start') as start:
+            self.manager.on_worker_init()
+
+        self.assertEqual(self.namespaces.get(cache_alias), 1)
+        self.assertEqual(start.call_args[0][0](), [cache_alias])
+
+
+class ScopedCacheClearTest(CacheNamespacesTestMixin, SimpleTestCase):
+    cache_settings = {
+        'SHARED_BACKENDS': True,
+        'THREAD_SAFE_BACKENDS': {
+            'tenant_router.tests.test_cache_namespaces.PatternLocMemCache',
+            'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+
+    def _register_shared(
+            self, tenant_alias,
+            backend='tenant_router.tests.test_cache_namespaces'
+                    '.PatternLocMemCache'
+    ):
+        return self._register(
+            tenant_alias,
+            BACKEND=backend,
+            LOCATION='{test_id}:shared'.format(test_id=self.id())
+        )
+
+    def test_clear_deletes_keys_of_every_namespace(self):
+        t1 = self.manager.get_scoped_cache(self._register_shared('t1'))
+        t2 = self.manager.get_scoped_cache(self._register_shared('t2'))
+        self.addCleanup(t1.backend.clear)
+
+        t1.set('before', 'value')
+        self.manager.bump_tenant_namespaces('t1')
+        t1.set('after', 'value')
+        t2.set('key', 'value')
+
+        self.assertEqual(t1.clear(), 2)
+
+        self.assertEqual(list(t1.backend._cache), [t2.make_key('key')])
+
+    def test_clear_without_delete_pattern_bumps_the_namespace(self):
+        backend = 'django.core.cache.backends.locmem.LocMemCache'
+        t1_alias = self._register_shared('t1', backend)
+        t1 = self.manager.get_scoped_cache(t1_alias)
+        t2 = self.manager.get_scoped_cache(
+            self._register_shared('t2', backend)
+        )
+        self.addCleanup(t1.backend.clear)
+
+        t1.set('key', 'value')
+        t2.set('key', 'value')
+        version = self.namespaces.get(t1_alias)
+
+        t1.clear()
+
+        self.assertEqual(self.namespaces.get(t1_alias), version + 1)
+        self.assertIsNone(t1.get('key'))
+        self.assertEqual(t2.get('key'), 'value')
@@ -0,0 +1,52 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from tenant_router.celery.beat.db_signals import periodic_task_normalizer
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.schemas import TenantContext
+
+
+@mock.patch(
+    'tenant_router.celery.beat.db_signals.tenant_context_manager'
+)
+class PeriodicTaskNormalizerTest(SimpleTestCase):
+
+    def _normalize(self, name, headers='{}'):
+        instance = SimpleNamespace(name=name, headers=headers)
+        periodic_task_normalizer(sender=None, instance=instance)
+        return instance
+
+    def test_schedule_names_are_not_memoized(self, tenant_context_manager):
+        tenant_context_manager.contains.return_value = False
+        context = TenantContext.from_id('t1.test.com')
+        derived_keys = dict(context._derived_keys)
+
+        with tenant_context_bind(context):
+            for i in range(10):
+                instance = self._normalize('one_off_{}'.format(i))
+
+        self.assertEqual(instance.name, 't1_test_com_mt_site_one_off_9')
+        self.assertEqual(
+            json.loads(instance.headers), {'tenant_id': 't1.test.com'}
+        )
+        self.assertEqual(context._derived_keys, derived_keys)
+
+    def test_normalized_names_are_kept(self, tenant_context_manager):
+        tenant_context_manager.contains.return_value = True
+
+        with tenant_context_bind(TenantContext.from_id('t1.test.com')):
+            instance = self._normalize(
+                't2_test_com_mt_site_schedule',
+                headers=json.dumps({'tenant_id': 't2.test.com'})
+            )
+
+        self.assertEqual(instance.name, 't2_test_com_mt_site_schedule')
+        self.assertEqual(
+            json.loads(instance.headers), {'tenant_id': 't2.test.com'}
+        )
+        tenant_context_manager.contains.assert_called_once_with(
+            't2_test_com'
+        )
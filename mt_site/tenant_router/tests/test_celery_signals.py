@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from celery.signals import task_prerun
+from django.test import SimpleTestCase
+
+# connects the celery signal handlers.
+import tenant_router.celery.signals  # noqa: F401
+from tenant_router.orm_backends.django_orm.replicas import (
+    is_written, mark_written, reset_read_your_writes
+)
+
+
+@mock.patch('tenant_router.celery.signals.tls_tenant_manager')
+@mock.patch('tenant_router.celery.signals.tenant_context_manager')
+@mock.patch('tenant_router.celery.signals.event_queue_manager')
+class TaskPrerunTest(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(reset_read_your_writes)
+
+    def test_read_your_writes_pins_are_reset(self, *mocks):
+        task = SimpleNamespace(request=SimpleNamespace(tenant_id='t1'))
+        mark_written('t1', 'default')
+
+        task_prerun.send(sender=task, task_id='task-1', task=task)
+
+        self.assertFalse(is_written('t1', 'default'))
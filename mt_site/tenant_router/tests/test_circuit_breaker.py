@@ -0,0 +1,195 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase
+
+from tenant_router.exceptions import CircuitOpenError
+from tenant_router.managers.task_local import tls_tenant_manager
+from tenant_router.orm_backends.django_orm.circuit_breaker import (
+    CircuitBreaker
+)
+from tenant_router.orm_backends.django_orm.router import DjangoOrmRouter
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.test_django_orm_manager import (
+    DjangoOrmManagerTestMixin
+)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.db_dir = db_dir.name
+
+        # sqlite can't create a database in a directory which doesn't
+        # exist, which stands in for a server that is down.
+        self.conn_handler = ConnectionHandler({
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(self.db_dir, 'default')
+            },
+            't1': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(self.db_dir, 'missing', 't1')
+            },
+        })
+        self.addCleanup(self.conn_handler.close_all)
+
+    def _bring_up(self):
+        self.conn_handler.databases['t1']['NAME'] = os.path.join(
+            self.db_dir, 't1'
+        )
+        if hasattr(self.conn_handler._connections, 't1'):
+            del self.conn_handler['t1']
+
+    def _connect(self, breaker, conn_alias='t1'):
+        # mirrors the router, where the route hooks create the thread's
+        # connection in between, followed by the query.
+        breaker.check(conn_alias)
+        connection = self.conn_handler[conn_alias]
+        breaker.guard(conn_alias)
+        connection.ensure_connection()
+
+    def _fail(self, breaker, times=1):
+        for _ in range(times):
+            with self.assertRaises(OperationalError):
+                self._connect(breaker)
+
+    def _get_state(self, breaker):
+        return breaker.get_stats().get('t1', {}).get('state', 'closed')
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(
+            self.conn_handler, failure_threshold=2, cooldown=30
+        )
+
+        self._fail(breaker)
+        self.assertEqual(self._get_state(breaker), 'closed')
+        self.assertTrue(breaker.allows('t1'))
+
+        self._fail(breaker)
+        self.assertEqual(self._get_state(breaker), 'open')
+        self.assertFalse(breaker.allows('t1'))
+
+        with self.assertRaises(CircuitOpenError) as cm:
+            self._connect(breaker)
+
+        self.assertGreater(cm.exception.retry_after, 29)
+        self.assertEqual(breaker.get_stats()['t1']['rejected'], 1)
+        # other aliases are unaffected.
+        self._connect(breaker, 'default')
+
+    def test_successes_reset_the_failure_count(self):
+        breaker = CircuitBreaker(self.conn_handler, failure_threshold=2)
+
+        self._fail(breaker)
+        self._bring_up()
+        self._connect(breaker)
+
+        self.assertEqual(breaker.get_stats(), {})
+
+    def _check_in_thread(self, breaker):
+        errors = []
+
+        def check():
+            try:
+                breaker.check('t1')
+            except CircuitOpenError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=check)
+        thread.start()
+        thread.join()
+        return bool(errors)
+
+    def test_a_single_probe_is_let_through_after_the_cooldown(self):
+        breaker = CircuitBreaker(
+            self.conn_handler, failure_threshold=1, cooldown=0.05
+        )
+        self._fail(breaker)
+        time.sleep(0.05)
+        self._bring_up()
+
+        # looks at the breaker while the probe is connecting.
+        seen = []
+        connection = self.conn_handler['t1']
+        connect = connection.connect
+
+        def probing_connect():
+            seen.append(self._get_state(breaker))
+            seen.append(self._check_in_thread(breaker))
+            connect()
+
+        connection.connect = probing_connect
+        self._connect(breaker)
+
+        self.assertEqual(seen, ['half_open', True])
+        self.assertEqual(self._get_state(breaker), 'closed')
+        self.assertEqual(breaker.get_stats(), {})
+
+    def test_failed_probes_open_the_breaker_again(self):
+        breaker = CircuitBreaker(
+            self.conn_handler, failure_threshold=2, cooldown=0.05
+        )
+        self._fail(breaker, times=2)
+        time.sleep(0.05)
+
+        # a single failure is enough while half open.
+        self._fail(breaker)
+
+        self.assertEqual(self._get_state(breaker), 'open')
+        with self.assertRaises(CircuitOpenError):
+            self._connect(breaker)
+
+    def test_threads_with_an_open_connection_are_unaffected(self):
+        breaker = CircuitBreaker(self.conn_handler, failure_threshold=1)
+        self._bring_up()
+        self._connect(breaker)
+
+        breaker._on_failure('t1')
+
+        self.assertTrue(self._check_in_thread(breaker))
+        breaker.check('t1')
+
+
+class RouterCircuitBreakerTest(DjangoOrmManagerTestMixin, SimpleTestCase):
+    manager_options = {
+        'CIRCUIT_BREAKER': {'FAILURE_THRESHOLD': 1, 'COOLDOWN': 30}
+    }
+
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch.object(
+            DjangoOrmRouter, '_manager', self.manager, create=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = DjangoOrmRouter()
+
+        tls_tenant_manager.push_tenant_context(TenantContext.from_id('t1'))
+        self.addCleanup(tls_tenant_manager.pop_tenant_context)
+
+        self.routed_aliases = []
+        self.manager.add_route_hook(self.routed_aliases.append)
+
+    def test_open_breakers_fail_before_the_route_hooks(self):
+        conn_alias = self._register(
+            't1', NAME=os.path.join(self.db_dir, 'missing', 't1')
+        )
+
+        self.assertEqual(self.router.db_for_write(User), conn_alias)
+        with self.assertRaises(OperationalError):
+            self.conn_handler[conn_alias].ensure_connection()
+
+        self.assertEqual(self.routed_aliases, [conn_alias])
+        with self.assertRaises(CircuitOpenError):
+            self.router.db_for_read(User)
+
+        self.assertEqual(self.routed_aliases, [conn_alias])
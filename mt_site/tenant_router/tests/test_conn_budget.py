@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.db import transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from tenant_router.orm_backends.django_orm.conn_budget import (
+    ConnectionBudget
+)
+
+
+CONN_ALIASES = ('default', 't1', 't2', 't3', 't4')
+
+
+def _get_conn_handler(db_dir):
+    # sqlite never closes in-memory databases, hence the files.
+    return ConnectionHandler({
+        conn_alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(db_dir, conn_alias)
+        }
+        for conn_alias in CONN_ALIASES
+    })
+
+
+def _run_in_thread(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+class ConnectionBudgetTest(SimpleTestCase):
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.conn_handler = _get_conn_handler(db_dir.name)
+        self.addCleanup(self.conn_handler.close_all)
+
+    def _route(self, budget, conn_alias):
+        # mirrors the router, the budget is touched ahead of the query.
+        budget.touch(conn_alias)
+        self.conn_handler[conn_alias].ensure_connection()
+        return self.conn_handler[conn_alias]
+
+    def _is_open(self, conn_alias):
+        return self.conn_handler[conn_alias].connection is not None
+
+    def test_per_thread_budget_evicts_least_recently_used(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_thread=2)
+
+        self._route(budget, 't1')
+        self._route(budget, 't2')
+        self._route(budget, 't1')
+        self._route(budget, 't3')
+
+        self.assertTrue(self._is_open('t1'))
+        self.assertFalse(self._is_open('t2'))
+        self.assertTrue(self._is_open('t3'))
+        self.assertEqual(budget.get_stats()['evictions'], 1)
+
+    def test_process_count_tracks_open_connections(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_process=10)
+
+        def open_and_close():
+            for conn_alias in ('t1', 't2'):
+                self._route(budget, conn_alias)
+
+            self.assertEqual(budget.get_stats()['open'], 2)
+            # closed outside of the budget, like `close_old_connections`
+            # would.
+            self.conn_handler['t1'].close()
+
+        _run_in_thread(open_and_close)
+        self.assertEqual(budget.get_stats()['open'], 1)
+
+    def test_connections_closed_by_other_threads_free_the_budget(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_process=2)
+        is_closed = threading.Event()
+        should_exit = threading.Event()
+
+        def open_and_close():
+            # the thread stays around after closing its connections.
+            try:
+                self._route(budget, 't1')
+                self._route(budget, 't2')
+                self.conn_handler.close_all()
+            finally:
+                is_closed.set()
+
+            should_exit.wait(10)
+
+        thread = threading.Thread(target=open_and_close)
+        thread.start()
+        is_closed.wait()
+        try:
+            self._route(budget, 't3')
+            self._route(budget, 't4')
+            self.assertTrue(self._is_open('t3'))
+            self.assertTrue(self._is_open('t4'))
+            self.assertEqual(budget.get_stats()['evictions'], 0)
+            self.assertEqual(budget.get_stats()['open'], 2)
+        finally:
+            should_exit.set()
+            thread.join()
+
+    def test_eviction_stops_when_nothing_can_lower_the_count(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_process=2)
+        is_opened = threading.Event()
+        should_close = threading.Event()
+
+        def hold_connections():
+            try:
+                self._route(budget, 't1')
+                self._route(budget, 't2')
+            finally:
+                is_opened.set()
+
+            should_close.wait(10)
+            self.conn_handler.close_all()
+
+        thread = threading.Thread(target=hold_connections)
+        thread.start()
+        is_opened.wait()
+        try:
+            # the other thread's connections can't be closed from here,
+            # only this thread's own one is evicted.
+            self._route(budget, 't3')
+            self._route(budget, 't4')
+            self.assertFalse(self._is_open('t3'))
+            self.assertTrue(self._is_open('t4'))
+
+            self._route(budget, 't4')
+            self.assertEqual(budget.get_stats()['evictions'], 1)
+        finally:
+            should_close.set()
+            thread.join()
+
+    def test_connections_in_atomic_blocks_are_kept(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_thread=1)
+
+        self._route(budget, 't1')
+        with mock.patch(
+            'django.db.transaction.connections', self.conn_handler
+        ), transaction.atomic(using='t1'):
+            self._route(budget, 't2')
+            self.assertTrue(self._is_open('t1'))
+
+        self._route(budget, 't3')
+        self.assertFalse(self._is_open('t2'))
+
+    def test_connections_opened_elsewhere_are_tracked(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_process=10)
+        # e.g adopted from the warmer, already open when first routed to.
+        self.conn_handler['t1'].ensure_connection()
+
+        budget.touch('t1')
+        self.assertEqual(budget.get_stats()['open'], 1)
+
+    def test_unrouted_connections_are_not_counted(self):
+        budget = ConnectionBudget(self.conn_handler, max_per_process=10)
+
+        self.conn_handler['t1'].ensure_connection()
+        self.assertEqual(budget.get_stats()['open'], 0)
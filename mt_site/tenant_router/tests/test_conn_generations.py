@@ -0,0 +1,230 @@
+import concurrent.futures
+import os
+import tempfile
+from unittest import mock
+
+from django.db import transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from tenant_router.orm_backends.django_orm.conn_generations import (
+    ConnectionGenerations
+)
+from tenant_router.tests.test_django_orm_manager import (
+    DjangoOrmManagerTestMixin
+)
+
+
+CONN_ALIASES = ('default', 't1', 't2')
+
+
+class ConnectionGenerationsTestMixin:
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.db_dir = db_dir.name
+
+        # sqlite never closes in-memory databases, hence the files.
+        self.conn_handler = ConnectionHandler({
+            conn_alias: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(self.db_dir, conn_alias)
+            }
+            for conn_alias in CONN_ALIASES
+        })
+        self.addCleanup(self.conn_handler.close_all)
+
+        # a thread of its own which outlives a single call, same as a
+        # request thread of the server.
+        self.worker = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.worker.shutdown)
+        self.addCleanup(self._in_worker, self.conn_handler.close_all)
+
+    def _in_worker(self, func, *args):
+        return self.worker.submit(func, *args).result()
+
+    def _route(self, generations, conn_alias):
+        # mirrors the router, the check runs ahead of the query.
+        generations.check(conn_alias)
+        return self.conn_handler[conn_alias]
+
+    def _update_config(self, generations, conn_alias, name):
+        self.conn_handler.databases[conn_alias] = {
+            **self.conn_handler.databases[conn_alias],
+            'NAME': os.path.join(self.db_dir, name)
+        }
+        generations.bump(conn_alias)
+
+
+class ConnectionInvalidationTest(
+    ConnectionGenerationsTestMixin, SimpleTestCase
+):
+
+    def test_current_connections_are_reused(self):
+        generations = ConnectionGenerations(self.conn_handler)
+
+        connection = self._route(generations, 't1')
+        self.assertIs(self._route(generations, 't1'), connection)
+
+    def test_stale_connections_are_replaced_in_every_thread(self):
+        generations = ConnectionGenerations(self.conn_handler)
+
+        worker_connection = self._in_worker(self._route, generations, 't1')
+        connection = self._route(generations, 't1')
+        self.assertIsNot(worker_connection, connection)
+
+        self._update_config(generations, 't1', 't1_updated')
+
+        for new_connection in (
+                self._in_worker(self._route, generations, 't1'),
+                self._route(generations, 't1'),
+        ):
+            self.assertNotIn(
+                new_connection, (worker_connection, connection)
+            )
+            self.assertEqual(
+                new_connection.settings_dict['NAME'],
+                os.path.join(self.db_dir, 't1_updated')
+            )
+
+        # other aliases are left alone.
+        connection = self._route(generations, 't2')
+        generations.bump('t1')
+        self.assertIs(self._route(generations, 't2'), connection)
+
+    def test_connections_of_deleted_aliases_are_closed(self):
+        generations = ConnectionGenerations(self.conn_handler)
+        self._route(generations, 't1').ensure_connection()
+        self._route(generations, 't2').ensure_connection()
+
+        generations.bump('t1', deleted=True)
+        generations.close_deleted()
+
+        self.assertFalse(hasattr(self.conn_handler._connections, 't1'))
+        self.assertTrue(hasattr(self.conn_handler._connections, 't2'))
+
+        # until the alias is registered again.
+        generations.revive('t1')
+        self._route(generations, 't1').ensure_connection()
+        generations.close_deleted()
+        self.assertTrue(hasattr(self.conn_handler._connections, 't1'))
+
+
+class ConnectionRetirementTest(
+    ConnectionGenerationsTestMixin, SimpleTestCase
+):
+
+    def _open(self, generations, conn_alias):
+        connection = self._route(generations, conn_alias)
+        connection.ensure_connection()
+        return connection
+
+    def test_open_connections_are_retired_until_drained(self):
+        generations = ConnectionGenerations(self.conn_handler)
+        connection = self._open(generations, 't1')
+
+        self._update_config(generations, 't1', 't1_updated')
+
+        # the request carries on with it.
+        self.assertIs(self._route(generations, 't1'), connection)
+        self.assertIsNotNone(connection.connection)
+        self.assertEqual(
+            generations.get_stats(),
+            {'retired': 1, 'drained': 0, 'forced': 0, 'pending': {'t1': 1}}
+        )
+
+        generations.drain()
+
+        self.assertIsNone(connection.connection)
+        self.assertEqual(
+            generations.get_stats(),
+            {'retired': 1, 'drained': 1, 'forced': 0, 'pending': {}}
+        )
+        self.assertEqual(
+            self._route(generations, 't1').settings_dict['NAME'],
+            os.path.join(self.db_dir, 't1_updated')
+        )
+
+    def test_retirement_is_per_thread(self):
+        generations = ConnectionGenerations(self.conn_handler)
+        worker_connection = self._in_worker(self._open, generations, 't1')
+
+        self._update_config(generations, 't1', 't1_updated')
+        self.assertIs(
+            self._in_worker(self._route, generations, 't1'),
+            worker_connection
+        )
+
+        # draining in another thread leaves it be.
+        generations.drain()
+        self.assertIsNotNone(worker_connection.connection)
+        self.assertEqual(generations.get_stats()['pending'], {'t1': 1})
+
+        self._in_worker(generations.drain)
+        self.assertIsNone(worker_connection.connection)
+        self.assertEqual(generations.get_stats()['pending'], {})
+
+    def test_retired_connections_are_force_closed_past_the_deadline(self):
+        generations = ConnectionGenerations(
+            self.conn_handler, retire_deadline=0
+        )
+        connection = self._open(generations, 't1')
+
+        self._update_config(generations, 't1', 't1_updated')
+        new_connection = self._route(generations, 't1')
+
+        self.assertIsNot(new_connection, connection)
+        self.assertIsNone(connection.connection)
+        self.assertEqual(
+            generations.get_stats(),
+            {'retired': 1, 'drained': 0, 'forced': 1, 'pending': {}}
+        )
+
+    def test_atomic_blocks_unwind_before_the_connection_is_dropped(self):
+        generations = ConnectionGenerations(
+            self.conn_handler, retire_deadline=0
+        )
+        connection = self._open(generations, 't1')
+
+        with mock.patch(
+            'django.db.transaction.connections', self.conn_handler
+        ), transaction.atomic(using='t1'):
+            self._update_config(generations, 't1', 't1_updated')
+
+            # force closed, but left in place for the block to unwind.
+            self.assertIs(self._route(generations, 't1'), connection)
+            self.assertTrue(connection.closed_in_transaction)
+
+        self.assertIsNot(self._route(generations, 't1'), connection)
+        self.assertEqual(generations.get_stats()['forced'], 1)
+
+
+class ConfigUpdateTest(DjangoOrmManagerTestMixin, SimpleTestCase):
+
+    def test_updated_configs_are_picked_up_by_every_thread(self):
+        conn_alias = self._register('t1')
+        conn_generations = self.manager.conn_generations
+
+        worker = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(worker.shutdown)
+        self.addCleanup(
+            lambda: worker.submit(self.conn_handler.close_all).result()
+        )
+
+        def route():
+            conn_generations.check(conn_alias)
+            return self.conn_handler[conn_alias].settings_dict['NAME']
+
+        worker.submit(route).result()
+        route()
+
+        self.manager.update_config(conn_alias, {
+            'NAME': os.path.join(self.db_dir, 'updated')
+        })
+
+        self.assertEqual(
+            worker.submit(route).result(),
+            os.path.join(self.db_dir, 'updated')
+        )
+        self.assertEqual(route(), os.path.join(self.db_dir, 'updated'))
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+from tenant_router.orm_backends.django_orm.conn_generations import (
+    ConnectionGenerations
+)
+from tenant_router.orm_backends.django_orm.conn_warmer import (
+    ConnectionWarmer
+)
+from tenant_router.tests.test_rollout import CACHES
+
+
+CONN_ALIASES = ('default', 't1', 't2', 't3')
+
+
+@override_settings(CACHES=CACHES)
+class ConnectionWarmerTest(SimpleTestCase):
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+
+        # sqlite never closes in-memory databases, hence the files.
+        self.conn_handler = ConnectionHandler({
+            conn_alias: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(db_dir.name, conn_alias)
+            }
+            for conn_alias in CONN_ALIASES
+        })
+        self.addCleanup(self.conn_handler.close_all)
+        self.conn_generations = ConnectionGenerations(self.conn_handler)
+
+    def _get_warmer(self, **kwargs):
+        warmer = ConnectionWarmer(
+            self.conn_handler, self.conn_generations, **kwargs
+        )
+        self.addCleanup(warmer.stop)
+        self.addCleanup(
+            lambda: warmer._config_store.delete(warmer._hot_aliases_key)
+        )
+        return warmer
+
+    def _warm(self, warmer, conn_aliases):
+        warmer.warm(conn_aliases)
+
+        deadline = time.monotonic() + 5
+        while warmer.get_stats()['warmed'] < len(conn_aliases):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_parked_connections_are_adopted_by_the_routing_thread(self):
+        warmer = self._get_warmer()
+        self._warm(warmer, ['t1'])
+
+        warmer.on_route('t1')
+
+        connection = self.conn_handler['t1']
+        self.assertIsNotNone(connection.connection)
+        # usable from this thread rather than the one that opened it.
+        self.assertEqual(connection._thread_ident, threading.get_ident())
+        connection.cursor().execute('SELECT 1')
+        self.assertEqual(
+            warmer.get_stats(),
+            {'warmed': 1, 'adopted': 1, 'discarded': 0, 'parked': 0}
+        )
+
+    def test_threads_with_a_connection_leave_it_parked(self):
+        warmer = self._get_warmer()
+        self._warm(warmer, ['t1'])
+        self.conn_handler['t1'].ensure_connection()
+
+        warmer.on_route('t1')
+
+        self.assertEqual(warmer.get_stats()['parked'], 1)
+
+        # but another thread adopts it.
+        thread = threading.Thread(
+            target=lambda: warmer.on_route('t1')
+            or self.conn_handler['t1'].close()
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(warmer.get_stats()['adopted'], 1)
+
+    def test_stale_connections_are_discarded(self):
+        warmer = self._get_warmer()
+        self._warm(warmer, ['t1'])
+
+        self.conn_generations.bump('t1')
+        warmer.on_route('t1')
+
+        self.assertFalse(hasattr(self.conn_handler._connections, 't1'))
+        self.assertEqual(
+            warmer.get_stats(),
+            {'warmed': 1, 'adopted': 0, 'discarded': 1, 'parked': 0}
+        )
+
+    def test_idle_connections_are_discarded(self):
+        warmer = self._get_warmer(idle_timeout=0)
+        self._warm(warmer, ['t1', 't2'])
+
+        warmer.on_route('t1')
+        self.assertFalse(hasattr(self.conn_handler._connections, 't1'))
+
+        # the rest are discarded on the next warm up.
+        warmer.warm([])
+        self.assertEqual(
+            warmer.get_stats(),
+            {'warmed': 2, 'adopted': 0, 'discarded': 2, 'parked': 0}
+        )
+
+    def test_idle_connections_are_closed_without_any_route(self):
+        warmer = self._get_warmer(idle_timeout=0.05)
+        self._warm(warmer, ['t1', 't2'])
+
+        # and the reaper is gone until connections are parked again.
+        deadline = time.monotonic() + 5
+        while warmer.get_stats()['discarded'] < 2 \
+                or warmer._reaper is not None:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        self.assertEqual(warmer.get_stats()['parked'], 0)
+
+    def test_unreachable_aliases_are_skipped(self):
+        warmer = self._get_warmer()
+        self.conn_handler.databases['t1']['NAME'] = os.path.join(
+            self.conn_handler.databases['t1']['NAME'], 'missing', 't1'
+        )
+
+        with self.assertLogs(
+                'tenant_router.orm_backends.django_orm.conn_warmer',
+                level='WARNING'
+        ):
+            warmer.warm(['t1', 't2'])
+            warmer._executor.shutdown(wait=True)
+
+        self.assertEqual(warmer.get_stats()['parked'], 1)
+
+    def test_busiest_aliases_are_saved_for_the_next_workers(self):
+        warmer = self._get_warmer(hot_count=2)
+        for conn_alias, count in (('t1', 1), ('t2', 3), ('t3', 2)):
+            for _ in range(count):
+                warmer.on_route(conn_alias)
+
+        warmer.save_hot_aliases()
+
+        next_warmer = self._get_warmer(hot_count=2)
+        self.assertEqual(next_warmer.get_hot_aliases(), ['t2', 't3'])
+
+        # earlier counts decay, so the ranking follows recent traffic.
+        for _ in range(3):
+            next_warmer.on_route('t1')
+        next_warmer.save_hot_aliases()
+
+        self.assertEqual(next_warmer.get_hot_aliases(), ['t1', 't2'])
@@ -0,0 +1,201 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.managers.task_local import tls_tenant_manager
+from tenant_router.orm_backends.django_orm.manager import DjangoOrmManager
+from tenant_router.orm_backends.django_orm.router import DjangoOrmRouter
+from tenant_router.orm_backends.utils import construct_conn_alias
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.utils import make_django_orm_manager
+
+
+TEMPLATE_ALIASES = ('default', 'other')
+
+
+def _conn_alias(tenant_alias, template_alias='default'):
+    return construct_conn_alias(tenant_alias, 'django_orm', template_alias)
+
+
+class DjangoOrmManagerTestMixin:
+    manager_options = None
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.db_dir = db_dir.name
+
+        self.template_config = template_config = {
+            template_alias: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(self.db_dir, template_alias)
+            }
+            for template_alias in TEMPLATE_ALIASES
+        }
+        self.conn_handler = ConnectionHandler(dict(template_config))
+        self.addCleanup(self.conn_handler.close_all)
+
+        self.manager = make_django_orm_manager(
+            self.conn_handler, template_config, self.manager_options
+        )
+
+    def _register(self, tenant_alias, template_alias='default', **db_config):
+        conn_alias = _conn_alias(tenant_alias, template_alias)
+        self.manager.register_config(conn_alias, {
+            'NAME': os.path.join(self.db_dir, conn_alias),
+            **db_config
+        })
+        return conn_alias
+
+
+class ConnAliasRegistryTest(DjangoOrmManagerTestMixin, SimpleTestCase):
+
+    def test_registered_configs_are_indexed(self):
+        t1_default = self._register('t1')
+        t1_other = self._register('t1', 'other')
+        t10_default = self._register('t10')
+
+        self.assertEqual(
+            self.manager.conn_aliases,
+            frozenset({t1_default, t1_other, t10_default})
+        )
+        self.assertEqual(
+            self.manager.conn_aliases_for_tenant('t1'),
+            frozenset({t1_default, t1_other})
+        )
+        self.assertEqual(
+            self.manager.lookup_conn_alias('t1', 'other'), t1_other
+        )
+
+    def test_updated_configs_stay_indexed(self):
+        conn_alias = self._register('t1')
+        self.manager.update_config(conn_alias, {'NAME': 'updated'})
+
+        self.assertEqual(self.manager.conn_aliases, frozenset({conn_alias}))
+        self.assertEqual(
+            self.conn_handler.databases[conn_alias]['NAME'], 'updated'
+        )
+
+    def test_deleted_configs_are_dropped(self):
+        t1_default = self._register('t1')
+        t1_other = self._register('t1', 'other')
+
+        self.manager.delete_config(t1_default)
+        self.assertEqual(self.manager.conn_aliases, frozenset({t1_other}))
+
+        self.manager.delete_config(t1_other)
+        self.assertEqual(self.manager.conn_aliases, frozenset())
+        self.assertEqual(
+            self.manager.conn_aliases_for_tenant('t1'), frozenset()
+        )
+
+
+class ModelTemplateAliasesTest(DjangoOrmManagerTestMixin, SimpleTestCase):
+    manager_options = {
+        'ROUTER_OPTS': {
+            'MODEL_TEMPLATE_ALIASES': {
+                'auth': 'other',
+                'auth.Permission': 'default',
+                'contenttypes.ContentType': 'reserved',
+            }
+        }
+    }
+
+    def setUp(self):
+        # reserved aliases are shared by every manager of the process.
+        patcher = mock.patch.object(
+            DjangoOrmManager, 'reserved_aliases', {'reserved'}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        super().setUp()
+
+        patcher = mock.patch.object(
+            DjangoOrmRouter, '_manager', self.manager, create=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = DjangoOrmRouter()
+
+        tls_tenant_manager.push_tenant_context(TenantContext.from_id('t1'))
+        self.addCleanup(tls_tenant_manager.pop_tenant_context)
+
+        self.t1_default = self._register('t1')
+        self.t1_other = self._register('t1', 'other')
+
+    def test_models_are_mapped_by_model_before_app_label(self):
+        self.assertEqual(
+            self.manager.get_template_alias_for_model(User), 'other'
+        )
+        self.assertEqual(
+            self.manager.get_template_alias_for_model(Permission), 'default'
+        )
+        self.assertEqual(
+            self.manager.get_template_alias_for_model(ContentType),
+            'reserved'
+        )
+
+    def test_lookups_are_memoized_per_model(self):
+        self.manager.get_template_alias_for_model(Group)
+        self.manager._model_template_alias_table.clear()
+
+        self.assertEqual(
+            self.manager.get_template_alias_for_model(Group), 'other'
+        )
+
+    def test_queries_are_routed_to_the_mapped_database(self):
+        self.assertEqual(self.router.db_for_read(User), self.t1_other)
+        self.assertEqual(self.router.db_for_write(Group), self.t1_other)
+        self.assertEqual(
+            self.router.db_for_read(Permission), self.t1_default
+        )
+        # reserved aliases aren't bound to any tenant.
+        self.assertEqual(self.router.db_for_write(ContentType), 'reserved')
+
+    def test_models_are_migrated_to_their_database_alone(self):
+        for conn_alias, app_label, model_name, allowed in (
+                (self.t1_other, 'auth', 'user', True),
+                (self.t1_default, 'auth', 'user', False),
+                (self.t1_default, 'auth', 'permission', True),
+                (self.t1_other, 'auth', 'permission', False),
+                # unmapped models stay off the mapped aliases.
+                (self.t1_default, 'contenttypes', None, True),
+                (self.t1_other, 'contenttypes', None, False),
+        ):
+            with self.subTest(conn_alias=conn_alias, model_name=model_name):
+                self.assertEqual(
+                    self.manager.is_migration_routed_to(
+                        conn_alias, app_label, model_name=model_name
+                    ),
+                    allowed
+                )
+
+        self.assertIs(
+            self.router.allow_migrate(
+                self.t1_default, 'auth', model_name='user'
+            ),
+            False
+        )
+
+    def test_unknown_aliases_are_rejected(self):
+        with self.assertRaises(ImproperlyConfiguredError):
+            make_django_orm_manager(
+                self.conn_handler,
+                self.template_config,
+                {'ROUTER_OPTS': {'MODEL_TEMPLATE_ALIASES': {'auth': 'missing'}}}
+            )
+
+    def test_tables_other_than_dicts_are_rejected(self):
+        with self.assertRaises(ImproperlyConfiguredError):
+            make_django_orm_manager(
+                self.conn_handler,
+                self.template_config,
+                {'ROUTER_OPTS': {'MODEL_TEMPLATE_ALIASES': ['auth']}}
+            )
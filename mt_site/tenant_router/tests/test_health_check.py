@@ -0,0 +1,197 @@
+import copy
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from tenant_router.orm_backends.django_orm.health_check import HealthChecker
+
+
+CONN_ALIASES = ('default', 't1', 't2')
+
+
+class HealthCheckerTest(SimpleTestCase):
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+
+        self.conn_handler = ConnectionHandler({
+            conn_alias: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(db_dir.name, conn_alias)
+            }
+            for conn_alias in CONN_ALIASES
+        })
+        self.addCleanup(self.conn_handler.close_all)
+
+    def _get_checker(self, **kwargs):
+        checker = HealthChecker(self.conn_handler, **kwargs)
+        self.addCleanup(checker.stop)
+        return checker
+
+    def _patch_probe(self, probe):
+        # `probe(conn_alias)` replaces the actual connection attempt.
+        def _probe(probe_run, settings_dict):
+            probe_run.started_at = time.monotonic()
+            return probe(probe_run.conn_alias)
+
+        patcher = mock.patch.object(
+            HealthChecker, '_probe', staticmethod(_probe)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _wait_for(predicate, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+        return True
+
+    def test_probes_connect_without_touching_shared_config(self):
+        databases = copy.deepcopy(self.conn_handler.databases)
+        checker = self._get_checker()
+
+        self.assertEqual(
+            checker.check(('t1', 't2')),
+            {
+                't1': {'result': True, 'msg': ''},
+                't2': {'result': True, 'msg': ''},
+            }
+        )
+        self.assertEqual(self.conn_handler.databases, databases)
+        # nor is a thread local connection left open.
+        self.assertFalse(hasattr(self.conn_handler._connections, 't1'))
+
+    def test_unconfigured_aliases_are_unhealthy(self):
+        checker = self._get_checker()
+
+        self.assertFalse(checker.check(('missing', ))['missing']['result'])
+
+    def test_timeout_starts_when_the_probe_does(self):
+        self._patch_probe(
+            lambda conn_alias: time.sleep(0.2) or {'result': True, 'msg': ''}
+        )
+        # the second probe is queued behind the first one, which would
+        # have used up a timeout shared by the whole batch.
+        checker = self._get_checker(max_workers=1, timeout=0.3)
+
+        health_check_dict = checker.check(('t1', 't2'))
+        self.assertTrue(health_check_dict['t1']['result'])
+        self.assertTrue(health_check_dict['t2']['result'])
+
+    def test_late_results_are_recorded(self):
+        should_complete = threading.Event()
+        self.addCleanup(should_complete.set)
+
+        def probe(conn_alias):
+            should_complete.wait(5)
+            return {'result': True, 'msg': ''}
+
+        self._patch_probe(probe)
+        checker = self._get_checker(timeout=0.1)
+
+        health_check_dict = checker.check(('t1', ))
+        self.assertFalse(health_check_dict['t1']['result'])
+        self.assertIn('timed out', health_check_dict['t1']['msg'])
+        self.assertFalse(checker.is_healthy('t1'))
+
+        should_complete.set()
+        self.assertTrue(
+            self._wait_for(lambda: checker.is_healthy('t1'))
+        )
+        self.assertTrue(checker.check(('t1', ))['t1']['result'])
+
+    def test_concurrent_checks_share_a_probe(self):
+        probe_calls = []
+        should_complete = threading.Event()
+        self.addCleanup(should_complete.set)
+
+        def probe(conn_alias):
+            probe_calls.append(conn_alias)
+            should_complete.wait(5)
+            return {'result': True, 'msg': ''}
+
+        self._patch_probe(probe)
+        checker = self._get_checker(timeout=5)
+
+        waiting_checks = []
+        wait = checker._wait
+
+        def _wait(in_flight):
+            waiting_checks.append(in_flight)
+            return wait(in_flight)
+
+        checker._wait = _wait
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(checker.check(('t1', )))
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+
+        self.assertTrue(self._wait_for(lambda: len(waiting_checks) == 3))
+        should_complete.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(probe_calls, ['t1'])
+        self.assertEqual(
+            results, [{'t1': {'result': True, 'msg': ''}}] * 3
+        )
+
+    def test_results_are_cached(self):
+        probe_calls = []
+        self._patch_probe(
+            lambda conn_alias: probe_calls.append(conn_alias)
+            or {'result': True, 'msg': ''}
+        )
+        checker = self._get_checker(cache_ttl=30)
+
+        checker.check(('t1', ))
+        checker.check(('t1', ))
+        checker.check(('t1', ), use_cache=False)
+
+        self.assertEqual(probe_calls, ['t1', 't1'])
+
+    def test_expired_results_are_refreshed_in_the_background(self):
+        results = [False, True]
+        self._patch_probe(
+            lambda conn_alias: {'result': results.pop(0), 'msg': ''}
+        )
+        checker = self._get_checker(cache_ttl=0.1)
+
+        self.assertFalse(checker.check(('t1', ))['t1']['result'])
+        self.assertFalse(checker.is_healthy('t1'))
+
+        time.sleep(0.1)
+        # served until the probe it kicks off completes.
+        self.assertFalse(checker.is_healthy('t1'))
+        self.assertTrue(
+            self._wait_for(lambda: checker.is_healthy('t1'))
+        )
+
+    def test_replicas_are_reprobed_without_a_probe_interval(self):
+        probe_calls = []
+        self._patch_probe(
+            lambda conn_alias: probe_calls.append(conn_alias)
+            or {'result': False, 'msg': ''}
+        )
+        checker = self._get_checker(cache_ttl=0.05)
+
+        checker.start(lambda: CONN_ALIASES, lambda: ('t1', ))
+
+        self.assertTrue(self._wait_for(lambda: len(probe_calls) >= 2))
+        self.assertEqual(set(probe_calls), {'t1'})
@@ -0,0 +1,149 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from tenant_router.exceptions import CircuitOpenError
+from tenant_router.managers.task_local import tls_tenant_manager
+from tenant_router.managers.tenant_context import TenantContextNotFound
+from tenant_router.middleware import TenantContextMiddleware
+from tenant_router.schemas import TenantContext
+
+
+def _get_by_id(tenant_id):
+    if tenant_id == 'unknown.test.com':
+        raise TenantContextNotFound(tenant_id)
+
+    return TenantContext.from_id(tenant_id)
+
+
+@override_settings(ROOT_URLCONF='tenant_router.tests.urls')
+@mock.patch(
+    'tenant_router.middleware.tenant_context_manager.get_by_id',
+    side_effect=_get_by_id
+)
+class TenantContextMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get_middleware(self, get_response):
+        # the middleware pops its keys off the settings dict.
+        with mock.patch(
+            'tenant_router.middleware.settings',
+            mock.Mock(TENANT_ROUTER_MIDDLEWARE_SETTINGS={
+                'WHITELIST_ROUTES': {'health'}
+            })
+        ):
+            return TenantContextMiddleware(get_response)
+
+    def _get_request(self, path='/app/items/', tenant_id='t1.test.com'):
+        return self.factory.get(path, HTTP_X_TENANT_ID=tenant_id)
+
+    def test_sync_request(self, _):
+        seen = []
+
+        def get_response(request):
+            seen.append(tls_tenant_manager.current_tenant_context.id)
+            return HttpResponse()
+
+        middleware = self._get_middleware(get_response)
+        self.assertFalse(iscoroutinefunction(middleware))
+
+        middleware(self._get_request())
+        self.assertEqual(seen, ['t1.test.com'])
+        self.assertEqual(
+            tls_tenant_manager.current_tenant_context.id, '__base__'
+        )
+
+    def test_context_is_popped_on_error(self, _):
+        def get_response(request):
+            raise ValueError
+
+        middleware = self._get_middleware(get_response)
+        with self.assertRaises(ValueError):
+            middleware(self._get_request())
+
+        self.assertEqual(
+            tls_tenant_manager.current_tenant_context.id, '__base__'
+        )
+
+    def test_whitelisted_route_pushes_nothing(self, get_by_id):
+        middleware = self._get_middleware(lambda request: HttpResponse())
+
+        middleware(self._get_request('/health/', tenant_id=''))
+        get_by_id.assert_not_called()
+
+    def test_unknown_tenant(self, _):
+        middleware = self._get_middleware(lambda request: HttpResponse())
+
+        response = middleware(
+            self._get_request(tenant_id='unknown.test.com')
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_requests_are_isolated(self, _):
+        seen = {}
+
+        async def get_response(request):
+            tenant_id = tls_tenant_manager.current_tenant_context.id
+            # lets the other request run in between.
+            await asyncio.sleep(0.01)
+            seen[request.headers['x-tenant-id']] = (
+                tenant_id, tls_tenant_manager.current_tenant_context.id
+            )
+            return HttpResponse()
+
+        middleware = self._get_middleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        async def main():
+            await asyncio.gather(
+                middleware(self._get_request(tenant_id='t1.test.com')),
+                middleware(self._get_request(tenant_id='t2.test.com'))
+            )
+
+        asyncio.run(main())
+        self.assertEqual(seen, {
+            't1.test.com': ('t1.test.com', 't1.test.com'),
+            't2.test.com': ('t2.test.com', 't2.test.com')
+        })
+        self.assertEqual(
+            tls_tenant_manager.current_tenant_context.id, '__base__'
+        )
+
+    def test_open_circuits_are_served_as_unavailable(self, _):
+        middleware = self._get_middleware(lambda request: HttpResponse())
+
+        response = middleware.process_exception(
+            self._get_request(), CircuitOpenError('t1', 12.2)
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '13')
+        self.assertIn('t1', response.content.decode())
+
+    def test_other_errors_are_left_alone(self, _):
+        middleware = self._get_middleware(lambda request: HttpResponse())
+
+        self.assertIsNone(
+            middleware.process_exception(self._get_request(), ValueError())
+        )
+
+
+class TLSTenantManagerTest(SimpleTestCase):
+
+    def test_push_and_pop(self):
+        t1 = TenantContext.from_id('t1.test.com')
+        t2 = TenantContext.from_id('t2.test.com')
+
+        tls_tenant_manager.push_tenant_context(t1)
+        tls_tenant_manager.push_tenant_context(t2)
+        self.assertIs(tls_tenant_manager.current_tenant_context, t2)
+        self.assertIs(tls_tenant_manager.pop_tenant_context(), t2)
+        self.assertIs(tls_tenant_manager.pop_tenant_context(), t1)
+        self.assertEqual(
+            tls_tenant_manager.current_tenant_context.id, '__base__'
+        )
@@ -0,0 +1,248 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import SimpleTestCase
+
+from tenant_router.orm_backends.base.migration_assistant import (
+    MigrationResult
+)
+from tenant_router.orm_backends.django_orm.migration_assistant import (
+    DjangoOrmMigrationAsst
+)
+from tenant_router.orm_backends.django_orm.migration_runner import (
+    MigrationRunner
+)
+
+
+CONN_ALIASES = ('tenant_router_test_1', 'tenant_router_test_2')
+
+
+class TempConnAliasesMixin:
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+
+        # registered in the global handler, same as tenant aliases are,
+        # since `post_migrate` handlers query through it.
+        for conn_alias in CONN_ALIASES:
+            connections.databases[conn_alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(db_dir.name, conn_alias)
+            }
+            self.addCleanup(connections.databases.pop, conn_alias)
+            self.addCleanup(self._remove_connection, conn_alias)
+
+    @staticmethod
+    def _remove_connection(conn_alias):
+        # the connection of this thread would otherwise outlive the
+        # config it was created with.
+        if hasattr(connections._connections, conn_alias):
+            connections[conn_alias].close()
+            del connections[conn_alias]
+
+
+class MigrationRunnerTest(TempConnAliasesMixin, SimpleTestCase):
+
+    def _migrate_in_thread(self, runner, conn_alias, errors):
+        try:
+            runner.migrate(conn_alias)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections[conn_alias].close()
+
+    def _get_applied_nodes(self, conn_alias):
+        try:
+            return frozenset(
+                MigrationRecorder(
+                    connections[conn_alias]
+                ).applied_migrations()
+            )
+        finally:
+            connections[conn_alias].close()
+
+    def test_aliases_are_migrated_concurrently_off_a_single_load(self):
+        with mock.patch.object(
+                MigrationLoader, 'load_disk',
+                autospec=True, side_effect=MigrationLoader.load_disk
+        ) as load_disk:
+            runner = MigrationRunner()
+
+            errors = []
+            threads = [
+                threading.Thread(
+                    target=self._migrate_in_thread,
+                    args=(runner, conn_alias, errors)
+                )
+                for conn_alias in CONN_ALIASES
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(load_disk.call_count, 1)
+        for conn_alias in CONN_ALIASES:
+            self.assertEqual(
+                self._get_applied_nodes(conn_alias), runner.target_nodes
+            )
+
+    def test_up_to_date_aliases_have_nothing_to_apply(self):
+        runner = MigrationRunner()
+
+        try:
+            self.assertEqual(
+                runner.migrate(CONN_ALIASES[0]), len(runner.target_nodes)
+            )
+            self.assertEqual(runner.migrate(CONN_ALIASES[0]), 0)
+        finally:
+            connections[CONN_ALIASES[0]].close()
+
+
+class MigrationProgressTest(SimpleTestCase):
+
+    def setUp(self):
+        manager = SimpleNamespace(
+            ORM_KEY='django_orm',
+            DEFAULT_CONN_ALIAS='default',
+            reserved_aliases={'reserved'},
+            ensure_schema=lambda conn_alias: None
+        )
+        self.migration_asst = DjangoOrmMigrationAsst(manager, workers=2)
+
+        # every tenant has a couple of databases.
+        patcher = mock.patch.object(
+            self.migration_asst,
+            '_get_conn_aliases',
+            side_effect=lambda tenant_id: OrderedDict([
+                ('default', tenant_id + '-default'),
+                ('other', tenant_id + '-other'),
+            ])
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.migrated_aliases = []
+        patcher = mock.patch.object(
+            self.migration_asst,
+            '_run_migrations',
+            side_effect=lambda runner, conn_alias, tenant_id:
+            self.migrated_aliases.append(conn_alias)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_progress_is_reported_per_database(self):
+        progress = []
+        results = self.migration_asst.perform_migrate(
+            ['t1', 't2'],
+            progress_callback=lambda result, completed, total: progress.append(
+                (result.db_alias, completed, total)
+            ),
+            skip_up_to_date=False
+        )
+
+        self.assertEqual(
+            sorted(self.migrated_aliases),
+            ['reserved', 't1-default', 't1-other', 't2-default', 't2-other']
+        )
+        self.assertEqual(
+            [(completed, total) for _, completed, total in progress],
+            [(completed, 5) for completed in range(1, 6)]
+        )
+        self.assertEqual(progress[-1][0], 'reserved')
+        self.assertTrue(
+            all(result.status == MigrationResult.MIGRATED for result in results)
+        )
+
+    def test_failures_are_reported_per_database(self):
+        def run_migrations(runner, conn_alias, tenant_id):
+            if conn_alias == 't1-other':
+                raise ValueError('boom')
+
+        self.migration_asst._run_migrations.side_effect = run_migrations
+        results = self.migration_asst.perform_migrate(
+            ['t1'], skip_up_to_date=False, exclude_reserved_aliases=True
+        )
+
+        self.assertEqual(
+            {result.db_alias: result.status for result in results},
+            {
+                'default': MigrationResult.MIGRATED,
+                'other': MigrationResult.FAILED,
+            }
+        )
+
+
+class MigrationStatusTest(TempConnAliasesMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        manager = SimpleNamespace(
+            ORM_KEY='django_orm',
+            DEFAULT_CONN_ALIAS='default',
+            reserved_aliases=set(),
+            ensure_schema=lambda conn_alias: None
+        )
+        self.migration_asst = DjangoOrmMigrationAsst(manager, workers=2)
+
+        patcher = mock.patch.object(
+            self.migration_asst,
+            '_get_conn_aliases',
+            side_effect=lambda tenant_id: OrderedDict([
+                ('default', CONN_ALIASES[0]),
+                # 't2' has a database which isn't configured.
+                ('other', CONN_ALIASES[1] if tenant_id == 't1' else 'missing'),
+            ])
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.runner = MigrationRunner()
+        self.runner.migrate(CONN_ALIASES[0])
+
+    def _get_pending(self):
+        pending = {}
+        for app_label, _ in self.runner.target_nodes:
+            pending[app_label] = pending.get(app_label, 0) + 1
+
+        return pending
+
+    def test_every_database_of_a_tenant_is_reported(self):
+        status = self.migration_asst.get_migration_status(['t1'])['t1']
+
+        self.assertIsNone(status['error'])
+        self.assertEqual(status['databases']['default']['pending'], {})
+        self.assertEqual(
+            status['databases']['other']['pending'], self._get_pending()
+        )
+        self.assertEqual(status['pending'], self._get_pending())
+
+    def test_pending_counts_are_summed_up_across_databases(self):
+        self.runner.migrate(CONN_ALIASES[1])
+        # a migration which neither database has applied.
+        target_nodes = {('tenant_router_test', '0001_initial')}
+
+        with mock.patch.object(
+                self.migration_asst, '_get_target_nodes',
+                return_value=self.runner.target_nodes.union(target_nodes)
+        ):
+            status = self.migration_asst.get_migration_status(['t1'])['t1']
+
+        self.assertEqual(status['pending'], {'tenant_router_test': 2})
+
+    def test_errors_are_reported_per_database(self):
+        status = self.migration_asst.get_migration_status(['t2'])['t2']
+
+        self.assertIsNone(status['databases']['default']['error'])
+        self.assertIsNotNone(status['databases']['other']['error'])
+        self.assertTrue(status['error'].startswith('other: '))
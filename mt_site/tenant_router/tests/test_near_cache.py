@@ -0,0 +1,358 @@
+import json
+import queue
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from tenant_router.cache.near_cache import NearCache, NearCachedCache
+from tenant_router.conf import settings
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.pubsub.backends.redis import RedisEventListener
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.test_cache_config_manager import (
+    CacheConfigManagerTestMixin
+)
+from tenant_router.tests.utils import make_event
+
+
+class NearCacheTestMixin:
+
+    def setUp(self):
+        patcher = mock.patch(
+            'tenant_router.cache.near_cache.pubsub_proxy'
+        )
+        self.pubsub_proxy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.dict(
+            settings.__dict__, TENANT_ROUTER_PUBSUB_ENABLED=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_near_cache(self, **kwargs):
+        # invalidations are only published when flushed by the test.
+        near_cache = NearCache(**{'publish_interval': 60, **kwargs})
+        self.addCleanup(near_cache.stop)
+        return near_cache
+
+    def _get_cache(self, near_cache, cache_alias='t1_default'):
+        # locmem caches of the same location are shared by the whole
+        # process.
+        backend = LocMemCache(
+            '{test_id}:{cache_alias}'.format(
+                test_id=self.id(), cache_alias=cache_alias
+            ),
+            {}
+        )
+        self.addCleanup(backend.clear)
+        return backend, near_cache.wrap(cache_alias, backend)
+
+    def _get_published(self, near_cache):
+        near_cache.flush()
+        return [
+            json.loads(call[0][1])
+            for call in self.pubsub_proxy.publish.call_args_list
+        ]
+
+
+class NearCacheTest(NearCacheTestMixin, SimpleTestCase):
+
+    def test_reads_are_served_locally(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        backend.set('key', 'value')
+
+        self.assertEqual(cache.get('key'), 'value')
+        # changes made behind its back aren't seen until the entry expires.
+        backend.set('key', 'changed')
+        self.assertEqual(cache.get('key'), 'value')
+
+        self.assertEqual(
+            near_cache.get_stats()['t1_default'],
+            {
+                'hits': 1,
+                'misses': 1,
+                'hit_ratio': 0.5,
+                'invalidations': 0,
+                'avg_invalidation_lag': None,
+                'max_invalidation_lag': 0.0
+            }
+        )
+
+    def test_hits_are_copies(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        backend.set('key', {'items': [1]})
+        cache.get('key')
+
+        cache.get('key')['items'].append(2)
+
+        self.assertEqual(cache.get('key'), {'items': [1]})
+        self.assertEqual(near_cache.get_stats()['t1_default']['hits'], 2)
+
+    def test_misses_are_not_stored(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+
+        self.assertEqual(cache.get('key', 'default'), 'default')
+        backend.set('key', 'value')
+
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_entries_expire(self):
+        near_cache = self._get_near_cache(ttl=5)
+        backend, cache = self._get_cache(near_cache)
+        backend.set('key', 'value')
+        cache.get('key')
+        backend.set('key', 'changed')
+
+        with mock.patch(
+                'tenant_router.cache.near_cache.time.monotonic',
+                return_value=time.monotonic() + 5
+        ):
+            self.assertEqual(cache.get('key'), 'changed')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        near_cache = self._get_near_cache(max_entries=2)
+        backend, cache = self._get_cache(near_cache)
+        backend.set_many({'k1': 1, 'k2': 2, 'k3': 3})
+
+        cache.get_many(['k1', 'k2'])
+        cache.get('k1')
+        cache.get('k3')
+
+        self.assertEqual(
+            list(near_cache._entries),
+            [('t1_default', cache.make_key(key)) for key in ('k1', 'k3')]
+        )
+
+    def test_writes_invalidate_every_worker(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        cache.set_many({'k1': 1, 'k2': 2})
+        cache.get_many(['k1', 'k2'])
+
+        cache.set('k1', 'changed')
+        cache.delete('k2')
+
+        self.assertEqual(cache.get('k1'), 'changed')
+        self.assertIsNone(cache.get('k2'))
+        # in a single message.
+        published = self._get_published(near_cache)
+        self.assertEqual(len(published), 1)
+        self.assertEqual(
+            {
+                cache_alias: sorted(made_keys)
+                for cache_alias, made_keys
+                in published[0]['invalidations'].items()
+            },
+            {'t1_default': [cache.make_key('k1'), cache.make_key('k2')]}
+        )
+        self.pubsub_proxy.publish.assert_called_with(
+            near_cache.channel_name, mock.ANY
+        )
+
+    def test_invalidations_are_not_published_without_pubsub(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+
+        with mock.patch.dict(
+                settings.__dict__, TENANT_ROUTER_PUBSUB_ENABLED=False
+        ):
+            cache.set('key', 'value')
+
+        self.assertEqual(self._get_published(near_cache), [])
+
+    def test_reads_racing_a_write_are_not_stored(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        backend.set('key', 'value')
+
+        def get(key, default=None, version=None):
+            value = LocMemCache.get(backend, key, default, version)
+            # written elsewhere while the value was on its way.
+            near_cache.invalidate('t1_default', [cache.make_key(key)])
+            return value
+
+        with mock.patch.object(backend, 'get', side_effect=get):
+            self.assertEqual(cache.get('key'), 'value')
+
+        backend.set('key', 'changed')
+        self.assertEqual(cache.get('key'), 'changed')
+
+    def test_clear_drops_every_key_of_the_alias(self):
+        near_cache = self._get_near_cache()
+        t1_backend, t1_cache = self._get_cache(near_cache)
+        t2_backend, t2_cache = self._get_cache(near_cache, 't2_default')
+        t1_backend.set('key', 't1')
+        t2_backend.set('key', 't2')
+        t1_cache.get('key')
+        t2_cache.get('key')
+
+        t1_cache.clear()
+
+        self.assertEqual(
+            list(near_cache._entries),
+            [('t2_default', t2_cache.make_key('key'))]
+        )
+        self.assertEqual(
+            self._get_published(near_cache)[-1]['invalidations'],
+            {'t1_default': None}
+        )
+
+    def test_invalidations_from_other_workers_are_applied(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        backend.set_many({'k1': 1, 'k2': 2})
+        cache.get_many(['k1', 'k2'])
+        backend.set_many({'k1': 'changed', 'k2': 'changed'})
+
+        near_cache.on_invalidation(make_event({
+            'invalidations': {'t1_default': [cache.make_key('k1')]},
+            'sent_at': time.time() - 1
+        }))
+
+        self.assertEqual(cache.get('k1'), 'changed')
+        self.assertEqual(cache.get('k2'), 2)
+
+        stats = near_cache.get_stats()['t1_default']
+        self.assertEqual(stats['invalidations'], 1)
+        self.assertGreaterEqual(stats['max_invalidation_lag'], 1)
+
+    def test_forgotten_aliases_are_dropped(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        backend.set('key', 'value')
+        cache.get('key')
+
+        near_cache.forget('t1_default')
+
+        self.assertEqual(list(near_cache._entries), [])
+        # without telling the other workers, which forget it themselves.
+        self.pubsub_proxy.publish.assert_not_called()
+
+    def test_failed_publishes_are_logged(self):
+        near_cache = self._get_near_cache()
+        backend, cache = self._get_cache(near_cache)
+        self.pubsub_proxy.publish.side_effect = ConnectionError
+
+        cache.set('key', 'value')
+        with self.assertLogs(
+                'tenant_router.cache.near_cache', level='WARNING'
+        ):
+            near_cache.flush()
+
+        self.assertEqual(backend.get('key'), 'value')
+
+
+class QueuePubSub:
+    """
+    Stands in for a redis pubsub connection, handing messages published
+    on it to the handler of their channel, as redis-py does for channels
+    subscribed to with one.
+    """
+
+    def __init__(self, handler):
+        self.messages = queue.Queue()
+        self._handler = handler
+
+    def publish(self, channel_name, payload):
+        self.messages.put(
+            {'type': 'message', 'channel': channel_name, 'data': payload}
+        )
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0):
+        try:
+            message = self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        self._handler(message)
+        self.messages.task_done()
+
+    def close(self):
+        pass
+
+
+class NearCacheListenerTest(NearCacheTestMixin, SimpleTestCase):
+
+    def test_sustained_writes_dont_flood_the_listener(self):
+        writer = self._get_near_cache(publish_interval=0.01)
+        reader = self._get_near_cache()
+        backend, cache = self._get_cache(writer)
+        reader_cache = reader.wrap('t1_default', backend)
+
+        def on_message(message):
+            payload = json.loads(message['data'])
+            # as received by a worker of another process.
+            del payload['proc_uuid']
+            reader.on_invalidation(make_event(payload))
+
+        pubsub = QueuePubSub(on_message)
+        self.pubsub_proxy.publish.side_effect = pubsub.publish
+        listener = RedisEventListener(pubsub)
+        listener.start()
+        self.addCleanup(listener.stop)
+
+        backend.set('hot', 'value')
+        reader_cache.get('hot')
+
+        writes = 0
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            cache.set('key{index}'.format(index=writes % 100), writes)
+            writes += 1
+        cache.set('hot', 'changed')
+        writer.flush()
+
+        # the listener keeps up with the writes, which are coalesced into
+        # about one message per publish interval.
+        drained = threading.Thread(target=pubsub.messages.join, daemon=True)
+        drained.start()
+        drained.join(timeout=2)
+        self.assertFalse(drained.is_alive())
+        self.assertTrue(listener._pubsub_thread.is_alive())
+
+        self.assertLess(self.pubsub_proxy.publish.call_count, 100)
+        self.assertLess(self.pubsub_proxy.publish.call_count, writes)
+        self.assertEqual(reader_cache.get('hot'), 'changed')
+
+
+class NearCacheConfigTest(
+    NearCacheTestMixin, CacheConfigManagerTestMixin, SimpleTestCase
+):
+    cache_settings = {
+        'NEAR_CACHE': {'ALIASES': {'default'}, 'TTL': 10}
+    }
+
+    def setUp(self):
+        NearCacheTestMixin.setUp(self)
+        CacheConfigManagerTestMixin.setUp(self)
+
+    def test_only_the_given_template_aliases_are_wrapped(self):
+        self._register('t1')
+        self._register('t1', 'other')
+
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            cache = self.cache_handler['default']
+            self.assertIsInstance(cache, NearCachedCache)
+            # and only once.
+            self.assertIs(self.cache_handler['default'], cache)
+            self.assertNotIsInstance(
+                self.cache_handler['other'], NearCachedCache
+            )
+
+    def test_deleted_configs_are_forgotten(self):
+        cache_alias = self._register('t1')
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.cache_handler['default'].set('key', 'value')
+            self.cache_handler['default'].get('key')
+
+        self._delete(cache_alias)
+
+        self.assertEqual(list(self.manager.near_cache._entries), [])
+        self.assertIn(cache_alias, self.manager.get_near_cache_stats())
@@ -0,0 +1,98 @@
+from django.test import SimpleTestCase
+
+from tenant_router.orm_backends.base.manager import BaseOrmManager
+from tenant_router.orm_backends.utils import construct_conn_alias
+
+
+class _OrmManager(BaseOrmManager):
+    ORM_KEY = 'django_orm'
+    DEFAULT_CONN_ALIAS = 'default'
+
+
+class ConnAliasTableTest(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = _OrmManager({'SETTINGS_KEY': 'DATABASES'})
+
+    def test_registered_aliases_are_looked_up(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+
+        self.assertEqual(
+            self.manager.lookup_conn_alias('t1', 'default'), 'conn_1'
+        )
+
+    def test_unregistered_aliases_are_constructed(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+
+        self.assertEqual(
+            self.manager.lookup_conn_alias('t1', 'other'),
+            construct_conn_alias('t1', 'django_orm', 'other')
+        )
+        self.assertEqual(
+            self.manager.lookup_conn_alias('t2', 'default'),
+            construct_conn_alias('t2', 'django_orm', 'default')
+        )
+
+    def test_removal(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+        self.manager._add_to_conn_alias_table('t1', 'other', 'conn_2')
+
+        self.manager._remove_from_conn_alias_table('t1', 'default')
+        self.assertEqual(
+            dict(self.manager.get_conn_alias_map('t1')), {'other': 'conn_2'}
+        )
+
+        self.manager._remove_from_conn_alias_table('t1', 'other')
+        self.assertNotIn('t1', self.manager._conn_alias_table)
+
+    def test_inner_dicts_are_replaced(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+        alias_map = self.manager._conn_alias_table['t1']
+
+        self.manager._add_to_conn_alias_table('t1', 'other', 'conn_2')
+        self.assertEqual(alias_map, {'default': 'conn_1'})
+
+        with self.assertRaises(TypeError):
+            self.manager.get_conn_alias_map('t1')['default'] = 'conn_3'
+
+
+class ConnAliasRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = _OrmManager({'SETTINGS_KEY': 'DATABASES'})
+
+    def test_conn_aliases_include_static_aliases(self):
+        self.manager._set_static_conn_aliases({'reserved'})
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+
+        self.assertEqual(
+            self.manager.conn_aliases, frozenset({'reserved', 'conn_1'})
+        )
+
+    def test_conn_aliases_view_is_rebuilt_only_after_changes(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+        conn_aliases = self.manager.conn_aliases
+        self.assertIs(self.manager.conn_aliases, conn_aliases)
+
+        self.manager._add_to_conn_alias_table('t2', 'default', 'conn_2')
+        self.assertEqual(
+            self.manager.conn_aliases, frozenset({'conn_1', 'conn_2'})
+        )
+
+        self.manager._remove_from_conn_alias_table('t1', 'default')
+        self.assertEqual(self.manager.conn_aliases, frozenset({'conn_2'}))
+        # views handed out earlier are left as they were.
+        self.assertEqual(conn_aliases, frozenset({'conn_1'}))
+
+    def test_conn_aliases_for_tenant(self):
+        self.manager._add_to_conn_alias_table('t1', 'default', 'conn_1')
+        self.manager._add_to_conn_alias_table('t1', 'other', 'conn_2')
+        self.manager._add_to_conn_alias_table('t10', 'default', 'conn_10')
+
+        self.assertEqual(
+            self.manager.conn_aliases_for_tenant('t1'),
+            frozenset({'conn_1', 'conn_2'})
+        )
+        self.assertEqual(
+            self.manager.conn_aliases_for_tenant('t2'), frozenset()
+        )
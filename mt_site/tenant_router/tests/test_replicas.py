@@ -0,0 +1,78 @@
+from collections import Counter
+
+from django.core.signals import request_started
+from django.test import SimpleTestCase
+
+# connects the `request_started` handler.
+import tenant_router.orm_backends.django_orm.router  # noqa: F401
+from tenant_router.orm_backends.django_orm.replicas import (
+    is_written, mark_written, reset_read_your_writes, ReplicaSet
+)
+
+
+class ReplicaSetTest(SimpleTestCase):
+
+    def _pick(self, replica_set, count, is_healthy=lambda conn_alias: True):
+        return [replica_set.pick(is_healthy) for _ in range(count)]
+
+    def test_replicas_are_picked_in_proportion_to_their_weight(self):
+        replica_set = ReplicaSet([('r1', 3), ('r2', 1), ('r3', 1)])
+
+        self.assertEqual(
+            Counter(self._pick(replica_set, 50)),
+            {'r1': 30, 'r2': 10, 'r3': 10}
+        )
+
+    def test_heavier_replicas_are_spread_out(self):
+        replica_set = ReplicaSet([('r1', 5), ('r2', 1), ('r3', 1)])
+
+        self.assertEqual(
+            self._pick(replica_set, 7),
+            ['r1', 'r1', 'r2', 'r1', 'r3', 'r1', 'r1']
+        )
+
+    def test_unhealthy_replicas_are_skipped(self):
+        replica_set = ReplicaSet([('r1', 2), ('r2', 1)])
+
+        self.assertEqual(
+            set(self._pick(
+                replica_set, 6, is_healthy=lambda conn_alias: conn_alias != 'r1'
+            )),
+            {'r2'}
+        )
+        self.assertIsNone(
+            replica_set.pick(lambda conn_alias: False)
+        )
+
+    def test_set_updates_return_a_new_set(self):
+        replica_set = ReplicaSet([('r1', 1)])
+        updated_replica_set = replica_set.with_replica('r1', 2) \
+            .with_replica('r2', 1)
+
+        self.assertEqual(replica_set.replicas, (('r1', 1), ))
+        self.assertEqual(
+            updated_replica_set.replicas, (('r1', 2), ('r2', 1))
+        )
+        self.assertFalse(
+            updated_replica_set.without_replica('r1').without_replica('r2')
+        )
+
+
+class ReadYourWritesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(reset_read_your_writes)
+
+    def test_writes_pin_reads_to_the_primary(self):
+        mark_written('t1', 'default')
+
+        self.assertTrue(is_written('t1', 'default'))
+        self.assertFalse(is_written('t1', 'other'))
+        self.assertFalse(is_written('t2', 'default'))
+
+    def test_pins_are_reset_when_a_request_starts(self):
+        mark_written('t1', 'default')
+
+        request_started.send(sender=self.__class__)
+
+        self.assertFalse(is_written('t1', 'default'))
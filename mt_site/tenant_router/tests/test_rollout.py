@@ -0,0 +1,215 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.orm_backends.base.migration_assistant import (
+    MigrationResult
+)
+from tenant_router.orm_backends.django_orm.migration_assistant import (
+    DjangoOrmMigrationAsst
+)
+from tenant_router.orm_backends.django_orm.rollout import MigrationRollout
+
+
+TENANT_IDS = ['t1', 't2', 't3', 't4', 't5', 't6', 't7', 't8']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant_router_test_default',
+    },
+    'tenant_router_config_store': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant_router_test_config_store',
+        'TIMEOUT': None,
+    },
+}
+
+
+def _result(tenant_id, failed=False):
+    return MigrationResult(
+        'default',
+        tenant_id=tenant_id,
+        status=MigrationResult.FAILED if failed else MigrationResult.MIGRATED
+    )
+
+
+@override_settings(CACHES=CACHES)
+class MigrationRolloutTest(SimpleTestCase):
+
+    def _get_rollout(self, **kwargs):
+        rollout = MigrationRollout('test_rollout', **kwargs)
+        rollout.load_state()
+        self.addCleanup(rollout.reset_state)
+        return rollout
+
+    def test_canaries_go_first_followed_by_growing_waves(self):
+        rollout = self._get_rollout(
+            canary_tenant_ids=['t5', 'missing'], wave_size=2, wave_growth=2
+        )
+
+        self.assertEqual(
+            list(rollout.plan_waves(TENANT_IDS)),
+            [
+                (True, ('t5', )),
+                (False, ('t1', 't2')),
+                (False, ('t3', 't4', 't6', 't7')),
+                (False, ('t8', )),
+            ]
+        )
+
+    def test_unknown_canaries_are_rejected(self):
+        rollout = self._get_rollout(canary_tenant_ids=['t1', 'missing'])
+
+        with self.assertRaises(ImproperlyConfiguredError):
+            rollout.validate_canary_tenant_ids(TENANT_IDS.__contains__)
+
+    def test_canary_failures_halt_the_rollout(self):
+        rollout = self._get_rollout(canary_tenant_ids=['t1'])
+
+        self.assertFalse(
+            rollout.record_wave([_result('t1', failed=True)], is_canary=True)
+        )
+        self.assertTrue(rollout.halted)
+
+    def test_halted_rollouts_stay_halted_until_resumed(self):
+        rollout = self._get_rollout(wave_size=2, max_failure_rate=0.4)
+        rollout.record_wave([_result('t1'), _result('t2')], is_canary=False)
+        rollout.record_wave(
+            [_result('t3', failed=True), _result('t4')], is_canary=False
+        )
+
+        rollout = self._get_rollout(wave_size=2)
+        self.assertTrue(rollout.halted)
+
+        rollout.resume()
+        rollout = self._get_rollout(wave_size=2)
+        self.assertFalse(rollout.halted)
+        # the tenants migrated so far are kept.
+        self.assertEqual(
+            list(rollout.plan_waves(TENANT_IDS[:4])), [(False, ('t3', ))]
+        )
+
+    def test_halts_from_elsewhere_are_picked_up(self):
+        rollout = self._get_rollout()
+        other_rollout = self._get_rollout()
+
+        other_rollout.halted = True
+        other_rollout._save_state()
+
+        self.assertTrue(rollout.refresh_halted())
+        # and aren't overwritten by the next wave.
+        rollout.record_wave([_result('t1')], is_canary=False)
+        self.assertTrue(self._get_rollout().halted)
+
+    def test_state_expires(self):
+        rollout = MigrationRollout('test_rollout', state_ttl=60)
+
+        with mock.patch.object(
+                MigrationRollout, '_config_store',
+                new_callable=mock.PropertyMock
+        ) as config_store:
+            config_store.return_value.get.return_value = None
+            rollout.record_wave([_result('t1')], is_canary=False)
+
+        config_store.return_value.set.assert_called_once_with(
+            rollout._state_key,
+            {'completed': ['t1'], 'halted': False},
+            60
+        )
+
+
+@override_settings(CACHES=CACHES)
+class RolloutMigrationTest(SimpleTestCase):
+
+    def setUp(self):
+        manager = SimpleNamespace(
+            ORM_KEY='django_orm',
+            DEFAULT_CONN_ALIAS='default',
+            reserved_aliases=set(),
+            ensure_schema=lambda conn_alias: None
+        )
+        self.migration_asst = DjangoOrmMigrationAsst(manager)
+
+        for attr, side_effect in (
+                ('_get_conn_aliases', lambda tenant_id: {
+                    'default': tenant_id
+                }),
+                ('_run_migrations', self._run_migrations),
+        ):
+            patcher = mock.patch.object(
+                self.migration_asst, attr, side_effect=side_effect
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'tenant_router.orm_backends.django_orm.migration_assistant'
+            '.tenant_context_manager',
+            contains=TENANT_IDS.__contains__
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.migrated_tenant_ids = []
+        self.failing_tenant_ids = set()
+        self.addCleanup(
+            MigrationRollout('test_rollout').reset_state
+        )
+
+    def _run_migrations(self, runner, conn_alias, tenant_id):
+        self.migrated_tenant_ids.append(tenant_id)
+        if tenant_id in self.failing_tenant_ids:
+            raise ValueError('boom')
+
+    def _migrate(self, **kwargs):
+        results = self.migration_asst.perform_migrate(
+            TENANT_IDS[:4],
+            skip_up_to_date=False,
+            rollout_id='test_rollout',
+            wave_size=1,
+            **kwargs
+        )
+        return {result.tenant_id: result.status for result in results}
+
+    def test_waves_are_migrated_in_order(self):
+        self._migrate(canary_tenant_ids=['t3'])
+
+        self.assertEqual(self.migrated_tenant_ids, ['t3', 't1', 't2', 't4'])
+
+    def test_halted_rollouts_resume_only_when_asked_to(self):
+        self.failing_tenant_ids = {'t2'}
+        self.assertEqual(
+            self._migrate(),
+            {
+                't1': MigrationResult.MIGRATED,
+                't2': MigrationResult.FAILED,
+                # in the same wave as 't2'.
+                't3': MigrationResult.MIGRATED,
+                't4': MigrationResult.HALTED,
+            }
+        )
+
+        self.failing_tenant_ids = set()
+        self.migrated_tenant_ids = []
+        self.assertEqual(
+            self._migrate(),
+            {
+                't1': MigrationResult.UP_TO_DATE,
+                't2': MigrationResult.HALTED,
+                't3': MigrationResult.UP_TO_DATE,
+                't4': MigrationResult.HALTED,
+            }
+        )
+        self.assertEqual(self.migrated_tenant_ids, [])
+
+        self._migrate(resume_rollout=True)
+        self.assertEqual(self.migrated_tenant_ids, ['t2', 't4'])
+
+    def test_unknown_canaries_are_rejected(self):
+        with self.assertRaises(ImproperlyConfiguredError):
+            self._migrate(canary_tenant_ids=['missing'])
+
+        self.assertEqual(self.migrated_tenant_ids, [])
@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+
+from tenant_router.middleware import _RouteWhitelistIndex
+
+
+URLCONF = 'tenant_router.tests.urls'
+
+
+class RouteWhitelistIndexTest(SimpleTestCase):
+
+    def _get_index(self, whitelist_routes, cache_size=16):
+        return _RouteWhitelistIndex(
+            whitelist_routes, cache_size=cache_size, urlconf=URLCONF
+        )
+
+    def test_exact_paths_are_whitelisted_without_resolving(self):
+        index = self._get_index({'health', 'app:status'})
+
+        self.assertEqual(index._exact_paths, {'/health/', '/app/status/'})
+        self.assertTrue(index.is_whitelisted('/health/'))
+        self.assertTrue(index.is_whitelisted('/app/status/'))
+
+    def test_routes_with_converters(self):
+        index = self._get_index({'app:item'})
+
+        self.assertTrue(index.is_whitelisted('/app/items/1/'))
+        self.assertFalse(index.is_whitelisted('/app/items/'))
+        self.assertFalse(index.is_whitelisted('/app/items/abc/'))
+
+    def test_non_whitelisted_paths(self):
+        index = self._get_index({'health'})
+
+        self.assertFalse(index.is_whitelisted('/orders/abc/'))
+        self.assertFalse(index.is_whitelisted('/unknown/'))
+
+    def test_whitelisted_by_func_path(self):
+        index = self._get_index({
+            'tenant_router.tests.urls.whitelisted_view'
+        })
+
+        self.assertTrue(index.is_whitelisted('/health/'))
+        self.assertTrue(index.is_whitelisted('/app/items/7/'))
+        self.assertFalse(index.is_whitelisted('/orders/abc/'))
+
+    def test_regex_routes_fall_back_to_resolve(self):
+        index = self._get_index({'legacy'})
+
+        self.assertFalse(index._can_prefilter)
+        self.assertTrue(index.is_whitelisted('/legacy/1/'))
+        self.assertFalse(index.is_whitelisted('/health/'))
+
+    def test_outcomes_are_cached(self):
+        index = self._get_index({'app:item'}, cache_size=1)
+
+        index.is_whitelisted('/app/items/1/')
+        index.is_whitelisted('/app/items/1/')
+        self.assertEqual(index.is_whitelisted.cache_info().hits, 1)
+
+        index.is_whitelisted('/app/items/2/')
+        self.assertEqual(index.is_whitelisted.cache_info().currsize, 1)
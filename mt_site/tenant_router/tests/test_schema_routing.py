@@ -0,0 +1,280 @@
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from django.db import connection as default_connection
+from django.db import transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from tenant_router.exceptions import ImproperlyConfiguredError
+from tenant_router.managers.task_local import tls_tenant_manager
+from tenant_router.orm_backends.django_orm.schema_routing import (
+    SchemaRouting
+)
+from tenant_router.schemas import TenantContext
+
+
+class _RecordingSchemaRouting(SchemaRouting):
+    # sqlite has no schemas, every `SET` is recorded instead.
+    SUPPORTED_ENGINES = SchemaRouting.SUPPORTED_ENGINES + (
+        'django.db.backends.sqlite3',
+    )
+
+    def __init__(self, conn_handler):
+        super().__init__(conn_handler)
+        self.search_paths = []
+
+    def _set_search_path(self, cursor, connection, schema):
+        self.search_paths.append(schema)
+
+
+class _TenantContextMixin:
+
+    def _push_tenant(self, tenant_alias):
+        tls_tenant_manager.push_tenant_context(
+            TenantContext.from_id(tenant_alias)
+        )
+        self.addCleanup(tls_tenant_manager.pop_tenant_context)
+
+
+class SchemaRoutingTest(_TenantContextMixin, SimpleTestCase):
+
+    def setUp(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+
+        self.conn_handler = ConnectionHandler({
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(db_dir.name, 'default')
+            }
+        })
+        self.addCleanup(self.conn_handler.close_all)
+
+        self.db_config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(db_dir.name, 'shared')
+        }
+        self.schema_routing = _RecordingSchemaRouting(self.conn_handler)
+        for tenant_alias in ('t1', 't2'):
+            self.schema_routing.register(
+                'default-' + tenant_alias, tenant_alias, self.db_config
+            )
+
+        self.shared_alias, _ = self.schema_routing.get_shared_conn(
+            'default-t1'
+        )
+
+    def _route(self, conn_alias):
+        # mirrors the router, which hands out the shared alias.
+        shared_alias, schema = self.schema_routing.get_shared_conn(
+            conn_alias
+        )
+        self.schema_routing.activate(shared_alias, schema)
+        return self.conn_handler[shared_alias]
+
+    @staticmethod
+    def _query(connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def _atomic(self, connection):
+        return transaction.atomic(using=connection.alias)
+
+    def test_tenants_on_the_same_database_share_an_alias(self):
+        self.assertEqual(
+            self.schema_routing.get_shared_conn('default-t2'),
+            (self.shared_alias, 't2')
+        )
+        self.assertEqual(
+            self.schema_routing.get_stats(),
+            {'tenant_aliases': 2, 'shared_aliases': 1}
+        )
+
+    def test_nothing_is_sent_at_routing_time(self):
+        self._push_tenant('t1')
+        self._route('default-t1').ensure_connection()
+
+        self.assertEqual(self.schema_routing.search_paths, [])
+
+    def test_schema_of_the_executing_tenant_is_used(self):
+        self._push_tenant('t1')
+        connection = self._route('default-t1')
+
+        # a queryset routed under t1 but evaluated under t2.
+        self._push_tenant('t2')
+        self._query(connection)
+
+        self.assertEqual(self.schema_routing.search_paths, ['t2'])
+
+    def test_routed_schema_is_used_for_tenants_without_one(self):
+        self._push_tenant('t3')
+        self._query(self._route('default-t1'))
+
+        self.assertEqual(self.schema_routing.search_paths, ['t1'])
+
+    def test_search_path_is_only_set_when_it_changes(self):
+        self._push_tenant('t1')
+        connection = self._route('default-t1')
+        self._query(connection)
+        self._query(connection)
+
+        self._push_tenant('t2')
+        self._query(self._route('default-t2'))
+
+        self.assertEqual(self.schema_routing.search_paths, ['t1', 't2'])
+
+    def test_search_path_is_set_again_after_reconnecting(self):
+        self._push_tenant('t1')
+        connection = self._route('default-t1')
+        self._query(connection)
+        connection.close()
+        self._query(connection)
+
+        self.assertEqual(self.schema_routing.search_paths, ['t1', 't1'])
+
+    def test_search_path_is_set_again_after_a_savepoint_rollback(self):
+        self._push_tenant('t1')
+        connection = self._route('default-t1')
+
+        with mock.patch(
+            'django.db.transaction.connections', self.conn_handler
+        ), self._atomic(connection):
+            try:
+                with self._atomic(connection):
+                    self._query(connection)
+                    raise ValueError
+            except ValueError:
+                pass
+
+            self._query(connection)
+
+        self.assertEqual(self.schema_routing.search_paths, ['t1', 't1'])
+
+    def test_search_path_is_set_again_after_a_rollback(self):
+        self._push_tenant('t1')
+        connection = self._route('default-t1')
+
+        with mock.patch(
+            'django.db.transaction.connections', self.conn_handler
+        ):
+            try:
+                with self._atomic(connection):
+                    self._query(connection)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self._query(connection)
+        self.assertEqual(self.schema_routing.search_paths, ['t1', 't1'])
+
+    def test_tenant_cannot_have_two_schemas_on_a_database(self):
+        with self.assertRaises(ImproperlyConfiguredError):
+            self.schema_routing.register(
+                'other-t1', 't1', {**self.db_config, 'SCHEMA': 'other'}
+            )
+
+        # re-registering a conn alias may well change its schema.
+        self.schema_routing.register(
+            'default-t1', 't1', {**self.db_config, 'SCHEMA': 'other'}
+        )
+        self.assertEqual(
+            self.schema_routing.get_shared_conn('default-t1'),
+            (self.shared_alias, 'other')
+        )
+
+    def test_unregistering_the_last_tenant_drops_the_shared_alias(self):
+        self.schema_routing.unregister('default-t1')
+        self.assertEqual(
+            self.schema_routing.shared_aliases, {self.shared_alias}
+        )
+
+        self.schema_routing.unregister('default-t2')
+        self.assertEqual(self.schema_routing.shared_aliases, set())
+        self.assertNotIn(self.shared_alias, self.conn_handler.databases)
+
+
+@unittest.skipUnless(
+    default_connection.vendor == 'postgresql',
+    "Requires the default database to be PostgreSQL."
+)
+class PostgresSchemaRoutingTest(_TenantContextMixin, SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        db_config = {
+            key: value
+            for key, value in default_connection.settings_dict.items()
+            if key in ('ENGINE', 'HOST', 'PORT', 'NAME', 'USER', 'PASSWORD')
+        }
+
+        self.conn_handler = ConnectionHandler({'default': db_config})
+        self.addCleanup(self.conn_handler.close_all)
+
+        self.schema_routing = SchemaRouting(self.conn_handler)
+        suffix = uuid.uuid4().hex[:8]
+        self.schemas = {}
+        for tenant_alias in ('t1', 't2'):
+            schema = 'tenant_router_test_{tenant_alias}_{suffix}'.format(
+                tenant_alias=tenant_alias,
+                suffix=suffix
+            )
+            self.schemas[tenant_alias] = schema
+            self.schema_routing.register(
+                'default-' + tenant_alias,
+                tenant_alias,
+                {**db_config, 'SCHEMA': schema}
+            )
+            self.schema_routing.ensure_schema('default-' + tenant_alias)
+
+        self.shared_alias, _ = self.schema_routing.get_shared_conn(
+            'default-t1'
+        )
+        self.addCleanup(self._drop_schemas)
+
+    def _drop_schemas(self):
+        connection = self.conn_handler[self.shared_alias]
+        with connection.cursor() as cursor:
+            for schema in self.schemas.values():
+                cursor.execute(
+                    'DROP SCHEMA IF EXISTS {schema} CASCADE'.format(
+                        schema=connection.ops.quote_name(schema)
+                    )
+                )
+
+    def _get_current_schema(self):
+        connection = self.conn_handler[self.shared_alias]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT current_schema()')
+            return cursor.fetchone()[0]
+
+    def test_schema_of_the_executing_tenant_is_used(self):
+        self._push_tenant('t1')
+        self.schema_routing.activate(self.shared_alias, self.schemas['t1'])
+        self.assertEqual(self._get_current_schema(), self.schemas['t1'])
+
+        self._push_tenant('t2')
+        self.assertEqual(self._get_current_schema(), self.schemas['t2'])
+
+    def test_schema_survives_a_savepoint_rollback(self):
+        self._push_tenant('t1')
+        connection = self.conn_handler[self.shared_alias]
+
+        with mock.patch(
+            'django.db.transaction.connections', self.conn_handler
+        ), transaction.atomic(using=self.shared_alias):
+            try:
+                with transaction.atomic(using=self.shared_alias):
+                    self.assertEqual(
+                        self._get_current_schema(), self.schemas['t1']
+                    )
+                    raise ValueError
+            except ValueError:
+                pass
+
+            self.assertEqual(self._get_current_schema(), self.schemas['t1'])
+
+        self.assertFalse(connection.in_atomic_block)
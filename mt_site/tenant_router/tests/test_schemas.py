@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from tenant_router.cache.utils import construct_cache_alias
+from tenant_router.orm_backends.utils import construct_conn_alias
+from tenant_router.schemas import TenantContext
+
+
+class TenantContextTest(SimpleTestCase):
+
+    def test_contexts_are_interned(self):
+        context = TenantContext.from_id('t1.test.com')
+
+        self.assertIs(TenantContext.from_id('t1.test.com'), context)
+        self.assertEqual(context.alias, 't1_test_com')
+
+    def test_derived_keys_are_memoized(self):
+        context = TenantContext.from_id('t1.test.com')
+        builder = mock.Mock(return_value='t1_test_com_key')
+
+        self.assertEqual(
+            context.get_derived_key(builder, 'key'), 't1_test_com_key'
+        )
+        self.assertEqual(
+            context.get_derived_key(builder, 'key'), 't1_test_com_key'
+        )
+        builder.assert_called_once_with('t1_test_com', 'key')
+
+    def test_conn_and_cache_aliases(self):
+        context = TenantContext.from_id('t1.test.com')
+
+        conn_alias = context.get_conn_alias('django_orm', 'default')
+        self.assertEqual(
+            conn_alias,
+            construct_conn_alias('t1_test_com', 'django_orm', 'default')
+        )
+        self.assertIs(
+            context.get_conn_alias('django_orm', 'default'), conn_alias
+        )
+
+        cache_alias = context.get_cache_alias('default')
+        self.assertEqual(
+            cache_alias, construct_cache_alias('t1_test_com', 'default')
+        )
+        self.assertIs(context.get_cache_alias('default'), cache_alias)
+        self.assertNotEqual(context.get_cache_alias('other'), cache_alias)
@@ -0,0 +1,102 @@
+import gc
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from tenant_router.cache.utils import CACHE_CONFIG_PREFIX_KEY
+from tenant_router.context_decorators import tenant_context_bind
+from tenant_router.schemas import TenantContext
+from tenant_router.tests.test_cache_config_manager import (
+    CacheConfigManagerTestMixin
+)
+from tenant_router.tests.utils import make_event
+
+
+class ClosingLocMemCache(LocMemCache):
+    closed = False
+
+    def close(self, **kwargs):
+        self.closed = True
+
+
+class UnsafeLocMemCache(LocMemCache):
+    pass
+
+
+class SharedBackendTest(CacheConfigManagerTestMixin, SimpleTestCase):
+    cache_settings = {
+        'SHARED_BACKENDS': True,
+        'THREAD_SAFE_BACKENDS': {
+            'tenant_router.tests.test_scoped_cache.ClosingLocMemCache'
+        }
+    }
+
+    def _register_shared(self, tenant_alias, **config):
+        return self._register(
+            tenant_alias,
+            BACKEND='tenant_router.tests.test_scoped_cache.ClosingLocMemCache',
+            LOCATION='{test_id}:shared'.format(test_id=self.id()),
+            **config
+        )
+
+    def test_tenants_on_the_same_server_share_a_backend(self):
+        t1 = self.manager.get_scoped_cache(self._register_shared('t1'))
+        t2 = self.manager.get_scoped_cache(self._register_shared('t2'))
+
+        self.assertIs(t1.backend, t2.backend)
+
+        t1.set('key', 't1')
+        self.assertIsNone(t2.get('key'))
+        self.assertEqual(t1.get('key'), 't1')
+
+    def test_keys_are_prefixed_once(self):
+        cache = self.manager.get_scoped_cache(
+            self._register_shared('t1', KEY_PREFIX='app')
+        )
+
+        cache.set('key', 'value')
+
+        self.assertEqual(
+            list(cache.backend._cache), [cache.make_key('key')]
+        )
+        self.assertTrue(cache.make_key('key').startswith(cache.key_prefix))
+
+    def test_backends_not_known_to_be_thread_safe_are_not_shared(self):
+        cache_alias = self._register(
+            't1',
+            BACKEND='tenant_router.tests.test_scoped_cache.UnsafeLocMemCache'
+        )
+
+        with self.assertLogs(
+                'tenant_router.cache.config_manager', level='WARNING'
+        ):
+            self.assertIsNone(self.manager.get_scoped_cache(cache_alias))
+        with tenant_context_bind(TenantContext.from_id('t1')):
+            self.assertIsInstance(
+                self.cache_handler['default'], UnsafeLocMemCache
+            )
+
+    def test_backends_are_closed_once_no_cache_uses_them(self):
+        t1_alias = self._register_shared('t1')
+        t2_alias = self._register_shared('t2')
+        cache = self.manager.get_scoped_cache(t1_alias)
+        backend = cache.backend
+        self.manager.get_scoped_cache(t2_alias)
+
+        self.manager.on_tenant_update(make_event({
+            CACHE_CONFIG_PREFIX_KEY: {t1_alias: {'LOCATION': 'updated'}}
+        }))
+        self._delete(t2_alias)
+
+        # still in use by this thread.
+        self.assertFalse(backend.closed)
+        self.assertIsNot(self.manager.get_scoped_cache(t1_alias), cache)
+
+        del cache
+        gc.collect()
+        self.manager._close_released_backends()
+
+        self.assertTrue(backend.closed)
+        self.assertEqual(self.manager._shared_backend_refs, {
+            self.manager.get_scoped_cache(t1_alias).backend_key: 1
+        })
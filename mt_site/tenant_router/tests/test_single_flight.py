@@ -0,0 +1,243 @@
+import concurrent.futures
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from tenant_router.cache.single_flight import (
+    ENVELOPE_MARKER,
+    LOCK_KEY_SUFFIX,
+    RELEASE_SCRIPT,
+    SingleFlight
+)
+from tenant_router.exceptions import SingleFlightError
+
+
+class RedisLikeLocMemCache(LocMemCache):
+    """
+    Stands in for a `django_redis` backend, with a client whose redis
+    connection only records the scripts run on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = mock.Mock(encode=lambda value: value)
+
+
+class SingleFlightTest(SimpleTestCase):
+
+    def setUp(self):
+        # locmem caches of the same location are shared by the whole
+        # process.
+        self.cache = LocMemCache(self.id(), {})
+        self.addCleanup(self.cache.clear)
+
+        self.workers = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.workers.shutdown)
+
+    def _get_or_set(self, single_flight, compute, timeout=60):
+        return single_flight.get_or_set(
+            't1_default', self.cache, 'key', compute, timeout
+        )
+
+    def _wait_for(self, predicate):
+        deadline = time.monotonic() + 5
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def _start_concurrent_misses(self, single_flight, compute, count):
+        futures = [
+            self.workers.submit(self._get_or_set, single_flight, compute)
+            for _ in range(count)
+        ]
+        self._wait_for(
+            lambda: single_flight.get_stats().get(
+                't1_default', {}
+            ).get('coalesced') == count - 1
+        )
+        return futures
+
+    def test_concurrent_misses_are_computed_once(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        compute = mock.Mock(side_effect=lambda: release.wait() and 'value')
+
+        futures = self._start_concurrent_misses(single_flight, compute, 4)
+        release.set()
+
+        self.assertEqual(
+            [future.result() for future in futures], ['value'] * 4
+        )
+        compute.assert_called_once_with()
+        self.assertEqual(self._get_or_set(single_flight, compute), 'value')
+
+        stats = single_flight.get_stats()['t1_default']
+        self.assertEqual(
+            (stats['coalesced'], stats['recomputed'], stats['hits']),
+            (3, 1, 1)
+        )
+        # the lock is released once the value is set.
+        self.assertIsNone(self.cache.get('key' + LOCK_KEY_SUFFIX))
+
+    def test_waiters_raise_their_own_error_chained_to_the_leaders(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        error = ValueError('boom')
+
+        def compute():
+            release.wait()
+            raise error
+
+        futures = self._start_concurrent_misses(single_flight, compute, 3)
+        release.set()
+
+        exceptions = [future.exception() for future in futures]
+        self.assertEqual(
+            sorted(type(exc).__name__ for exc in exceptions),
+            ['SingleFlightError', 'SingleFlightError', 'ValueError']
+        )
+        waiter_exceptions = [
+            exc for exc in exceptions if isinstance(exc, SingleFlightError)
+        ]
+        self.assertIsNot(*waiter_exceptions)
+        for exc in waiter_exceptions:
+            self.assertIs(exc.__cause__, error)
+
+        # nothing is cached, the next caller computes it again.
+        self.assertEqual(self._get_or_set(single_flight, lambda: 1), 1)
+
+    def test_callers_in_other_processes_wait_for_the_lock(self):
+        single_flight = SingleFlight(poll_interval=0.01)
+        # held by another process.
+        self.cache.add('key' + LOCK_KEY_SUFFIX, 'other-token')
+        future = self.workers.submit(
+            self._get_or_set, single_flight, lambda: 'mine'
+        )
+        self._wait_for(lambda: single_flight._flights)
+
+        single_flight._compute_and_set(
+            'other', self.cache, 'key', lambda: 'theirs', 60, None
+        )
+
+        self.assertEqual(future.result(), 'theirs')
+        self.assertEqual(
+            single_flight.get_stats()['t1_default']['lock_waits'], 1
+        )
+
+    def test_lock_timeouts_compute_without_the_lock(self):
+        single_flight = SingleFlight(lock_timeout=0.05, poll_interval=0.01)
+        self.cache.add('key' + LOCK_KEY_SUFFIX, 'other-token')
+
+        with self.assertLogs(
+                'tenant_router.cache.single_flight', level='WARNING'
+        ):
+            self.assertEqual(
+                self._get_or_set(single_flight, lambda: 'value'), 'value'
+            )
+
+        self.assertEqual(
+            single_flight.get_stats()['t1_default']['lock_timeouts'], 1
+        )
+        # the lock of the other process is left alone.
+        self.assertEqual(
+            self.cache.get('key' + LOCK_KEY_SUFFIX), 'other-token'
+        )
+
+    def test_hot_keys_are_refreshed_ahead_of_their_expiry(self):
+        single_flight = SingleFlight(beta=1.0)
+        self.cache.set('key', {
+            ENVELOPE_MARKER: 1,
+            'value': 'stale',
+            'delta': 60,
+            'expiry': time.time() + 30
+        })
+
+        # 60 * ln(2) ahead of now is past the expiry.
+        with mock.patch(
+                'tenant_router.cache.single_flight.random.random',
+                return_value=0.5
+        ):
+            self.assertEqual(
+                self._get_or_set(single_flight, lambda: 'fresh'), 'fresh'
+            )
+        self.assertEqual(self.cache.get('key')['value'], 'fresh')
+        self.assertEqual(
+            single_flight.get_stats()['t1_default']['early_refreshes'], 1
+        )
+
+    def test_failed_early_refreshes_return_the_current_value(self):
+        single_flight = SingleFlight(beta=1.0)
+        self.cache.set('key', {
+            ENVELOPE_MARKER: 1,
+            'value': 'stale',
+            'delta': 60,
+            'expiry': time.time() + 30
+        })
+
+        with mock.patch(
+                'tenant_router.cache.single_flight.random.random',
+                return_value=0.5
+        ), self.assertLogs(
+            'tenant_router.cache.single_flight', level='ERROR'
+        ):
+            self.assertEqual(
+                self._get_or_set(
+                    single_flight, mock.Mock(side_effect=ValueError)
+                ),
+                'stale'
+            )
+
+        self.assertEqual(
+            single_flight.get_stats()['t1_default']
+            ['early_refresh_failures'], 1
+        )
+        self.assertEqual(self.cache.get('key')['value'], 'stale')
+        # the lock is released for the next refresh.
+        self.assertIsNone(self.cache.get('key' + LOCK_KEY_SUFFIX))
+
+    def test_early_refreshes_never_wait_for_the_lock(self):
+        single_flight = SingleFlight(beta=1.0)
+        self.cache.set('key', {
+            ENVELOPE_MARKER: 1,
+            'value': 'stale',
+            'delta': 60,
+            'expiry': time.time() + 30
+        })
+        self.cache.add('key' + LOCK_KEY_SUFFIX, 'other-token')
+        compute = mock.Mock()
+
+        with mock.patch(
+                'tenant_router.cache.single_flight.random.random',
+                return_value=0.5
+        ):
+            self.assertEqual(
+                self._get_or_set(single_flight, compute), 'stale'
+            )
+        compute.assert_not_called()
+
+    def test_locks_taken_over_are_not_released(self):
+        lock_key = 'key' + LOCK_KEY_SUFFIX
+        self.cache.set(lock_key, 'other-token')
+
+        SingleFlight._release(self.cache, lock_key, 'my-token', None)
+        self.assertEqual(self.cache.get(lock_key), 'other-token')
+
+        SingleFlight._release(self.cache, lock_key, 'other-token', None)
+        self.assertIsNone(self.cache.get(lock_key))
+
+    def test_redis_locks_are_released_atomically(self):
+        cache = RedisLikeLocMemCache(self.id(), {'KEY_PREFIX': 'app'})
+        lock_key = 'key' + LOCK_KEY_SUFFIX
+        cache.set(lock_key, 'my-token')
+
+        SingleFlight._release(cache, lock_key, 'my-token', None)
+
+        redis_client = cache.client.get_client.return_value
+        redis_client.eval.assert_called_once_with(
+            RELEASE_SCRIPT, 1, cache.make_key(lock_key), 'my-token'
+        )
+        # rather than with a separate get and delete.
+        self.assertEqual(cache.get(lock_key), 'my-token')
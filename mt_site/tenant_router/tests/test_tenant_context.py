@@ -0,0 +1,139 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from tenant_router.managers.tenant_context import (
+    _TenantContextManager,
+    TenantContextNotFound
+)
+from tenant_router.tests.utils import make_event
+
+
+class TenantContextManagerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = _TenantContextManager('test_manager')
+        for tenant_id in ('t1.test.com', 't2-test.com'):
+            self.manager.on_tenant_create(
+                make_event({'tenant_id': tenant_id})
+            )
+
+    def test_get_by_id_and_alias(self):
+        context = self.manager.get_by_id('t2-test.com')
+
+        self.assertEqual(context.alias, 't2_test_com')
+        self.assertIs(self.manager.get_by_alias('t2_test_com'), context)
+
+        with self.assertRaises(TenantContextNotFound):
+            self.manager.get_by_id('t2_test_com')
+
+        with self.assertRaises(TenantContextNotFound):
+            self.manager.get_by_alias('t2-test.com')
+
+    def test_resolve_and_contains(self):
+        context = self.manager.get_by_id('t1.test.com')
+
+        self.assertIs(self.manager.resolve('t1.test.com'), context)
+        self.assertIs(self.manager.resolve('t1_test_com'), context)
+        self.assertTrue(self.manager.contains('t1_test_com'))
+        self.assertFalse(self.manager.contains('t3.test.com'))
+
+        with self.assertRaises(TenantContextNotFound):
+            self.manager.resolve('t3.test.com')
+
+    def test_colliding_aliases_resolve_to_neither_tenant(self):
+        with self.assertLogs(
+                'tenant_router.managers.tenant_context', level='ERROR'
+        ):
+            self.manager.on_tenant_create(
+                make_event({'tenant_id': 't1-test.com'})
+            )
+
+        with self.assertRaisesMessage(
+                TenantContextNotFound, 'shared by more than one tenant'
+        ):
+            self.manager.get_by_alias('t1_test_com')
+        with self.assertRaises(TenantContextNotFound):
+            self.manager.resolve('t1_test_com')
+
+        # ids still resolve, as does the alias once it's unique again.
+        self.assertEqual(
+            self.manager.resolve('t1-test.com').id, 't1-test.com'
+        )
+        self.manager.on_tenant_delete(make_event({'tenant_id': 't1.test.com'}))
+        self.assertEqual(
+            self.manager.get_by_alias('t1_test_com').id, 't1-test.com'
+        )
+
+    def test_delete_drops_both_indexes(self):
+        self.manager.on_tenant_delete(make_event({'tenant_id': 't1.test.com'}))
+
+        self.assertFalse(self.manager.contains('t1.test.com'))
+        self.assertFalse(self.manager.contains('t1_test_com'))
+        self.assertEqual(self.manager.get_tenant_ids(), ('t2-test.com', ))
+
+
+class TenantRegistrySnapshotTest(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = _TenantContextManager('test_manager')
+
+    def _create(self, tenant_id):
+        self.manager.on_tenant_create(make_event({'tenant_id': tenant_id}))
+
+    def test_snapshots_are_immutable(self):
+        self._create('t1.test.com')
+        snapshot = self.manager.snapshot
+
+        self._create('t2.test.com')
+        self.assertEqual(snapshot.ids, ('t1.test.com', ))
+        self.assertIsNot(self.manager.snapshot, snapshot)
+
+        with self.assertRaises(TypeError):
+            snapshot.by_id['t3.test.com'] = None
+
+    def test_concurrent_writers_dont_lose_updates(self):
+        tenant_ids = ['t{}.test.com'.format(i) for i in range(200)]
+        threads = [
+            threading.Thread(target=self._create, args=(tenant_id, ))
+            for tenant_id in tenant_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            set(self.manager.get_tenant_ids()), set(tenant_ids)
+        )
+
+    def test_readers_see_consistent_snapshots(self):
+        errors = []
+        is_done = threading.Event()
+
+        def read():
+            while not is_done.is_set():
+                snapshot = self.manager.snapshot
+                if len(snapshot.ids) != len(snapshot.contexts) or any(
+                        snapshot.by_alias[context.alias] is not context
+                        for context in snapshot.by_id.values()
+                ):
+                    errors.append(snapshot)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+
+        for i in range(300):
+            self._create('t{}.test.com'.format(i))
+            if i % 3 == 0:
+                self.manager.on_tenant_delete(
+                    make_event({'tenant_id': 't{}.test.com'.format(i)})
+                )
+
+        is_done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.manager.get_tenant_ids()), 200)
@@ -0,0 +1,24 @@
+from django.http import HttpResponse
+from django.urls import include, path, re_path
+
+
+def view(request, **kwargs):
+    return HttpResponse()
+
+
+def whitelisted_view(request, **kwargs):
+    return HttpResponse()
+
+
+app_patterns = [
+    path("status/", whitelisted_view, name='status'),
+    path("items/<int:pk>/", whitelisted_view, name='item'),
+    path("items/", view, name='items'),
+]
+
+urlpatterns = [
+    path("health/", whitelisted_view, name='health'),
+    path("app/", include((app_patterns, 'app'))),
+    path("orders/<slug:slug>/", view, name='order'),
+    re_path(r"^legacy/(?P<pk>\d+)/$", view, name='legacy'),
+]
@@ -0,0 +1,99 @@
+from contextlib import ExitStack
+from unittest import mock
+
+from django.test import override_settings
+
+from tenant_router.cache.config_manager import _CacheConfigManager
+from tenant_router.conf import settings
+from tenant_router.management.commands.migrate import (
+    Command as TenantMigrateCommand
+)
+from tenant_router.orm_backends.django_orm.manager import DjangoOrmManager
+from tenant_router.orm_backends.django_orm.router import DjangoOrmRouter
+from tenant_router.orm_backends.django_orm.test_util import (
+    TenantAwareTestRunner
+)
+from tenant_router.pubsub.models import ChannelType, PubSubEvent
+
+
+def make_event(data, channel_name='test'):
+    """
+    Returns a pubsub event which looks like it was published by another
+    process, so that it gets past `uuid_filter`.
+    """
+    return PubSubEvent(
+        channel_name=channel_name,
+        channel_type=ChannelType.NORMAL,
+        raw=None,
+        data={'proc_uuid': 'another-process', **data}
+    )
+
+
+def make_django_orm_manager(conn_handler, template_config, options=None):
+    """
+    Returns a `DjangoOrmManager` bound to `conn_handler` rather than the
+    global `connections`, with `template_config` as its template config.
+    The router, test runner and `migrate` command are left bound to the
+    manager of the process.
+    """
+    class _DjangoOrmManager(DjangoOrmManager):
+
+        @property
+        def _conn_handler(self):
+            return conn_handler
+
+    with ExitStack() as stack:
+        stack.enter_context(
+            override_settings(TENANT_ROUTER_TEST_DATABASES=template_config)
+        )
+        for cls, attr in (
+                (DjangoOrmRouter, '_manager'),
+                (TenantAwareTestRunner, 'manager'),
+                (TenantMigrateCommand, '_manager'),
+        ):
+            stack.enter_context(
+                mock.patch.object(
+                    cls, attr, getattr(cls, attr, None), create=True
+                )
+            )
+
+        return _DjangoOrmManager(
+            settings_dict={
+                'SETTINGS_KEY': 'TENANT_ROUTER_TEST_DATABASES',
+                'OPTIONS': dict(options or {})
+            }
+        )
+
+
+def make_cache_config_manager(cache_settings=None):
+    """
+    Returns a bootstrapped `_CacheConfigManager` with `cache_settings` as
+    its `TENANT_ROUTER_CACHE_SETTINGS`, which neither subscribes to the
+    tenant channel nor replaces the cache handler of the process. It
+    starts off without any tenant configs, which are registered through
+    tenant events, and writes them to `CACHES`, which is expected to be
+    overridden for as long as the manager is used.
+    """
+    manager = _CacheConfigManager('test_cache_config_manager')
+
+    with ExitStack() as stack:
+        stack.enter_context(
+            mock.patch.dict(
+                settings.__dict__,
+                TENANT_ROUTER_CACHE_SETTINGS=dict(cache_settings or {})
+            )
+        )
+        stack.enter_context(
+            mock.patch.object(manager, '_perform_tenant_channel_subscription')
+        )
+        stack.enter_context(mock.patch('django.core.cache.caches'))
+        stack.enter_context(
+            mock.patch(
+                'tenant_router.cache.config_manager.bulk_config_loader.load',
+                return_value={}
+            )
+        )
+
+        manager.bootstrap()
+
+    return manager
@@ -1,6 +1,11 @@
 from django.urls import path
 
-from tenant_router.views.health_check import tenant_db_health_check
+from tenant_router.views.health_check import (
+    tenant_db_circuit_breaker_state,
+    tenant_db_health_check
+)
+from tenant_router.views.near_cache import tenant_near_cache_stats
+from tenant_router.views.single_flight import tenant_single_flight_stats
 from tenant_router.views.tenant_create import TenantCreateView
 from tenant_router.views.tenant_detail import TenantDetailView
 
@@ -10,6 +15,21 @@ urlpatterns = [
         tenant_db_health_check,
         name='tenant_db_health_check'
     ),
+    path(
+        "circuit-breakers/",
+        tenant_db_circuit_breaker_state,
+        name='tenant_db_circuit_breaker_state'
+    ),
+    path(
+        "near-cache/",
+        tenant_near_cache_stats,
+        name='tenant_near_cache_stats'
+    ),
+    path(
+        "single-flight/",
+        tenant_single_flight_stats,
+        name='tenant_single_flight_stats'
+    ),
     path(
         "tenant/",
         TenantCreateView.as_view(),
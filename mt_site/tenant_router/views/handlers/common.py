@@ -90,16 +90,18 @@ class BaseTenantHandler:
         orm_manager = orm_managers[orm_key]
 
         final_key = join_keys(
-            TenantContext.from_id(self.tenant_id).alias,
+            self.tenant_context.alias,
             settings.TENANT_ROUTER_SERVICE_NAME,
             mapping_key
         )
         final_config = orm_manager.format_conn_url(value)
 
         self.config_store.set(final_key, final_config)
-        self.final_event_payload[ORM_CONFIG_PREFIX_KEY][orm_key] = {
-            final_key: final_config
-        }
+        # a single orm could have multiple keys in `deploy_info`
+        # (for eg, a primary and its replicas).
+        self.final_event_payload[ORM_CONFIG_PREFIX_KEY].setdefault(
+            orm_key, {}
+        )[final_key] = final_config
 
     def _generate_event_payload(self):
         for key, value in self.deploy_info.items():
@@ -2,6 +2,7 @@ import json
 
 from django.core.cache import caches
 
+from tenant_router.cache.config_manager import cache_config_manager
 from tenant_router.conf import settings
 from tenant_router.schemas import TenantContext
 
@@ -64,6 +65,11 @@ class TenantDeleteHandler:
         deleted = self._delete_tenant_id()
         if deleted:
             self._orm_key_deleter()
+            # a tenant created later with the same id starts out with an
+            # empty cache.
+            cache_config_manager.bump_tenant_namespaces(
+                self.tenant_context.alias
+            )
 
             channel_name = construct_tenant_channel_name(
                 lifecycle_event=TenantLifecycleEvent.ON_TENANT_DELETE,
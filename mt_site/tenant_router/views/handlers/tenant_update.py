@@ -1,5 +1,6 @@
 import json
 
+from tenant_router.cache.config_manager import cache_config_manager
 from tenant_router.orm_backends.core import orm_managers
 from tenant_router.pubsub.proxy import pubsub_proxy
 from tenant_router.tenant_channel_observer import (
@@ -11,7 +12,7 @@ from tenant_router.views.handlers.common import BaseTenantHandler
 
 class TenantUpdateHandler(BaseTenantHandler):
     _CALLBACK_CHAIN = (
-        orm_managers.on_tenant_update
+        orm_managers.on_tenant_update,
     )
 
     def __init__(self, tenant_id, request_payload):
@@ -26,6 +27,9 @@ class TenantUpdateHandler(BaseTenantHandler):
         self._exec_callback_chain()
         self._exec_migrate()
 
+        # data cached for the tenant may be derived from the old config.
+        cache_config_manager.bump_tenant_namespaces(self.tenant_context.alias)
+
         channel_name = construct_tenant_channel_name(
             TenantLifecycleEvent.ON_TENANT_UPDATE, self.tenant_context
         )
@@ -3,18 +3,49 @@ import json
 from django.http import HttpResponse
 from django.views.decorators.http import require_http_methods
 
+from tenant_router.managers import tenant_context_manager
+from tenant_router.managers.tenant_context import TenantContextNotFound
 from tenant_router.orm_backends.core import orm_managers
 
 
 @require_http_methods(["GET"])
 def tenant_db_health_check(request):
     final_health_check_dict = {}
+    tenant_alias = None
+
+    # optionally restricts the health check to the
+    # databases of a single tenant.
+    tenant_id = request.GET.get('tenant_id')
+    if tenant_id:
+        try:
+            tenant_alias = tenant_context_manager.resolve(tenant_id).alias
+        except TenantContextNotFound as e:
+            return HttpResponse(
+                content=json.dumps({'msg': str(e)}),
+                status=404
+            )
 
     for orm_manager in orm_managers:
-        health_check_dict = orm_manager.perform_health_check()
+        health_check_dict = orm_manager.perform_health_check(
+            tenant_alias=tenant_alias
+        )
         final_health_check_dict.update(health_check_dict)
 
     return HttpResponse(
         content=json.dumps(final_health_check_dict),
         status=200
     )
+
+
+@require_http_methods(["GET"])
+def tenant_db_circuit_breaker_state(request):
+    final_state_dict = {}
+
+    # only aliases whose breaker has seen a failure are listed.
+    for orm_manager in orm_managers:
+        final_state_dict.update(orm_manager.get_circuit_breaker_state())
+
+    return HttpResponse(
+        content=json.dumps(final_state_dict),
+        status=200
+    )
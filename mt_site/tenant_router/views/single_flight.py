@@ -0,0 +1,14 @@
+import json
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+
+from tenant_router.cache.config_manager import cache_config_manager
+
+
+@require_http_methods(["GET"])
+def tenant_single_flight_stats(request):
+    return HttpResponse(
+        content=json.dumps(cache_config_manager.get_single_flight_stats()),
+        status=200
+    )